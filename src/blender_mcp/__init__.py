@@ -5,9 +5,28 @@ import os
 import tempfile
 from datetime import datetime
 from typing import Optional, List
+from .retention import ENV_PREFIX as GC_ENV_PREFIX, GarbageCollector, RetentionPolicy, directory_collector, gc_interval
 
 app = FastAPI(title="Blender MCP", version="1.0.0")
 
+# 씬/렌더 출력 디렉토리
+OUTPUT_DIR = "blender_scenes"
+
+# 출력 보존 정책 (용량/기간/최근 N개) 과 백그라운드 GC
+retention_policy = RetentionPolicy.from_env(GC_ENV_PREFIX)
+scene_gc = GarbageCollector(directory_collector(OUTPUT_DIR, retention_policy),
+                            interval=gc_interval(GC_ENV_PREFIX), policy=retention_policy)
+
+@app.on_event("startup")
+async def startup_event():
+    """서버 시작 시 출력 GC 시작"""
+    scene_gc.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """서버 종료 시 GC 작업 정리"""
+    await scene_gc.stop()
+
 class SceneRequest(BaseModel):
     image_path: str
     camera_preset: str = 'front'
@@ -163,7 +182,7 @@ async def import_image_and_prepare_scene(request: SceneRequest):
             raise HTTPException(status_code=400, detail="이미지 파일을 찾을 수 없습니다.")
         
         # 출력 디렉토리 생성
-        output_dir = "blender_scenes"
+        output_dir = OUTPUT_DIR
         os.makedirs(output_dir, exist_ok=True)
         
         # 출력 파일 경로 생성
@@ -240,5 +259,6 @@ async def health_check():
         "status": "healthy",
         "service": "blender_mcp",
         "blender_available": blender_available,
-        "blender_path": get_blender_executable()
+        "blender_path": get_blender_executable(),
+        "gc": scene_gc.stats()
     }
@@ -0,0 +1,60 @@
+"""
+Blender 씬 출력 보존 정책과 백그라운드 GC
+- 정책/GC 는 mcp_common.retention 공용 구현, 설정은 BLENDER_ 접두사 환경 변수
+  (BLENDER_GC_MAX_MB, BLENDER_GC_MAX_AGE_HOURS, BLENDER_GC_KEEP_LAST, BLENDER_GC_INTERVAL_SECONDS)
+- 씬 하나 (.blend + _render.png) 를 한 단위로 묶어 마지막 접근이 가장 오래된 것부터 축출 (LRU)
+- 기본값은 제한 없음 (옵트인), BLENDER_GC_MAX_MB 또는 BLENDER_GC_MAX_AGE_HOURS 를 지정해야 수집 시작
+"""
+
+import os
+from typing import Callable, Dict, List, Tuple
+
+try:
+    # uvicorn src.<서버>:app 로 실행하면 mcp_common 은 src 패키지 아래에 있음
+    from ..mcp_common.retention import GarbageCollector, RetentionEntry, RetentionPolicy, gc_interval
+except ImportError:
+    # src/ 가 sys.path 에 있을 때 (테스트, tools)
+    from mcp_common.retention import GarbageCollector, RetentionEntry, RetentionPolicy, gc_interval
+
+ENV_PREFIX = 'BLENDER'
+
+def scene_key(file_name: str) -> str:
+    """파일 이름 → 씬 단위 키 (robot_scene_X.blend 와 robot_scene_X_render.png 를 묶음)"""
+    stem = os.path.splitext(file_name)[0]
+    return stem[:-len('_render')] if stem.endswith('_render') else stem
+
+def directory_entries(directory: str) -> Dict[str, List[os.DirEntry]]:
+    groups: Dict[str, List[os.DirEntry]] = {}
+    if not os.path.isdir(directory):
+        return groups
+    with os.scandir(directory) as it:
+        for entry in it:
+            if entry.is_file():
+                groups.setdefault(scene_key(entry.name), []).append(entry)
+    return groups
+
+def directory_collector(directory: str, policy: RetentionPolicy) -> Callable[[], Tuple[int, int]]:
+    """디렉토리 파일 기준 수집 함수 (접근 시각은 atime/mtime 중 늦은 값)"""
+    def collect():
+        groups = directory_entries(directory)
+        entries = []
+        for key, files in groups.items():
+            stats = [f.stat() for f in files]
+            entries.append(RetentionEntry(
+                key=key,
+                size=sum(st.st_size for st in stats),
+                created_at=max(st.st_mtime for st in stats),
+                accessed_at=max(max(st.st_atime, st.st_mtime) for st in stats)
+            ))
+        files_removed = reclaimed = 0
+        for entry in policy.select(entries):
+            for f in groups[entry.key]:
+                try:
+                    size = f.stat().st_size
+                    os.remove(f.path)
+                except FileNotFoundError:
+                    continue
+                files_removed += 1
+                reclaimed += size
+        return files_removed, reclaimed
+    return collect
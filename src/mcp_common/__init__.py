@@ -0,0 +1,6 @@
+"""
+MCP 서버와 도구 공용 모듈 (FastAPI/torch 없이 임포트 가능, 의존성은 PIL 과 표준 라이브러리뿐)
+- retention: 출력 보존 정책과 백그라운드 GC (서버별 환경 변수 접두사로 설정)
+- image_io: 이미지 바이트 포맷 판별/인코딩/변환
+- image_store: 콘텐츠 해시 기반 이미지 저장소 + SQLite 인덱스 (stable_diffusion_mcp, 목업/Blender 도구 공용)
+"""
@@ -0,0 +1,89 @@
+"""
+생성 이미지 바이트 저장/인코딩 유틸리티
+- 프로바이더가 돌려준 바이트가 이미 목표 포맷이면 디코딩/재인코딩 없이 그대로 기록
+- 포맷이 다르면 한 번만 변환하고, 변환된 바이트를 파일과 응답 (base64) 에 같이 사용
+- 출력 포맷 옵션: output_format (png/jpeg/webp), quality, png_compress_level, optimize
+  (ImageRequest 필드와 cloud_proxy 프로바이더 kwargs 가 같은 이름을 사용)
+"""
+
+import os
+from io import BytesIO
+from typing import Any, Dict, Mapping, Optional, Tuple
+from PIL import Image
+
+IMAGE_FORMATS = ('png', 'jpeg', 'webp')
+DEFAULT_FORMAT = 'png'
+DEFAULT_QUALITY = 85
+DEFAULT_PNG_COMPRESS_LEVEL = 6
+
+EXTENSIONS = {'png': '.png', 'jpeg': '.jpg', 'webp': '.webp'}
+MEDIA_TYPES = {'png': 'image/png', 'jpeg': 'image/jpeg', 'webp': 'image/webp'}
+
+# 포맷 이름 → 매직 바이트 검사
+_SIGNATURES = {
+    'png': lambda data: data.startswith(b'\x89PNG\r\n\x1a\n'),
+    'jpeg': lambda data: data.startswith(b'\xff\xd8\xff'),
+    'webp': lambda data: data[:4] == b'RIFF' and data[8:12] == b'WEBP',
+}
+
+def detect_format(data: bytes) -> Optional[str]:
+    """매직 바이트로 이미지 포맷 판별 (모르면 None)"""
+    for name, matches in _SIGNATURES.items():
+        if matches(data):
+            return name
+    return None
+
+def output_options(values: Mapping[str, Any]) -> Dict[str, Any]:
+    """요청 필드/프로바이더 kwargs 에서 인코딩 옵션 추출 (없으면 기본값)"""
+    image_format = (values.get('output_format') or DEFAULT_FORMAT).lower()
+    if image_format == 'jpg':
+        image_format = 'jpeg'
+    if image_format not in IMAGE_FORMATS:
+        raise ValueError(f"지원하지 않는 이미지 포맷: {image_format}")
+    return {
+        'image_format': image_format,
+        'quality': int(values.get('quality') or DEFAULT_QUALITY),
+        'compress_level': int(values.get('png_compress_level', DEFAULT_PNG_COMPRESS_LEVEL)),
+        'optimize': bool(values.get('optimize', False))
+    }
+
+def encode_image(image: Image.Image, image_format: str = DEFAULT_FORMAT,
+                 quality: int = DEFAULT_QUALITY,
+                 compress_level: int = DEFAULT_PNG_COMPRESS_LEVEL,
+                 optimize: bool = False) -> bytes:
+    """
+    PIL 이미지를 지정 포맷 바이트로 인코딩
+    png 는 compress_level (0-9), jpeg/webp 는 quality (1-100) 를 사용하고
+    optimize 는 더 작은 파일을 위해 인코딩 시간을 더 쓴다.
+    """
+    if image_format == 'png':
+        params = {'compress_level': compress_level, 'optimize': optimize}
+    elif image_format == 'jpeg':
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        params = {'quality': quality, 'optimize': optimize}
+    else:
+        # webp 의 method 는 속도/크기 절충 (optimize 시 가장 느리고 작게)
+        params = {'quality': quality, 'method': 6 if optimize else 4}
+    buffered = BytesIO()
+    image.save(buffered, format=image_format.upper(), **params)
+    return buffered.getvalue()
+
+def to_format(data: bytes, image_format: str = DEFAULT_FORMAT, **encode_kwargs) -> Tuple[bytes, bool]:
+    """
+    바이트를 목표 포맷으로 맞춤
+    반환: (목표 포맷 바이트, 변환 여부) — 이미 목표 포맷이면 입력을 그대로 반환
+    (이 경우 quality/압축 옵션은 적용되지 않음, 재인코딩 비용을 피하는 것이 우선)
+    """
+    if detect_format(data) == image_format:
+        return data, False
+    image = Image.open(BytesIO(data))
+    return encode_image(image, image_format, **encode_kwargs), True
+
+def write_image_bytes(data: bytes, image_path: str):
+    """인코딩된 이미지 바이트를 파일에 한 번 기록"""
+    directory = os.path.dirname(image_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(image_path, 'wb') as f:
+        f.write(data)
@@ -0,0 +1,251 @@
+"""
+생성 이미지 저장소 (콘텐츠 해시 + 샤딩 + SQLite 인덱스)
+- 파일 이름: 이미지 바이트의 SHA-256, 경로: <root>/<ab>/<cd>/<sha256>.<ext>
+  (같은 초에 생성된 이미지끼리 덮어쓰지 않고, 같은 내용은 한 번만 저장)
+- <root>/index.sqlite3 에 프롬프트/파라미터/프로바이더/소요 시간 기록
+- 최신 / 프롬프트별 / 프로바이더별 조회는 인덱스 (B-tree) 로 O(log n), 디렉토리 스캔 없음
+- 조회 (path_for) 때마다 accessed_at 을 갱신해 retention 의 LRU 축출 기준으로 사용
+- results 테이블: 결과 캐시 키 → 이미지 해시 (image_cache 의 디스크 계층, 이미지 사본은 따로 두지 않음)
+  파일이 GC 로 지워지면 그 해시를 가리키는 결과도 함께 삭제
+- stats() 는 인덱스 전체 집계라서 SD_IMAGE_STORE_STATS_TTL 초 동안 결과를 재사용하고,
+  인덱스가 아직 없으면 만들지 않고 빈 통계를 반환
+
+모든 메서드는 동기 파일/SQLite I/O 이므로 async 핸들러에서는 asyncio.to_thread 로 호출할 것.
+
+루트 경로가 상대 경로면 호출 시점의 작업 디렉토리 기준 (이전 generated_images/ 동작과 동일).
+SQLite 연결은 작업마다 열고 닫으므로 스레드/프로세스 간에 공유해도 안전하다.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import closing
+from typing import Any, Dict, List, Optional
+from .image_io import EXTENSIONS
+from .retention import RetentionEntry
+
+STORE_DIR = os.getenv('SD_IMAGE_STORE_DIR', 'generated_images')
+INDEX_FILE = 'index.sqlite3'
+STATS_TTL = float(os.getenv('SD_IMAGE_STORE_STATS_TTL', '10'))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    digest TEXT NOT NULL,
+    path TEXT NOT NULL,
+    format TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    prompt TEXT,
+    params TEXT,
+    provider TEXT,
+    timings TEXT,
+    created_at REAL NOT NULL,
+    accessed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_images_created ON images (created_at);
+CREATE INDEX IF NOT EXISTS idx_images_digest ON images (digest);
+CREATE INDEX IF NOT EXISTS idx_images_prompt ON images (prompt, created_at);
+CREATE INDEX IF NOT EXISTS idx_images_provider ON images (provider, created_at);
+CREATE TABLE IF NOT EXISTS results (
+    cache_key TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    metadata TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_digest ON results (digest);
+"""
+
+def content_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+class ImageStore:
+    """콘텐츠 주소 기반 이미지 저장소"""
+
+    def __init__(self, root: str = STORE_DIR, stats_ttl: float = STATS_TTL):
+        self.root = root
+        self.stats_ttl = stats_ttl
+        self._initialized = set()
+        self._lock = threading.Lock()
+        self._stats_cache = None  # (집계 시각, 루트 경로, 결과)
+
+    def _root_path(self) -> str:
+        return os.path.abspath(self.root)
+
+    def _connect(self) -> sqlite3.Connection:
+        root = self._root_path()
+        index_path = os.path.join(root, INDEX_FILE)
+        with self._lock:
+            if index_path not in self._initialized:
+                os.makedirs(root, exist_ok=True)
+                with closing(sqlite3.connect(index_path, timeout=30)) as conn:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(_SCHEMA)
+                    # accessed_at 이 없던 이전 인덱스 마이그레이션
+                    columns = {row[1] for row in conn.execute("PRAGMA table_info(images)")}
+                    if 'accessed_at' not in columns:
+                        conn.execute("ALTER TABLE images ADD COLUMN accessed_at REAL")
+                self._initialized.add(index_path)
+        conn = sqlite3.connect(index_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def shard_path(self, digest: str, image_format: str) -> str:
+        """해시 → 샤딩된 파일 경로 (<ab>/<cd>/<digest>.<ext>)"""
+        extension = EXTENSIONS.get(image_format, '.' + image_format)
+        return os.path.join(self._root_path(), digest[:2], digest[2:4], digest + extension)
+
+    def put(self, data: bytes, image_format: str, prompt: Optional[str] = None,
+            params: Optional[Dict[str, Any]] = None, provider: Optional[str] = None,
+            timings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """이미지 바이트 저장 (같은 내용이면 파일은 재사용) 후 인덱스에 기록"""
+        digest = content_digest(data)
+        path = self.shard_path(digest, image_format)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 임시 파일에 쓰고 교체해서 읽는 쪽이 반쯤 쓴 파일을 보지 않게 함
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        record = {
+            "digest": digest,
+            "path": path,
+            "format": image_format,
+            "size": len(data),
+            "prompt": prompt,
+            "params": json.dumps(params or {}, ensure_ascii=False, sort_keys=True),
+            "provider": provider,
+            "timings": json.dumps(timings or {}, sort_keys=True),
+            "created_at": time.time()
+        }
+        record["accessed_at"] = record["created_at"]
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO images (digest, path, format, size, prompt, params, provider, timings, "
+                "created_at, accessed_at) VALUES (:digest, :path, :format, :size, :prompt, :params, "
+                ":provider, :timings, :created_at, :accessed_at)",
+                record)
+        return self._decode(record)
+
+    @staticmethod
+    def _decode(row) -> Dict[str, Any]:
+        record = dict(row)
+        record.pop("id", None)
+        record["image_id"] = record["digest"]
+        record["params"] = json.loads(record["params"] or "{}")
+        record["timings"] = json.loads(record["timings"] or "{}")
+        return record
+
+    def _query(self, sql: str, args: tuple) -> List[Dict[str, Any]]:
+        with closing(self._connect()) as conn:
+            return [self._decode(row) for row in conn.execute(sql, args)]
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """해시로 가장 최근 기록 조회"""
+        rows = self._query("SELECT * FROM images WHERE digest = ? ORDER BY created_at DESC, id DESC LIMIT 1",
+                           (digest,))
+        return rows[0] if rows else None
+
+    def path_for(self, digest: str, record_access: bool = True) -> Optional[str]:
+        """해시 → 존재하는 이미지 파일 경로 (없으면 None), 접근 시각 갱신"""
+        record = self.get(digest)
+        if record is None or not os.path.isfile(record["path"]):
+            return None
+        if record_access:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("UPDATE images SET accessed_at = ? WHERE digest = ?", (time.time(), digest))
+        return record["path"]
+
+    def put_result(self, cache_key: str, digest: str, metadata: Optional[Dict[str, Any]] = None):
+        """결과 캐시 키 → 저장된 이미지 해시 기록 (같은 키면 덮어씀)"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO results (cache_key, digest, metadata, created_at) VALUES (?, ?, ?, ?)",
+                         (cache_key, digest, json.dumps(metadata or {}, ensure_ascii=False), time.time()))
+
+    def result(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """결과 캐시 키 → {digest, path, metadata} (파일이 없으면 기록을 지우고 None)"""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT digest, metadata FROM results WHERE cache_key = ?", (cache_key,)).fetchone()
+        if row is None:
+            return None
+        path = self.path_for(row["digest"])
+        if path is None:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM results WHERE cache_key = ?", (cache_key,))
+            return None
+        return {"digest": row["digest"], "path": path, "metadata": json.loads(row["metadata"] or "{}")}
+
+    def latest(self, provider: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """가장 최근에 저장된 이미지 (프로바이더 지정 가능)"""
+        rows = self.by_provider(provider, limit=1) if provider else self._query(
+            "SELECT * FROM images ORDER BY created_at DESC, id DESC LIMIT 1", ())
+        return rows[0] if rows else None
+
+    def by_prompt(self, prompt: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """같은 프롬프트로 생성된 이미지 (최신순)"""
+        return self._query("SELECT * FROM images WHERE prompt = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+                           (prompt, limit))
+
+    def by_provider(self, provider: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """프로바이더별 이미지 (최신순)"""
+        return self._query("SELECT * FROM images WHERE provider = ? ORDER BY created_at DESC, id DESC LIMIT ?",
+                           (provider, limit))
+
+    def retention_entries(self) -> List[RetentionEntry]:
+        """GC 용 파일 목록 (해시별 크기, 최근 생성 시각, 최근 접근 시각)"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT digest, MAX(size), MAX(created_at), MAX(COALESCE(accessed_at, created_at)) "
+                "FROM images GROUP BY digest").fetchall()
+        return [RetentionEntry(*row) for row in rows]
+
+    def remove(self, digest: str, created_before: float) -> Optional[int]:
+        """
+        created_before 이전 기록을 지우고, 남은 기록이 없으면 파일 삭제
+        반환: 회수한 바이트 (파일을 지우지 않았으면 None)
+        """
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT path, size FROM images WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM images WHERE digest = ? AND created_at <= ?", (digest, created_before))
+            # 수집 중에 같은 내용이 다시 저장됐으면 파일은 남겨 둠
+            remaining = conn.execute("SELECT COUNT(*) FROM images WHERE digest = ?", (digest,)).fetchone()[0]
+            if not remaining:
+                conn.execute("DELETE FROM results WHERE digest = ?", (digest,))
+        if remaining:
+            return None
+        try:
+            os.remove(row["path"])
+        except FileNotFoundError:
+            return 0
+        return row["size"]
+
+    def stats(self) -> Dict[str, Any]:
+        """기록/파일 수와 용량 (최대 stats_ttl 초 전 집계)"""
+        root = self._root_path()
+        now = time.monotonic()
+        cached = self._stats_cache
+        if cached is not None and cached[1] == root and now - cached[0] < self.stats_ttl:
+            return cached[2]
+        count, files, total, providers = 0, 0, 0, {}
+        if os.path.exists(os.path.join(root, INDEX_FILE)):
+            with closing(self._connect()) as conn:
+                count = conn.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+                files, total = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM images)"
+                ).fetchone()
+                providers = dict(conn.execute("SELECT provider, COUNT(*) FROM images GROUP BY provider").fetchall())
+        result = {
+            "root": root,
+            "records": count,
+            "files": files,
+            "bytes": total,
+            "by_provider": providers
+        }
+        self._stats_cache = (now, root, result)
+        return result
@@ -0,0 +1,162 @@
+"""
+출력 보존 정책과 백그라운드 GC (서버 공용)
+- 정책: 최대 총 용량, 최대 보존 기간, 최근 N개 보존, 0 이면 해당 제한 없음
+  서버마다 환경 변수 접두사로 설정: <prefix>_GC_MAX_MB, <prefix>_GC_MAX_AGE_HOURS,
+  <prefix>_GC_KEEP_LAST, <prefix>_GC_INTERVAL_SECONDS (stable_diffusion_mcp 는 SD, blender_mcp 는 BLENDER)
+- 옵트인: 기본값은 모두 0 (제한 없음) 이고, 용량/기간 제한이 하나도 없으면 GC 를 시작하지 않음
+  (업그레이드만으로 사용자 출력이 지워지지 않음)
+- 용량 초과 시 마지막 접근이 가장 오래된 것부터 축출 (LRU), 최근 N개는 항상 보존
+- 수집은 스레드에서 실행하므로 요청 처리 (이벤트 루프) 를 막지 않음
+- 회수한 바이트/파일 수와 마지막 오류를 지표로 보고
+무엇을 어떻게 지울지 (collect) 는 서버별 모듈이 정한다.
+"""
+
+import os
+import time
+import asyncio
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+DEFAULT_MAX_MB = 0
+DEFAULT_MAX_AGE_HOURS = 0
+DEFAULT_KEEP_LAST = 0
+DEFAULT_INTERVAL_SECONDS = 300
+
+def gc_interval(prefix: str) -> float:
+    """<prefix>_GC_INTERVAL_SECONDS (0 이하면 백그라운드 GC 비활성)"""
+    return float(os.getenv(f'{prefix}_GC_INTERVAL_SECONDS', DEFAULT_INTERVAL_SECONDS))
+
+class RetentionEntry(NamedTuple):
+    """GC 대상 하나 (이미지 파일 또는 씬 파일 묶음)"""
+    key: str
+    size: int
+    created_at: float
+    accessed_at: float
+
+class RetentionPolicy:
+    """보존 정책 (0 또는 None 이면 해당 제한 없음)"""
+
+    def __init__(self, max_bytes: int = 0, max_age_seconds: float = 0, keep_last: int = 0):
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.keep_last = keep_last
+
+    @classmethod
+    def from_env(cls, prefix: str) -> "RetentionPolicy":
+        """<prefix>_GC_MAX_MB, <prefix>_GC_MAX_AGE_HOURS, <prefix>_GC_KEEP_LAST 로 정책 생성"""
+        return cls(
+            max_bytes=int(float(os.getenv(f'{prefix}_GC_MAX_MB', DEFAULT_MAX_MB)) * 1024 * 1024),
+            max_age_seconds=float(os.getenv(f'{prefix}_GC_MAX_AGE_HOURS', DEFAULT_MAX_AGE_HOURS)) * 3600,
+            keep_last=int(os.getenv(f'{prefix}_GC_KEEP_LAST', DEFAULT_KEEP_LAST))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """지울 기준 (용량 또는 기간) 이 있는지 (keep_last 만으로는 아무것도 지우지 않음)"""
+        return bool(self.max_bytes or self.max_age_seconds)
+
+    def select(self, entries: List[RetentionEntry], now: Optional[float] = None) -> List[RetentionEntry]:
+        """축출할 항목 선택 (최근 N개 보존 → 기간 초과 → 용량 초과 시 LRU 순)"""
+        if not self.enabled:
+            return []
+        now = time.time() if now is None else now
+        newest_first = sorted(entries, key=lambda e: e.created_at, reverse=True)
+        protected = newest_first[:self.keep_last] if self.keep_last else []
+        candidates = sorted(newest_first[len(protected):], key=lambda e: e.accessed_at)
+
+        evicted = []
+        if self.max_age_seconds:
+            evicted = [e for e in candidates if now - e.created_at > self.max_age_seconds]
+            candidates = [e for e in candidates if now - e.created_at <= self.max_age_seconds]
+
+        if self.max_bytes:
+            total = sum(e.size for e in entries) - sum(e.size for e in evicted)
+            for entry in candidates:
+                if total <= self.max_bytes:
+                    break
+                evicted.append(entry)
+                total -= entry.size
+        return evicted
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_bytes": self.max_bytes,
+            "max_age_seconds": self.max_age_seconds,
+            "keep_last": self.keep_last
+        }
+
+class GarbageCollector:
+    """
+    주기적으로 collect() 를 실행하는 백그라운드 GC
+    collect: 블로킹 함수, (회수 파일 수, 회수 바이트) 반환
+    """
+
+    def __init__(self, collect: Callable[[], Tuple[int, int]],
+                 interval: float = DEFAULT_INTERVAL_SECONDS,
+                 policy: Optional[RetentionPolicy] = None):
+        self.collect = collect
+        self.interval = interval
+        self.policy = policy
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.errors = 0
+        self.reclaimed_files = 0
+        self.reclaimed_bytes = 0
+        self.last_run_at: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    async def run_once(self) -> Tuple[int, int]:
+        """한 번 수집 (스레드에서 실행)"""
+        started = time.perf_counter()
+        try:
+            files, reclaimed = await asyncio.to_thread(self.collect)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = str(e)
+            print(f"⚠️ GC 실패: {e}")
+            return 0, 0
+        finally:
+            self.runs += 1
+            self.last_run_at = time.time()
+            self.last_duration = round(time.perf_counter() - started, 4)
+        self.reclaimed_files += files
+        self.reclaimed_bytes += reclaimed
+        if files:
+            print(f"🧹 GC: 파일 {files}개, {reclaimed / 1024 / 1024:.1f}MB 회수")
+        return files, reclaimed
+
+    async def _loop(self):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """앱 startup 에서 호출 (간격이 0 이하이거나 정책에 제한이 없으면 비활성)"""
+        if self.policy is not None and not self.policy.enabled:
+            return
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "policy": self.policy.describe() if self.policy else None,
+            "runs": self.runs,
+            "errors": self.errors,
+            "reclaimed_files": self.reclaimed_files,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "last_run_at": self.last_run_at,
+            "last_duration_seconds": self.last_duration,
+            "last_error": self.last_error
+        }
@@ -1,20 +1,109 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import torch
-from diffusers import StableDiffusionPipeline
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, model_validator
 import os
+import sys
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List, Tuple, Callable, Literal
+import json
 import base64
-from io import BytesIO
 from PIL import Image
-import requests
+import aiohttp
 import asyncio
+import time
+import random
+import threading
+from .http_client import SharedHTTPClient
+from .provider_health import provider_registry
+from .image_cache import ImageResultCache, request_cache_key, request_fingerprint
+from .single_flight import SingleFlight
+from .batching import MicroBatcher
+from .executor import GenerationCancelled, InferenceExecutor, QueueFullError
+from .jobs import Job, JobStore
+from .cancellation import (CancellationMetrics, ClientDisconnected, DeadlineExceeded, JOB_TIMEOUT, REQUEST_TIMEOUT,
+                           effective_timeout, run_until_cancelled)
+from .previews import encode_preview, preview_due
+from .loader import PipelineLoader
+from .image_io import MEDIA_TYPES, detect_format, encode_image, output_options, to_format
+from .image_delivery import find_image, image_file_response, multipart_response, wants_multipart
+from .image_store import ImageStore, content_digest
+from .retention import ENV_PREFIX as GC_ENV_PREFIX, GarbageCollector, RetentionPolicy, gc_interval, image_store_collector
+from .prompt_embeddings import PromptEmbeddingCache
+from .model_registry import ModelRegistry
+from .schedulers import QUALITY_PRESETS, SCHEDULERS, QualityPreset, SchedulerCache, SchedulerName, resolve_preset
+from .worker_pool import WorkerPool
+from .upscaling import (DEFAULT_UPSCALER, DRAFT_SCALE, UPSCALERS, draft_size, upscale_image, upscaler_stats,
+                        uses_inference_pool)
+from .memory_admission import MemoryAdmission, MemoryEstimator, PeakRSSSampler, VAEModeGate
+from .cpu_tuning import CPUPerfConfig, apply_cpu_optimizations, configure_threads, inference_context, warmup
 
 app = FastAPI(title="Stable Diffusion MCP (Cloud Enhanced)", version="2.0.0")
 
-# 글로벌 파이프라인 변수
+# 로컬 모델 레지스트리 (SD_MODELS 카탈로그, 메모리 예산 안에서 LRU 상주)
+model_registry = ModelRegistry(lambda model_id, shared, report_stage: load_local_model(model_id, shared, report_stage))
+DEFAULT_MODEL = model_registry.default
+MODEL_ID = model_registry.model_id(DEFAULT_MODEL)
+
+# 기본 모델 파이프라인 (로딩 완료 전에는 None)
 pipeline = None
+pipeline_device = "cpu"
+
+# 기본 네거티브 프롬프트 (로드 시 임베딩을 미리 계산)
+DEFAULT_NEGATIVE_PROMPT = "blurry, low quality, distorted"
+
+# 텍스트 인코더 결과 캐시 (같은 프롬프트/네거티브 프롬프트 재사용)
+prompt_embedding_cache = PromptEmbeddingCache()
+
+# 스케줄러별 파이프라인 뷰 캐시 (가중치 공유, 전환 시 재로드 없음)
+scheduler_cache = SchedulerCache()
+
+# GPU 없는 노드의 CPU 추론 튜닝 (SD_CPU_* 환경 변수)
+cpu_perf = CPUPerfConfig.from_env()
+
+# 해상도/배치 기반 피크 메모리 추정, 메모리 예산 입장 제어, VAE 타일링 설정 전환
+memory_estimator = MemoryEstimator()
+memory_admission = MemoryAdmission()
+vae_mode_gate = VAEModeGate()
+
+# 기한 초과/연결 끊김/작업 취소 집계와 중단된 디노이징의 절약 시간
+cancellation_metrics = CancellationMetrics()
+
+# 멀티 프로세스 추론 워커 풀 (SD_WORKER_PROCESSES > 0 이면 기본 모델을 워커 프로세스들이 mmap 가중치로 실행)
+worker_pool = WorkerPool(model_id=MODEL_ID, channels_last=cpu_perf.enabled and cpu_perf.channels_last,
+                         on_interrupted=cancellation_metrics.record_interrupted)
+
+# 클라우드 API 호출용 공유 HTTP 클라이언트 (앱 수명 동안 연결 풀 유지)
+http_client = SharedHTTPClient()
+
+# 동시에 들어온 동일 요청 합치기 (single-flight)
+generation_flight = SingleFlight()
+
+# 생성 이미지 저장 디렉토리 (GET /images/{id} 로 제공)
+OUTPUT_DIR = "generated_images"
+
+# 콘텐츠 해시 기반 이미지 저장소 + SQLite 메타데이터 인덱스
+image_store = ImageStore()
+
+# 시드가 고정된 요청의 생성 결과 캐시 (디스크 계층은 저장소 인덱스의 해시 참조)
+image_cache = ImageResultCache(image_store)
+
+# 저장소 보존 정책 (용량/기간/최근 N개) 과 백그라운드 GC
+retention_policy = RetentionPolicy.from_env(GC_ENV_PREFIX)
+image_gc = GarbageCollector(image_store_collector(image_store, retention_policy),
+                            interval=gc_interval(GC_ENV_PREFIX), policy=retention_policy)
+
+# 지원 해상도 (/supported_resolutions)
+SUPPORTED_RESOLUTIONS = [
+    "512x512", "768x768", "1024x1024",
+    "512x768", "768x512", "1024x768", "768x1024"
+]
+
+# 비동기 작업 API (/jobs) 저장소
+job_store = JobStore()
+
+# 디노이징 진행률 콜백: (완료 스텝, 전체 스텝), 미리보기 스텝에서는 preview=근사 RGB 이미지 바이트도 전달
+ProgressCallback = Callable[..., None]
 
 # 클라우드 API 설정
 CLOUD_APIS = {
@@ -36,46 +125,158 @@ class ImageRequest(BaseModel):
     num_inference_steps: int = 20
     guidance_scale: float = 7.5
     seed: Optional[int] = None
-    negative_prompt: Optional[str] = "blurry, low quality, distorted"
+    negative_prompt: Optional[str] = DEFAULT_NEGATIVE_PROMPT
+    include_base64: bool = False  # 응답 JSON 에 이미지 base64 포함 여부 (기본은 image_url 로 전달)
+    # 출력 인코딩: 미리보기는 jpeg/webp 가 png 보다 훨씬 작고 빠름
+    output_format: Literal['png', 'jpeg', 'webp'] = 'png'
+    quality: int = Field(85, ge=1, le=100)  # jpeg/webp 품질
+    png_compress_level: int = Field(6, ge=0, le=9)  # png zlib 압축 레벨 (0 = 무압축, 가장 빠름)
+    optimize: bool = False  # 인코딩 시간을 더 써서 파일 크기 최소화
+    # 로컬 파이프라인 스케줄러 (None = 모델 기본) 와 지연 시간 프리셋 (스케줄러 + 스텝 수)
+    scheduler: Optional[SchedulerName] = None
+    quality_preset: Optional[QualityPreset] = None
+    # 로컬 모델 별칭 또는 모델 id (None = 기본 모델, 검증 후에는 항상 별칭)
+    model: Optional[str] = None
+    # 생성 방식: native = 요청 해상도에서 디노이징, draft_upscale = 축소 해상도 초안을 업스케일러로 키움
+    generation_mode: Literal['native', 'draft_upscale'] = 'native'
+    upscaler: str = DEFAULT_UPSCALER
+    draft_scale: float = Field(DRAFT_SCALE, gt=0, le=1)  # 초안 해상도 = 요청 해상도 × draft_scale
+    preview_every: int = Field(0, ge=0)  # 로컬 디노이징 K 스텝마다 미리보기 (0 = 끔, /jobs 이벤트로 전달)
+    timeout_seconds: Optional[float] = Field(None, gt=0)  # 요청 기한 (None = 서버 기본값)
+    
+    @model_validator(mode='after')
+    def apply_quality_preset(self):
+        """프리셋을 스케줄러/스텝 수로 풀기 (직접 지정한 값이 우선)"""
+        self.scheduler, self.num_inference_steps = resolve_preset(
+            self.quality_preset, self.scheduler, self.num_inference_steps, self.model_fields_set)
+        return self
+    
+    @model_validator(mode='after')
+    def resolve_model(self):
+        """카탈로그에 없는 모델은 422 로 거절"""
+        self.model = model_registry.resolve(self.model)
+        return self
+    
+    @model_validator(mode='after')
+    def check_upscaler(self):
+        """등록되지 않은 업스케일러는 422 로 거절"""
+        if self.upscaler not in UPSCALERS:
+            raise ValueError(f"알 수 없는 업스케일러: {self.upscaler} (사용 가능: {', '.join(UPSCALERS)})")
+        return self
 
 class ImageResponse(BaseModel):
     image_path: str
+    image_id: Optional[str] = None
+    image_url: Optional[str] = None
     image_base64: Optional[str] = None
     metadata: dict
     generation_time: float
 
-def initialize_pipeline():
-    """Stable Diffusion 파이프라인 초기화"""
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    progress: dict
+    result: Optional[ImageResponse] = None
+    error: Optional[str] = None
+    created_at: float
+    updated_at: float
+
+def gpu_available() -> Optional[bool]:
+    """torch 가 이미 로드된 경우에만 GPU 여부 반환 (헬스 체크에서 torch 임포트를 유발하지 않음)"""
+    # 다른 스레드가 임포트하는 중이면 모듈은 있어도 cuda 속성이 아직 없을 수 있음
+    cuda = getattr(sys.modules.get('torch'), 'cuda', None)
+    if cuda is None:
+        return None
+    return cuda.is_available()
+
+def load_local_model(model_id: str, shared_components: dict,
+                     report_stage: Callable[[str], None] = print):
+    """
+    모델 하나 로드 (무거운 임포트 포함, 로더/추론 스레드에서 실행)
+    shared_components: 다른 상주 모델과 가중치가 같은 컴포넌트 (다시 로드하지 않고 그대로 사용)
+    """
+    global pipeline_device
+    report_stage("torch/diffusers 임포트")
+    import torch
+    from diffusers import StableDiffusionPipeline
+    
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    print(f"GPU 사용 가능: {torch.cuda.is_available()}, 디바이스: {device}")
+    
+    tune_cpu = device == "cpu" and cpu_perf.enabled
+    if tune_cpu:
+        configure_threads(cpu_perf)
+    if device == "cuda":
+        # model_cpu_offload 훅은 파이프라인마다 모듈에 붙으므로 GPU 에서는 공유하지 않음
+        shared_components = {}
+    
+    report_stage(f"{model_id} 가중치 로드")
+    loaded = StableDiffusionPipeline.from_pretrained(
+        model_id,
+        torch_dtype=torch.float16 if device == "cuda" else torch.float32,
+        **shared_components
+    )
+    report_stage(f"{device} 로 이동")
+    loaded = loaded.to(device)
+    
+    # 메모리 최적화
+    if device == "cuda":
+        loaded.enable_attention_slicing()
+        loaded.enable_model_cpu_offload()
+    elif tune_cpu:
+        report_stage("CPU 성능 모드 적용")
+        apply_cpu_optimizations(loaded, cpu_perf)
+    
+    # 기본 네거티브 프롬프트 임베딩 미리 계산
+    report_stage("기본 네거티브 프롬프트 임베딩 계산")
+    prompt_embedding_cache.encode(loaded, model_id, DEFAULT_NEGATIVE_PROMPT)
+    
+    if tune_cpu and cpu_perf.warmup_steps > 0:
+        report_stage("예열 추론")
+        warmup(loaded, cpu_perf, device)
+    
+    pipeline_device = device
+    return loaded
+
+def initialize_pipeline(report_stage: Callable[[str], None] = print):
+    """기본 모델 파이프라인 초기화 (로더 스레드에서 실행, 워커 풀 모드면 워커 시작)"""
     global pipeline
     try:
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        print(f"GPU 사용 가능: {torch.cuda.is_available()}, 디바이스: {device}")
-        
-        # Stable Diffusion 2.1 모델 로드
-        model_id = "stabilityai/stable-diffusion-2-1"
-        pipeline = StableDiffusionPipeline.from_pretrained(
-            model_id,
-            torch_dtype=torch.float16 if device == "cuda" else torch.float32
-        )
-        pipeline = pipeline.to(device)
-        
-        # 메모리 최적화
-        if device == "cuda":
-            pipeline.enable_attention_slicing()
-            pipeline.enable_model_cpu_offload()
-            
+        if worker_pool.enabled:
+            return worker_pool.start(report_stage)
+        loaded = model_registry.get(DEFAULT_MODEL, report_stage)
+        # 모든 준비가 끝난 뒤에 공개 (요청이 반쯤 초기화된 파이프라인을 보지 않도록)
+        pipeline = loaded
         print("Stable Diffusion 파이프라인 초기화 완료")
         return True
     except Exception as e:
         print(f"파이프라인 초기화 실패: {e}")
         return False
 
+# 파이프라인 로더 (SD_PIPELINE_LOAD: background | lazy | eager | off)
+pipeline_loader = PipelineLoader(lambda report_stage: initialize_pipeline(report_stage))
+
 @app.on_event("startup")
 async def startup_event():
-    """서버 시작 시 파이프라인 초기화"""
-    success = initialize_pipeline()
-    if not success:
-        print("경고: Stable Diffusion 파이프라인 초기화 실패. 더미 모드로 실행됩니다.")
+    """
+    서버 시작 처리
+    파이프라인은 기본적으로 백그라운드에서 로드하므로 시작이 모델 로드를 기다리지 않는다.
+    준비 상태는 GET /ready 로 확인한다.
+    """
+    await http_client.start()
+    image_gc.start()
+    if pipeline_loader.mode == 'eager':
+        await pipeline_loader.wait()
+    elif pipeline_loader.mode == 'background':
+        pipeline_loader.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """서버 종료 시 HTTP 연결 풀, GC 작업, 추론 스레드 풀 정리"""
+    await http_client.close()
+    await image_gc.stop()
+    inference_executor.shutdown()
+    worker_pool.shutdown()
 
 async def generate_with_huggingface(prompt: str, **kwargs):
     """HuggingFace Inference API로 이미지 생성 (무료, 빠름)"""
@@ -83,12 +284,13 @@ async def generate_with_huggingface(prompt: str, **kwargs):
     headers = {"Authorization": f"Bearer {api_config['key']}"}
     payload = {"inputs": prompt}
     
-    response = requests.post(api_config['url'], headers=headers, json=payload, timeout=30)
-    
-    if response.status_code == 200:
-        return response.content
-    else:
-        raise Exception(f"HuggingFace API 오류: {response.status_code}")
+    session = await http_client.session()
+    timeout = aiohttp.ClientTimeout(total=30)
+    async with session.post(api_config['url'], headers=headers, json=payload, timeout=timeout) as response:
+        if response.status == 200:
+            return await response.read()
+        else:
+            raise Exception(f"HuggingFace API 오류: {response.status}")
 
 async def generate_with_stability(prompt: str, **kwargs):
     """Stability AI API로 이미지 생성 (유료, 최고품질)"""
@@ -110,144 +312,520 @@ async def generate_with_stability(prompt: str, **kwargs):
         "height": height
     }
     
-    response = requests.post(api_config['url'], headers=headers, json=payload, timeout=60)
+    session = await http_client.session()
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with session.post(api_config['url'], headers=headers, json=payload, timeout=timeout) as response:
+        if response.status == 200:
+            data = await response.json()
+            return base64.b64decode(data['artifacts'][0]['base64'])
+        else:
+            raise Exception(f"Stability API 오류: {response.status}")
+
+def model_pipeline(model: str):
+    """모델 별칭 → 파이프라인 (기본 모델은 로더가 올린 파이프라인, 그 외는 레지스트리가 필요 시 로드)"""
+    if model == DEFAULT_MODEL:
+        model_registry.touch(model)
+        return pipeline
+    return model_registry.get(model)
+
+def run_pipeline_batch(batch_key: Tuple[int, int, int, float, Optional[str], str],
+                       items: List[Tuple[ImageRequest, Optional[ProgressCallback]]],
+                       cancelled: Optional[Callable[[], bool]] = None) -> List[bytes]:
+    """
+    같은 해상도/스텝/가이던스/스케줄러/모델 요청들을 한 번의 파이프라인 호출로 생성 (추론 스레드에서 실행)
+    cancelled() 가 참이 되면 다음 스텝 경계에서 GenerationCancelled 로 중단 (VAE 디코드도 건너뜀)
+    """
+    import torch
+    
+    width, height, steps, guidance_scale, scheduler, model = batch_key
+    if cancelled is not None and cancelled():
+        # 실행 차례가 오기 전에 기다리던 요청이 모두 떠난 배치는 시작하지 않음
+        error = GenerationCancelled(0, steps, 0.0)
+        cancellation_metrics.record_interrupted(error)
+        raise error
+    model_id = model_registry.model_id(model)
+    pipe = scheduler_cache.pipeline_for(model_pipeline(model), scheduler)
+    requests = [r for r, _ in items]
+    extra = {}
+    started = time.perf_counter()
+    if cancelled is not None or any(cb is not None for _, cb in items):
+        def on_step_end(_pipe, step, timestep, callback_kwargs):
+            if cancelled is not None and cancelled():
+                raise GenerationCancelled(step + 1, steps, time.perf_counter() - started)
+            latents = callback_kwargs.get("latents")
+            for index, (request, callback) in enumerate(items):
+                if callback is None:
+                    continue
+                if latents is not None and preview_due(step + 1, steps, request.preview_every):
+                    callback(step + 1, steps, preview=encode_preview(latents[index]))
+                else:
+                    callback(step + 1, steps)
+            return callback_kwargs
+        extra["callback_on_step_end"] = on_step_end
+    
+    # 요청마다 자기 시드의 생성기를 사용 (시드가 없으면 임의 시드)
+    generators = [
+        torch.Generator().manual_seed(r.seed if r.seed is not None else random.randrange(2**32))
+        for r in requests
+    ]
     
-    if response.status_code == 200:
-        data = response.json()
-        return base64.b64decode(data['artifacts'][0]['base64'])
+    if hasattr(pipe, 'encode_prompt'):
+        # 캐시된 텍스트 임베딩을 바로 전달 (같은 토큰열이면 텍스트 인코더를 다시 돌리지 않음)
+        text_inputs = {
+            "prompt_embeds": torch.cat([
+                prompt_embedding_cache.encode(pipe, model_id, r.prompt) for r in requests]),
+            "negative_prompt_embeds": torch.cat([
+                prompt_embedding_cache.encode(pipe, model_id, r.negative_prompt or "") for r in requests])
+        }
     else:
-        raise Exception(f"Stability API 오류: {response.status_code}")
+        text_inputs = {
+            "prompt": [r.prompt for r in requests],
+            "negative_prompt": [r.negative_prompt or "" for r in requests]
+        }
+    
+    # 큰 해상도는 VAE 타일링/슬라이싱으로 디코드 피크를 제한하고, 실제 피크 RSS 를 추정기 보정용으로 기록
+    # 같은 파이프라인 객체 (스케줄러 뷰) 는 한 스레드씩 호출, VAE 게이트보다 먼저 잡아야 교착이 없음
+    tiling, slicing = memory_estimator.vae_options(width, height, len(requests))
+    with inference_executor.exclusive(pipe), vae_mode_gate.use(pipe, tiling, slicing), \
+            PeakRSSSampler() as sampler, inference_context(cpu_perf, pipeline_device):
+        try:
+            images = pipe(
+                **text_inputs,
+                num_inference_steps=steps,
+                guidance_scale=guidance_scale,
+                width=width,
+                height=height,
+                generator=generators,
+                **extra
+            ).images
+        except GenerationCancelled as e:
+            cancellation_metrics.record_interrupted(e)
+            raise
+    memory_estimator.record(width, height, len(requests), sampler.delta, sampler.seconds)
+    
+    return [encode_image(image, **output_options(r.model_dump())) for r, image in zip(requests, images)]
 
-@app.post('/create_robot_image', response_model=ImageResponse)
-async def create_robot_image(request: ImageRequest):
+# 파이프라인 호출 전용 스레드 풀 (이벤트 루프를 막지 않음)
+inference_executor = InferenceExecutor()
+
+async def run_local_batch(batch_key: Tuple[int, int, int, float, Optional[str], str],
+                          items: List[Tuple[ImageRequest, Optional[ProgressCallback]]]) -> List[bytes]:
+    """배치를 추론 스레드 풀 (또는 워커 프로세스) 에서 실행하고 결과를 기다림"""
+    if batch_key[-1] == DEFAULT_MODEL and not local_pipeline_ready():
+        raise Exception("로컬 파이프라인 없음")
+    width, height = batch_key[0], batch_key[1]
+    async with memory_admission.reserve(memory_estimator.estimate(width, height, len(items))):
+        if worker_pool.enabled:
+            return await worker_pool.submit(batch_key, items)
+        # 배치를 기다리는 요청이 모두 취소되면 추론 스레드도 다음 스텝에서 멈추도록 알림
+        cancel = threading.Event()
+        try:
+            return await inference_executor.run(run_pipeline_batch, batch_key, items, cancel.is_set)
+        except asyncio.CancelledError:
+            cancel.set()
+            raise
+
+# 대기 중인 로컬 요청을 묶어서 실행하는 배치 스케줄러
+local_batcher = MicroBatcher(run_local_batch)
+
+async def generate_with_local(request: ImageRequest, width: int, height: int,
+                              on_progress: Optional[ProgressCallback] = None):
+    """로컬 Stable Diffusion 파이프라인으로 이미지 생성 (마이크로 배칭, 대기열 제한)"""
+    if request.model != DEFAULT_MODEL and worker_pool.enabled:
+        raise Exception("워커 풀 모드는 기본 모델만 지원")
+    if request.model != DEFAULT_MODEL:
+        # 다른 모델은 레지스트리가 로드 (이벤트 루프 밖에서, 상주 중이면 바로 반환)
+        await asyncio.to_thread(model_registry.get, request.model)
+    else:
+        if not local_pipeline_ready() and pipeline_loader.can_load_on_demand():
+            # lazy 모드: 첫 로컬 요청이 로딩을 시작하고 완료를 기다림
+            await pipeline_loader.wait()
+        if not local_pipeline_ready():
+            raise Exception(f"로컬 파이프라인 없음 ({pipeline_loader.status})")
+    batch_key = (width, height, request.num_inference_steps, request.guidance_scale,
+                 request.scheduler, request.model)
+    async with inference_executor.slot():
+        return await local_batcher.submit(batch_key, (request, on_progress))
+
+def local_pipeline_ready() -> bool:
+    """기본 모델로 바로 추론할 수 있는지 (워커 풀 모드면 준비된 워커가 있는지)"""
+    return worker_pool.ready if worker_pool.enabled else pipeline is not None
+
+def local_pipeline_available(request: ImageRequest) -> bool:
+    """로컬 단계를 시도할지 (기본 모델은 로더 상태, 다른 모델은 로컬이 꺼져 있지 않으면 요청 시 로드)"""
+    if request.model == DEFAULT_MODEL:
+        return local_pipeline_ready() or pipeline_loader.can_load_on_demand()
+    return not worker_pool.enabled and pipeline_loader.status != PipelineLoader.DISABLED
+
+async def generate_robot_image(request: ImageRequest, start_time: datetime,
+                               on_progress: Optional[ProgressCallback] = None) -> Tuple[ImageResponse, bytes]:
     """
-    프롬프트를 기반으로 3D 로봇 이미지 생성
+    프로바이더 폴백 체인으로 이미지 생성
     우선순위: HuggingFace API → Stability AI → 로컬 → 더미
+    서킷이 열린 프로바이더는 호출 없이 바로 다음 단계로 넘어간다.
+    반환: (base64 없는 응답, 요청한 출력 포맷의 이미지 바이트)
     """
-    start_time = datetime.now()
+    # 해상도 파싱
+    width, height = map(int, request.resolution.split('x'))
+    # 초안 → 업스케일 모드면 프로바이더 체인은 초안 해상도로 생성
+    if request.generation_mode == 'draft_upscale':
+        draft_width, draft_height = draft_size(width, height, request.draft_scale)
+    else:
+        draft_width, draft_height = width, height
+    draft_resolution = f"{draft_width}x{draft_height}"
+    
+    image_data = None
+    api_used = "none"
     
+    # 1순위: HuggingFace API (무료, 빠름)
     try:
-        # 해상도 파싱
-        width, height = map(int, request.resolution.split('x'))
-        
-        # 출력 디렉토리 생성
-        output_dir = "generated_images"
-        os.makedirs(output_dir, exist_ok=True)
-        
-        image_data = None
-        api_used = "none"
+        print("🚀 HuggingFace API 시도 중...")
+        image_data = await provider_registry.get('huggingface').call(
+            generate_with_huggingface, request.prompt, resolution=draft_resolution)
+        api_used = "huggingface"
+        print("✅ HuggingFace API 성공!")
+    except Exception as e:
+        print(f"❌ HuggingFace API 실패: {e}")
         
-        # 1순위: HuggingFace API (무료, 빠름)
+        # 2순위: Stability AI API (유료, 고품질)
         try:
-            print("🚀 HuggingFace API 시도 중...")
-            image_data = await generate_with_huggingface(request.prompt, resolution=request.resolution)
-            api_used = "huggingface"
-            print("✅ HuggingFace API 성공!")
-        except Exception as e:
-            print(f"❌ HuggingFace API 실패: {e}")
+            print("🚀 Stability AI API 시도 중...")
+            image_data = await provider_registry.get('stability').call(
+                generate_with_stability, request.prompt,
+                resolution=draft_resolution,
+                guidance_scale=request.guidance_scale,
+                num_inference_steps=request.num_inference_steps)
+            api_used = "stability"
+            print("✅ Stability AI API 성공!")
+        except Exception as e2:
+            print(f"❌ Stability AI API 실패: {e2}")
             
-            # 2순위: Stability AI API (유료, 고품질)
-            try:
-                print("🚀 Stability AI API 시도 중...")
-                image_data = await generate_with_stability(request.prompt, 
-                                                         resolution=request.resolution,
-                                                         guidance_scale=request.guidance_scale,
-                                                         num_inference_steps=request.num_inference_steps)
-                api_used = "stability"
-                print("✅ Stability AI API 성공!")
-            except Exception as e2:
-                print(f"❌ Stability AI API 실패: {e2}")
-                
-                # 3순위: 로컬 파이프라인
-                if pipeline is not None:
-                    try:
-                        print("🚀 로컬 파이프라인 시도 중...")
-                        generator = torch.Generator().manual_seed(request.seed) if request.seed else None
-                        
-                        image = pipeline(
-                            prompt=request.prompt,
-                            negative_prompt=request.negative_prompt,
-                            num_inference_steps=request.num_inference_steps,
-                            guidance_scale=request.guidance_scale,
-                            width=width,
-                            height=height,
-                            generator=generator
-                        ).images[0]
-                        
-                        buffered = BytesIO()
-                        image.save(buffered, format="PNG")
-                        image_data = buffered.getvalue()
-                        api_used = "local"
-                        print("✅ 로컬 파이프라인 성공!")
-                    except Exception as e3:
-                        print(f"❌ 로컬 파이프라인 실패: {e3}")
-        
-        # 이미지 처리
-        if image_data:
-            image = Image.open(BytesIO(image_data))
-        else:
-            # 4순위: 더미 이미지 (최종 백업)
-            print("🔧 더미 이미지 생성 중...")
-            image = Image.new('RGB', (width, height), color='lightblue')
-            buffered = BytesIO()
-            image.save(buffered, format="PNG")
-            image_data = buffered.getvalue()
-            api_used = "dummy"
-        
-        # 이미지 저장
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        image_path = os.path.join(output_dir, f"robot_{api_used}_{timestamp}.png")
-        
-        image.save(image_path)
-        
-        # Base64 인코딩 (선택적)
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        img_base64 = base64.b64encode(buffered.getvalue()).decode()
-        
-        # 생성 시간 계산
-        generation_time = (datetime.now() - start_time).total_seconds()
-        
-        # 메타데이터
-        metadata = {
-            "prompt": request.prompt,
-            "resolution": request.resolution,
-            "steps": request.num_inference_steps,
-            "guidance_scale": request.guidance_scale,
-            "seed": request.seed,
-            "api_used": api_used,
-            "device": "cuda" if torch.cuda.is_available() else "cpu",
-            "model": f"{api_used}-api" if api_used != "local" else "stabilityai/stable-diffusion-2-1",
-            "timestamp": datetime.now().isoformat()
+            # 3순위: 로컬 파이프라인
+            if local_pipeline_available(request):
+                try:
+                    print("🚀 로컬 파이프라인 시도 중...")
+                    image_data = await provider_registry.get('local').call(
+                        generate_with_local, request, draft_width, draft_height, on_progress)
+                    api_used = "local"
+                    print("✅ 로컬 파이프라인 성공!")
+                except QueueFullError:
+                    # 대기열 초과는 더미로 대체하지 않고 429 로 돌려보냄
+                    raise
+                except Exception as e3:
+                    print(f"❌ 로컬 파이프라인 실패: {e3}")
+    
+    # 이미지 처리: 이미 요청 포맷인 프로바이더 바이트는 그대로 사용 (아니면 한 번만 변환)
+    options = output_options(request.model_dump())
+    draft_time = (datetime.now() - start_time).total_seconds()
+    draft = None
+    if image_data and (draft_width, draft_height) != (width, height):
+        # 초안을 요청 해상도로 업스케일 (모델 업스케일러는 추론 스레드 풀, Lanczos 는 별도 스레드)
+        upscale_started = datetime.now()
+        run_upscale = inference_executor.run if uses_inference_pool(request.upscaler) else asyncio.to_thread
+        image_data, upscaler_used = await run_upscale(
+            upscale_image, image_data, width, height, request.upscaler, request.prompt, options)
+        draft = {
+            "resolution": draft_resolution,
+            "upscaler": upscaler_used,
+            "draft_time": draft_time,
+            "upscale_time": (datetime.now() - upscale_started).total_seconds()
         }
-        
-        return ImageResponse(
-            image_path=os.path.abspath(image_path),
-            image_base64=img_base64,
-            metadata=metadata,
-            generation_time=generation_time
+    if image_data:
+        # 요청 포맷으로 재인코딩 (이벤트 루프를 막지 않도록 별도 스레드)
+        image_data, _ = await asyncio.to_thread(to_format, image_data, **options)
+    else:
+        # 4순위: 더미 이미지 (최종 백업)
+        print("🔧 더미 이미지 생성 중...")
+        image_data = await asyncio.to_thread(
+            encode_image, Image.new('RGB', (width, height), color='lightblue'), **options)
+        api_used = "dummy"
+    
+    # 생성 시간 계산
+    generation_time = (datetime.now() - start_time).total_seconds()
+    
+    # 메타데이터
+    metadata = {
+        "prompt": request.prompt,
+        "resolution": request.resolution,
+        "steps": request.num_inference_steps,
+        "guidance_scale": request.guidance_scale,
+        "seed": request.seed,
+        "output_format": options['image_format'],
+        "scheduler": (request.scheduler or "default") if api_used == "local" else None,
+        "quality_preset": request.quality_preset,
+        "generation_mode": request.generation_mode,
+        "draft": draft,
+        "api_used": api_used,
+        "device": pipeline_device,
+        "model": f"{api_used}-api" if api_used != "local" else model_registry.model_id(request.model),
+        "timestamp": datetime.now().isoformat()
+    }
+    
+    # 이미지 저장 (콘텐츠 해시 경로에 인코딩된 바이트를 그대로 기록하고 인덱스에 등록, 파일/SQLite 는 스레드에서)
+    stored = await asyncio.to_thread(
+        image_store.put,
+        image_data, options['image_format'],
+        prompt=request.prompt,
+        params={k: metadata[k] for k in ("resolution", "steps", "guidance_scale", "seed", "output_format", "scheduler",
+                                         "generation_mode")},
+        provider=api_used,
+        timings=dict({"generation_time": generation_time},
+                     **({k: draft[k] for k in ("draft_time", "upscale_time")} if draft else {}))
+    )
+    
+    # 더미 결과는 캐시하지 않음
+    cache_key = request_cache_key(request)
+    if cache_key and api_used != "dummy":
+        await asyncio.to_thread(image_cache.put, cache_key, stored["digest"], image_data, metadata)
+    
+    response = ImageResponse(
+        image_path=stored["path"],
+        image_id=stored["image_id"],
+        image_url=f"/images/{stored['image_id']}",
+        metadata=metadata,
+        generation_time=generation_time
+    )
+    return response, image_data
+
+async def produce_robot_image(request: ImageRequest, start_time: datetime,
+                              on_progress: Optional[ProgressCallback] = None) -> Tuple[ImageResponse, bytes]:
+    """
+    결과 캐시 → 동일 요청 합치기 → 폴백 체인 순서로 이미지 생성
+    합류한 요청은 진행률 콜백 없이 선행 요청의 결과만 받는다.
+    반환: (응답, 이미지 바이트) — base64 는 include_base64 요청일 때만 채움
+    """
+    # 결과 캐시 확인 (결정적 요청만)
+    cache_key = request_cache_key(request)
+    cached = await asyncio.to_thread(image_cache.get, cache_key) if cache_key else None
+    if cached is not None:
+        cached_data, cached_metadata = cached
+        print("⚡ 캐시 적중")
+        image_id = content_digest(cached_data)
+        image_path = await asyncio.to_thread(image_store.path_for, image_id)
+        if image_path is None:
+            # 저장소 GC 가 파일을 지웠으면 캐시된 바이트로 다시 저장해서 image_url 이 404 가 되지 않게 함
+            stored = await asyncio.to_thread(
+                image_store.put,
+                cached_data, cached_metadata.get("output_format", "png"),
+                prompt=cached_metadata.get("prompt"),
+                params={k: cached_metadata.get(k) for k in ("resolution", "steps", "guidance_scale", "seed",
+                                                            "output_format", "scheduler", "generation_mode")},
+                provider=cached_metadata.get("api_used")
+            )
+            image_path = stored["path"]
+        response = ImageResponse(
+            image_path=image_path,
+            image_id=image_id,
+            image_url=f"/images/{image_id}",
+            metadata=dict(cached_metadata, cache_hit=True),
+            generation_time=(datetime.now() - start_time).total_seconds()
+        )
+        image_data = cached_data
+    else:
+        # 동일 요청이 이미 생성 중이면 그 결과를 함께 받음
+        response, image_data = await generation_flight.do(
+            request_fingerprint(request),
+            lambda: generate_robot_image(request, start_time, on_progress)
         )
+    
+    if request.include_base64:
+        # 합쳐진 요청끼리 응답 객체를 공유하므로 복사본에만 채움
+        response = response.model_copy(update={"image_base64": base64.b64encode(image_data).decode()})
+    return response, image_data
+
+@app.post('/create_robot_image', response_model=ImageResponse)
+async def create_robot_image(request: ImageRequest, http_request: Request):
+    """
+    프롬프트를 기반으로 3D 로봇 이미지 생성
+    시드가 지정된 요청은 결과 캐시를 먼저 확인하고,
+    동시에 들어온 동일 요청은 하나의 생성 작업으로 합친다.
+    이미지는 image_url (GET /images/{id}) 로 받는다.
+    base64 가 필요하면 include_base64=true, 한 번에 받으려면 Accept: multipart/mixed
+    """
+    start_time = datetime.now()
+    
+    try:
+        # 기한이 지나거나 클라이언트가 끊기면 폴백 체인과 로컬 디노이징을 중단
+        response, image_data = await run_until_cancelled(
+            produce_robot_image(request, start_time),
+            timeout=effective_timeout(request.timeout_seconds, REQUEST_TIMEOUT),
+            is_disconnected=http_request.is_disconnected)
+        if wants_multipart(http_request.headers.get('accept')):
+            media_type = MEDIA_TYPES.get(detect_format(image_data), 'application/octet-stream')
+            return multipart_response(jsonable_encoder(response), image_data, media_type)
+        return response
         
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e),
+                            headers={"Retry-After": str(e.retry_after)})
+    except DeadlineExceeded as e:
+        cancellation_metrics.record_request("deadline")
+        raise HTTPException(status_code=504, detail=str(e))
+    except ClientDisconnected:
+        cancellation_metrics.record_request("disconnect")
+        print("🔌 클라이언트 연결 끊김 - 생성 중단")
+        return Response(status_code=499)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"이미지 생성 실패: {str(e)}")
 
+async def run_job(job: Job, request: ImageRequest):
+    """백그라운드에서 작업 실행, 상태/진행률/결과를 작업에 기록"""
+    job.set_status(Job.RUNNING)
+    try:
+        response, _ = await run_until_cancelled(
+            produce_robot_image(request, datetime.now(), job.report_progress),
+            timeout=effective_timeout(request.timeout_seconds, JOB_TIMEOUT))
+        job.succeed(jsonable_encoder(response))
+    except DeadlineExceeded as e:
+        cancellation_metrics.record_request("deadline")
+        job.fail(str(e))
+    except asyncio.CancelledError:
+        job.mark_cancelled()
+        raise
+    except Exception as e:
+        job.fail(f"이미지 생성 실패: {str(e)}")
+
+@app.post('/jobs', response_model=JobResponse, status_code=202)
+async def create_job(request: ImageRequest):
+    """
+    이미지 생성 작업 등록 (즉시 job_id 반환)
+    상태/결과는 GET /jobs/{job_id}, 진행률과 미리보기 (preview_every) 는 GET /jobs/{job_id}/events (SSE) 로 확인
+    미리보기가 마음에 들지 않으면 DELETE /jobs/{job_id} 로 취소 (로컬 디노이징도 다음 스텝에서 멈춤)
+    """
+    job = job_store.create(jsonable_encoder(request))
+    job.task = asyncio.create_task(run_job(job, request))
+    return job.snapshot()
+
+def get_job_or_404(job_id: str) -> Job:
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job
+
+@app.get('/jobs/{job_id}', response_model=JobResponse)
+async def get_job(job_id: str):
+    """작업 상태와 결과 조회"""
+    return get_job_or_404(job_id).snapshot()
+
+@app.delete('/jobs/{job_id}', response_model=JobResponse)
+async def cancel_job(job_id: str):
+    """작업 취소 (이미 끝난 작업은 그대로 반환)"""
+    job = get_job_or_404(job_id)
+    if job.cancel():
+        cancellation_metrics.record_request("job_cancelled")
+    return job.snapshot()
+
+@app.get('/jobs/{job_id}/preview')
+async def get_job_preview(job_id: str):
+    """가장 최근 디노이징 미리보기 이미지"""
+    job = get_job_or_404(job_id)
+    if job.preview is None:
+        raise HTTPException(status_code=404, detail="미리보기가 아직 없습니다.")
+    return Response(content=job.preview, media_type=MEDIA_TYPES.get(detect_format(job.preview), 'image/jpeg'),
+                    headers={"Cache-Control": "no-cache", "X-Preview-Step": str(job.preview_step)})
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+@app.get('/jobs/{job_id}/events')
+async def stream_job_events(job_id: str):
+    """작업 진행 이벤트 스트림 (Server-Sent Events)"""
+    job = get_job_or_404(job_id)
+    
+    async def event_stream():
+        queue = job.subscribe()
+        try:
+            yield format_sse({"type": "snapshot", **job.snapshot()})
+            if job.finished:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+                if event["type"] in ("result", "error", "cancelled"):
+                    break
+        finally:
+            job.unsubscribe(queue)
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+@app.get('/images/{image_id}')
+async def get_image(image_id: str, http_request: Request):
+    """
+    생성 이미지 파일 스트리밍
+    ETag/If-None-Match (304) 와 단일 Range (206) 요청을 지원한다.
+    """
+    # 해시 id 는 저장소 인덱스에서, 이전 평면 파일 이름은 디렉토리에서 찾음 (SQLite 갱신은 스레드에서)
+    path = await asyncio.to_thread(image_store.path_for, image_id) or find_image(OUTPUT_DIR, image_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다.")
+    return image_file_response(path, http_request.headers)
+
 @app.get('/supported_resolutions')
 async def get_supported_resolutions():
     """지원되는 해상도 목록 반환"""
     return {
-        "resolutions": [
-            "512x512", "768x768", "1024x1024", 
-            "512x768", "768x512", "1024x768", "768x1024"
-        ],
+        "resolutions": SUPPORTED_RESOLUTIONS,
         "recommended": "1024x1024"
     }
 
+@app.get('/schedulers')
+async def get_schedulers():
+    """로컬 파이프라인 스케줄러와 품질 프리셋 목록 반환"""
+    return {
+        "schedulers": list(SCHEDULERS),
+        "quality_presets": {
+            name: {"scheduler": scheduler, "steps": steps}
+            for name, (scheduler, steps) in QUALITY_PRESETS.items()
+        }
+    }
+
 @app.get('/health')
 async def health_check():
-    """서버 상태 확인"""
+    """서버 생존 확인 (모델 로딩 여부와 무관하게 즉시 응답)"""
     return {
         "status": "healthy",
         "service": "stable_diffusion_mcp",
-        "gpu_available": torch.cuda.is_available(),
-        "pipeline_loaded": pipeline is not None
+        "gpu_available": gpu_available(),
+        "pipeline_loaded": local_pipeline_ready(),
+        "pipeline_loader": pipeline_loader.snapshot(),
+        "http_pool": http_client.stats(),
+        "providers": provider_registry.snapshot(),
+        "image_cache": image_cache.stats(),
+        "image_store": await asyncio.to_thread(image_store.stats),
+        "gc": image_gc.stats(),
+        "coalescing": generation_flight.stats(),
+        "local_batching": local_batcher.stats(),
+        "prompt_embeddings": prompt_embedding_cache.stats(),
+        "cpu_perf": cpu_perf.describe(),
+        "schedulers": scheduler_cache.stats(),
+        "models": model_registry.stats(),
+        "worker_pool": worker_pool.stats(),
+        "upscaling": upscaler_stats(),
+        "memory": {
+            "admission": memory_admission.stats(),
+            "estimator": memory_estimator.stats()
+        },
+        "inference_queue": inference_executor.stats(),
+        "cancellation": cancellation_metrics.stats(),
+        "jobs": job_store.stats()
+    }
+
+@app.get('/ready')
+async def readiness_check():
+    """
+    서버 준비 상태 확인
+    파이프라인 로딩이 진행 중이면 503, 끝났으면 (성공/실패/비활성/lazy 대기) 200
+    로딩에 실패해도 클라우드/더미 경로로 요청을 처리할 수 있으므로 준비된 것으로 본다.
+    """
+    ready = pipeline_loader.is_settled()
+    body = {
+        "ready": ready,
+        "pipeline_loaded": local_pipeline_ready(),
+        "pipeline_loader": pipeline_loader.snapshot()
     }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
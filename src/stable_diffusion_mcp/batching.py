@@ -0,0 +1,101 @@
+"""
+로컬 파이프라인 마이크로 배칭
+같은 배치 키 (해상도, 스텝 수, 가이던스) 로 대기 중인 요청을
+최대 배치 크기 또는 최대 대기 시간까지 모아 한 번의 파이프라인 호출로 처리한다.
+호출자가 취소한 항목은 배치에서 빠지고, 실행 중인 배치의 항목이 모두 취소되면 배치 실행도 취소한다.
+"""
+
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Tuple
+
+BATCH_MAX_SIZE = int(os.getenv('SD_BATCH_MAX_SIZE', '4'))
+BATCH_MAX_WAIT = float(os.getenv('SD_BATCH_MAX_WAIT_MS', '50')) / 1000
+
+class MicroBatcher:
+    """키별로 요청을 모아 run_batch(key, items) 한 번으로 실행하고 결과를 호출자에게 분배"""
+
+    def __init__(self, run_batch: Callable[[Hashable, List[Any]], Awaitable[List[Any]]],
+                 max_batch_size: int = BATCH_MAX_SIZE, max_wait: float = BATCH_MAX_WAIT):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._running: Dict[int, asyncio.Task] = {}  # id(그룹) → 실행 중인 배치 작업
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.cancelled_batches = 0
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        """항목을 배치에 넣고 해당 항목의 결과를 기다림"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        group = self._pending.setdefault(key, [])
+        group.append((item, future))
+        if len(group) >= self.max_batch_size:
+            self._flush(key)
+        elif len(group) == 1:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            self._abandon(key, group, future)
+            raise
+
+    def _abandon(self, key: Hashable, group: List[Tuple[Any, asyncio.Future]], future: asyncio.Future):
+        """취소된 항목 정리: 대기 중이면 그룹에서 빼고, 실행 중인 배치는 전원 취소일 때만 중단"""
+        if self._pending.get(key) is group:
+            group[:] = [entry for entry in group if entry[1] is not future]
+            if not group:
+                del self._pending[key]
+                timer = self._timers.pop(key, None)
+                if timer is not None:
+                    timer.cancel()
+            return
+        task = self._running.get(id(group))
+        if task is not None and all(f.cancelled() for _, f in group):
+            self.cancelled_batches += 1
+            task.cancel()
+
+    def _flush(self, key: Hashable):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        group = self._pending.pop(key, [])
+        if group:
+            task = asyncio.ensure_future(self._run(key, group))
+            self._running[id(group)] = task
+            task.add_done_callback(lambda _: self._running.pop(id(group), None))
+
+    async def _run(self, key: Hashable, group: List[Tuple[Any, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(group)
+        self.largest_batch = max(self.largest_batch, len(group))
+        try:
+            results = await self.run_batch(key, [item for item, _ in group])
+        except asyncio.CancelledError:
+            for _, future in group:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(group, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "cancelled_batches": self.cancelled_batches,
+            "pending": sum(len(group) for group in self._pending.values())
+        }
@@ -0,0 +1,94 @@
+"""
+요청 기한과 연결 끊김에 따른 생성 취소
+- 기한: 요청의 timeout_seconds, 없으면 서버 기본값 (SD_REQUEST_TIMEOUT, /jobs 는 SD_JOB_TIMEOUT, 0 = 무제한)
+- 연결 끊김: SD_DISCONNECT_POLL_MS 간격으로 클라이언트 연결을 확인
+- 둘 중 하나가 먼저 오면 생성 태스크를 취소 → 폴백 체인 (클라우드 호출 포함) 이 그 자리에서 중단되고,
+  로컬 배치는 기다리는 요청이 모두 떠나면 파이프라인 콜백에서 다음 스텝 경계에 중단 (GenerationCancelled)
+- 취소 사유별 요청 수와 중단된 배치가 건너뛴 스텝/추정 절약 시간을 집계
+"""
+
+import os
+import time
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .executor import GenerationCancelled
+
+REQUEST_TIMEOUT = float(os.getenv('SD_REQUEST_TIMEOUT', '600'))
+JOB_TIMEOUT = float(os.getenv('SD_JOB_TIMEOUT', '0'))
+DISCONNECT_POLL_INTERVAL = float(os.getenv('SD_DISCONNECT_POLL_MS', '500')) / 1000
+
+class DeadlineExceeded(Exception):
+    """요청 기한 초과"""
+
+    def __init__(self, timeout: float):
+        super().__init__(f"요청 기한 초과 ({timeout:g}초)")
+        self.timeout = timeout
+
+class ClientDisconnected(Exception):
+    """클라이언트 연결 끊김"""
+
+def effective_timeout(requested: Optional[float], default: float) -> Optional[float]:
+    """요청 기한 (요청 값 우선, 0 이하면 무제한 → None)"""
+    timeout = requested if requested is not None else default
+    return timeout if timeout and timeout > 0 else None
+
+async def run_until_cancelled(coro: Awaitable[Any], timeout: Optional[float] = None,
+                              is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                              poll_interval: float = DISCONNECT_POLL_INTERVAL) -> Any:
+    """
+    coro 를 실행하되 기한이 지나거나 연결이 끊기면 취소
+    DeadlineExceeded / ClientDisconnected 를 던지기 전에 취소된 태스크의 정리를 기다린다.
+    """
+    task = asyncio.ensure_future(coro)
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    try:
+        while True:
+            wait = poll_interval if is_disconnected is not None else None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                wait = remaining if wait is None else min(wait, remaining)
+            done, _ = await asyncio.wait({task}, timeout=max(0.0, wait) if wait is not None else None)
+            if task in done:
+                return task.result()
+            if deadline is not None and time.monotonic() >= deadline:
+                raise DeadlineExceeded(timeout)
+            if is_disconnected is not None and await is_disconnected():
+                raise ClientDisconnected("클라이언트 연결 끊김")
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+class CancellationMetrics:
+    """취소 사유별 요청 수와 중단된 디노이징이 아낀 연산 시간"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.interrupted_batches = 0
+        self.skipped_steps = 0
+        self.saved_seconds = 0.0
+
+    def record_request(self, reason: str):
+        with self._lock:
+            self.requests[reason] = self.requests.get(reason, 0) + 1
+
+    def record_interrupted(self, error: GenerationCancelled):
+        """스텝 사이에서 중단된 배치 (추론 스레드/워커 결과 스레드에서 호출)"""
+        with self._lock:
+            self.interrupted_batches += 1
+            self.skipped_steps += error.total - error.completed
+            self.saved_seconds += error.saved_seconds
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "cancelled_requests": dict(self.requests),
+                "interrupted_batches": self.interrupted_batches,
+                "skipped_steps": self.skipped_steps,
+                "saved_compute_seconds": round(self.saved_seconds, 3),
+                "request_timeout": REQUEST_TIMEOUT,
+                "job_timeout": JOB_TIMEOUT
+            }
@@ -4,44 +4,164 @@
 - Replicate API  
 - Hugging Face Inference API
 - 로컬 백업
+
+HTTP 기반 프로바이더는 각자 하나의 장수명 세션(연결 풀)을 사용한다.
+CloudImageGenerator.start()/close() 를 앱 startup/shutdown 에 연결할 것.
+
+출력 인코딩은 generate_image(..., output_format=, quality=, png_compress_level=, optimize=)
+kwargs 로 지정하며 모든 프로바이더가 같은 옵션을 따른다 (image_io.output_options).
+
+헤징 모드 (SD_HEDGE_MODE):
+- off: 우선순위대로 순차 시도 (기본값)
+- hedged: 앞 프로바이더가 헤지 지연 안에 끝나지 않으면 다음 프로바이더를 동시에 시작
+- race: 상위 N개 프로바이더를 동시에 시작
+가장 먼저 성공한 결과를 쓰고 나머지는 취소한다.
+
+원격 프로바이더 호출은 provider_health 의 서킷 브레이커를 거치므로
+연속 실패한 프로바이더는 열린 동안 즉시 건너뛴다.
 """
 
 import os
-import requests
 import base64
-from io import BytesIO
 from PIL import Image
 from typing import Optional, Dict, Any
 import asyncio
 import aiohttp
 from datetime import datetime
+from .http_client import (
+    SharedHTTPClient, DEFAULT_POOL_LIMIT, DEFAULT_LIMIT_PER_HOST,
+    DEFAULT_KEEPALIVE_TIMEOUT, DEFAULT_DNS_CACHE_TTL
+)
+from .provider_health import ProviderHealthRegistry, provider_registry
+from .image_io import encode_image, output_options, to_format
+from .image_store import ImageStore
+
+HEDGE_MODES = ('off', 'hedged', 'race')
+
+# 프로바이더별 요청 전체 타임아웃 (초): 응답 없는 호출이 헤징/단일 비행 대기자를 붙잡지 않도록
+STABILITY_TIMEOUT = float(os.getenv('SD_STABILITY_TIMEOUT', '60'))
+HUGGINGFACE_TIMEOUT = float(os.getenv('SD_HUGGINGFACE_TIMEOUT', '30'))
+
+# 저장소 인덱스에 남길 생성 파라미터 (프로바이더 kwargs 이름)
+INDEXED_PARAMS = ('resolution', 'num_inference_steps', 'guidance_scale', 'seed', 'output_format')
+
+async def _store_image(store: ImageStore, image_data: bytes, image_format: str, prompt: str,
+                       provider: str, start_time: datetime, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """생성 결과를 콘텐츠 해시 저장소에 기록하고 인덱스 레코드 반환 (파일/SQLite 쓰기는 스레드에서)"""
+    return await asyncio.to_thread(
+        store.put,
+        image_data, image_format,
+        prompt=prompt,
+        params={k: kwargs[k] for k in INDEXED_PARAMS if k in kwargs},
+        provider=provider,
+        timings={"generation_time": (datetime.now() - start_time).total_seconds()}
+    )
+
+def _env_float(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
 
 class CloudImageGenerator:
-    def __init__(self):
+    def __init__(self, pool_limit: int = DEFAULT_POOL_LIMIT,
+                 limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+                 keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+                 dns_cache_ttl: int = DEFAULT_DNS_CACHE_TTL,
+                 hedge_mode: str = os.getenv('SD_HEDGE_MODE', 'off'),
+                 hedge_delay: Optional[float] = _env_float('SD_HEDGE_DELAY'),
+                 hedge_percentile: float = float(os.getenv('SD_HEDGE_PERCENTILE', '0.95')),
+                 default_hedge_delay: float = float(os.getenv('SD_HEDGE_DEFAULT_DELAY', '2.0')),
+                 race_top_n: int = int(os.getenv('SD_HEDGE_RACE_TOP_N', '2')),
+                 health: Optional[ProviderHealthRegistry] = None,
+                 store: Optional[ImageStore] = None):
+        if hedge_mode not in HEDGE_MODES:
+            raise ValueError(f"지원하지 않는 헤징 모드: {hedge_mode}")
+        self.hedge_mode = hedge_mode
+        self.hedge_delay = hedge_delay  # None 이면 지연 분위수로 자동 산정
+        self.hedge_percentile = hedge_percentile
+        self.default_hedge_delay = default_hedge_delay
+        self.race_top_n = race_top_n
+        self.health = health or provider_registry
+        self.store = store or ImageStore()
+
+        def pooled_client():
+            return SharedHTTPClient(limit=pool_limit, limit_per_host=limit_per_host,
+                                    keepalive_timeout=keepalive_timeout,
+                                    dns_cache_ttl=dns_cache_ttl)
+
         self.apis = {
-            'stability': StabilityAIAPI(),
-            'huggingface': HuggingFaceAPI(),
+            'stability': StabilityAIAPI(http_client=pooled_client(), store=self.store),
+            'huggingface': HuggingFaceAPI(http_client=pooled_client(), store=self.store),
             'replicate': ReplicateAPI(),
-            'local': LocalFallbackAPI()
+            'local': LocalFallbackAPI(store=self.store)
         }
-        
-    async def generate_image(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        # 로컬 백업은 헤징에 참여하지 않고 모든 프로바이더가 실패했을 때만 사용
+        self.fallback_only = {'local'}
+
+    def _http_clients(self) -> Dict[str, SharedHTTPClient]:
+        return {name: api.http_client for name, api in self.apis.items()
+                if getattr(api, 'http_client', None) is not None}
+
+    async def start(self):
+        """프로바이더별 세션 열기 (앱 startup 시 호출)"""
+        for client in self._http_clients().values():
+            await client.start()
+
+    async def close(self):
+        """프로바이더별 세션 닫기 (앱 shutdown 시 호출)"""
+        for client in self._http_clients().values():
+            await client.close()
+
+    def register_lifecycle(self, app):
+        """FastAPI 앱의 startup/shutdown 이벤트에 세션 수명 연결"""
+        app.add_event_handler("startup", self.start)
+        app.add_event_handler("shutdown", self.close)
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return {name: client.stats() for name, client in self._http_clients().items()}
+
+    def hedge_delay_for(self, api_name: str) -> float:
+        """다음 프로바이더를 시작하기 전 기다릴 시간 (고정값 또는 지연 분위수)"""
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        observed = self.health.get(api_name).latency.percentile(self.hedge_percentile)
+        return observed if observed is not None else self.default_hedge_delay
+
+    def health_stats(self) -> Dict[str, Any]:
+        return {name: self.health.get(name).snapshot() for name in self.apis
+                if name not in self.fallback_only}
+
+    async def _timed_generate(self, api_name: str, prompt: str, **kwargs) -> Dict[str, Any]:
+        """프로바이더 호출 (로컬 백업 외에는 서킷 브레이커가 지연/오류 기록)"""
+        api = self.apis[api_name]
+        if api_name in self.fallback_only:
+            result = await api.generate(prompt, **kwargs)
+        else:
+            result = await self.health.get(api_name).call(api.generate, prompt, **kwargs)
+        result['api_used'] = api_name
+        return result
+
+    async def generate_image(self, prompt: str, hedge_mode: Optional[str] = None, **kwargs) -> Dict[str, Any]:
         """
         우선순위에 따라 API 시도:
         1. Stability AI (가장 빠름, 고품질)
         2. Hugging Face (무료, 중간 속도)
         3. Replicate (유료, 고품질)
         4. 로컬 (백업)
+        hedge_mode 로 인스턴스 기본 헤징 모드를 요청 단위로 덮어쓸 수 있다.
         """
+        mode = hedge_mode or self.hedge_mode
+        if mode not in HEDGE_MODES:
+            raise ValueError(f"지원하지 않는 헤징 모드: {mode}")
+        if mode != 'off':
+            return await self._generate_hedged(prompt, mode, **kwargs)
+
         errors = []
         
         for api_name, api in self.apis.items():
             try:
                 if api.is_available():
                     print(f"🚀 {api_name} API 사용 중...")
-                    result = await api.generate(prompt, **kwargs)
-                    result['api_used'] = api_name
-                    return result
+                    return await self._timed_generate(api_name, prompt, **kwargs)
             except Exception as e:
                 error_msg = f"{api_name}: {str(e)}"
                 errors.append(error_msg)
@@ -50,10 +170,64 @@ class CloudImageGenerator:
         
         raise Exception(f"모든 API 실패: {'; '.join(errors)}")
 
+    async def _generate_hedged(self, prompt: str, mode: str, **kwargs) -> Dict[str, Any]:
+        """여러 프로바이더를 겹쳐 실행하고 가장 먼저 성공한 결과 반환"""
+        candidates = [name for name, api in self.apis.items()
+                      if name not in self.fallback_only and api.is_available()]
+        errors = []
+        pending = {}
+        initial = self.race_top_n if mode == 'race' else 1
+
+        def launch(api_name: str):
+            print(f"🚀 {api_name} API 사용 중 ({mode})...")
+            task = asyncio.create_task(self._timed_generate(api_name, prompt, **kwargs))
+            pending[task] = api_name
+            return api_name
+
+        try:
+            last_started = None
+            while candidates and len(pending) < initial:
+                last_started = launch(candidates.pop(0))
+
+            while pending:
+                timeout = self.hedge_delay_for(last_started) if candidates else None
+                done, _ = await asyncio.wait(pending, timeout=timeout,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    api_name = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    error_msg = f"{api_name}: {str(task.exception())}"
+                    errors.append(error_msg)
+                    print(f"❌ {error_msg}")
+                # 헤지 지연 초과 또는 실패로 동시 실행 수가 줄면 다음 프로바이더 시작
+                if candidates and (not done or len(pending) < initial):
+                    last_started = launch(candidates.pop(0))
+        finally:
+            for task in pending:
+                task.cancel()
+
+        for api_name in self.fallback_only:
+            api = self.apis.get(api_name)
+            try:
+                if api is not None and api.is_available():
+                    print(f"🚀 {api_name} API 사용 중...")
+                    return await self._timed_generate(api_name, prompt, **kwargs)
+            except Exception as e:
+                error_msg = f"{api_name}: {str(e)}"
+                errors.append(error_msg)
+                print(f"❌ {error_msg}")
+
+        raise Exception(f"모든 API 실패: {'; '.join(errors)}")
+
 class StabilityAIAPI:
-    def __init__(self):
+    def __init__(self, http_client: Optional[SharedHTTPClient] = None,
+                 store: Optional[ImageStore] = None, timeout: float = STABILITY_TIMEOUT):
         self.api_key = os.getenv('STABILITY_API_KEY')
         self.base_url = "https://api.stability.ai/v1/generation/stable-diffusion-v1-6/text-to-image"
+        self.http_client = http_client or SharedHTTPClient()
+        self.store = store or ImageStore()
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
     
     def is_available(self) -> bool:
         return bool(self.api_key)
@@ -75,32 +249,40 @@ class StabilityAIAPI:
             "height": int(kwargs.get('resolution', '1024x1024').split('x')[1])
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.base_url, headers=headers, json=payload) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    image_data = base64.b64decode(data['artifacts'][0]['base64'])
-                    
-                    # 이미지 저장
-                    image = Image.open(BytesIO(image_data))
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    image_path = f"generated_images/robot_stability_{timestamp}.png"
-                    os.makedirs("generated_images", exist_ok=True)
-                    image.save(image_path)
-                    
-                    return {
-                        'image_path': os.path.abspath(image_path),
-                        'image_base64': base64.b64encode(image_data).decode(),
-                        'generation_time': (datetime.now() - start_time).total_seconds(),
-                        'model': 'stability-ai-v1.6'
-                    }
-                else:
-                    raise Exception(f"Stability API 오류: {response.status}")
+        session = await self.http_client.session()
+        async with session.post(self.base_url, headers=headers, json=payload,
+                                timeout=self.timeout) as response:
+            if response.status == 200:
+                data = await response.json()
+                image_base64 = data['artifacts'][0]['base64']
+                image_data = base64.b64decode(image_base64)
+                
+                # 이미지 저장: 요청 포맷이면 받은 바이트와 base64 를 그대로 재사용
+                options = output_options(kwargs)
+                image_data, converted = await asyncio.to_thread(to_format, image_data, **options)
+                if converted:
+                    image_base64 = base64.b64encode(image_data).decode()
+                stored = await _store_image(self.store, image_data, options['image_format'], prompt,
+                                            'stability', start_time, kwargs)
+                
+                return {
+                    'image_path': stored['path'],
+                    'image_id': stored['image_id'],
+                    'image_base64': image_base64,
+                    'generation_time': stored['timings']['generation_time'],
+                    'model': 'stability-ai-v1.6'
+                }
+            else:
+                raise Exception(f"Stability API 오류: {response.status}")
 
 class HuggingFaceAPI:
-    def __init__(self):
+    def __init__(self, http_client: Optional[SharedHTTPClient] = None,
+                 store: Optional[ImageStore] = None, timeout: float = HUGGINGFACE_TIMEOUT):
         self.api_key = os.getenv('HF_API_KEY', 'hf_dummy')  # 무료 사용 가능
         self.model_url = "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-2-1"
+        self.http_client = http_client or SharedHTTPClient()
+        self.store = store or ImageStore()
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
     
     def is_available(self) -> bool:
         return True  # 무료 API
@@ -111,26 +293,27 @@ class HuggingFaceAPI:
         headers = {"Authorization": f"Bearer {self.api_key}"}
         payload = {"inputs": prompt}
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(self.model_url, headers=headers, json=payload) as response:
-                if response.status == 200:
-                    image_data = await response.read()
-                    
-                    # 이미지 저장
-                    image = Image.open(BytesIO(image_data))
-                    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                    image_path = f"generated_images/robot_hf_{timestamp}.png"
-                    os.makedirs("generated_images", exist_ok=True)
-                    image.save(image_path)
-                    
-                    return {
-                        'image_path': os.path.abspath(image_path),
-                        'image_base64': base64.b64encode(image_data).decode(),
-                        'generation_time': (datetime.now() - start_time).total_seconds(),
-                        'model': 'huggingface-sd-2.1'
-                    }
-                else:
-                    raise Exception(f"HuggingFace API 오류: {response.status}")
+        session = await self.http_client.session()
+        async with session.post(self.model_url, headers=headers, json=payload,
+                                timeout=self.timeout) as response:
+            if response.status == 200:
+                image_data = await response.read()
+                
+                # 이미지 저장: 요청 포맷이 아니면 한 번만 변환하고 파일/응답에 같은 바이트 사용
+                options = output_options(kwargs)
+                image_data, _ = await asyncio.to_thread(to_format, image_data, **options)
+                stored = await _store_image(self.store, image_data, options['image_format'], prompt,
+                                            'huggingface', start_time, kwargs)
+                
+                return {
+                    'image_path': stored['path'],
+                    'image_id': stored['image_id'],
+                    'image_base64': base64.b64encode(image_data).decode(),
+                    'generation_time': stored['timings']['generation_time'],
+                    'model': 'huggingface-sd-2.1'
+                }
+            else:
+                raise Exception(f"HuggingFace API 오류: {response.status}")
 
 class ReplicateAPI:
     def __init__(self):
@@ -144,8 +327,9 @@ class ReplicateAPI:
         raise Exception("Replicate API 키 필요")
 
 class LocalFallbackAPI:
-    def __init__(self):
+    def __init__(self, store: Optional[ImageStore] = None):
         self.pipeline = None
+        self.store = store or ImageStore()
     
     def is_available(self) -> bool:
         return True  # 항상 백업으로 사용 가능
@@ -154,21 +338,20 @@ class LocalFallbackAPI:
         # 기존 로컬 구현 사용
         from . import pipeline
         if pipeline is None:
+            start_time = datetime.now()
             # 더미 이미지 생성
             width, height = map(int, kwargs.get('resolution', '1024x1024').split('x'))
-            image = Image.new('RGB', (width, height), color='lightblue')
-            
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            image_path = f"generated_images/robot_dummy_{timestamp}.png"
-            os.makedirs("generated_images", exist_ok=True)
-            image.save(image_path)
+            options = output_options(kwargs)
+            image_data = await asyncio.to_thread(
+                encode_image, Image.new('RGB', (width, height), color='lightblue'), **options)
             
-            buffered = BytesIO()
-            image.save(buffered, format="PNG")
+            stored = await _store_image(self.store, image_data, options['image_format'], prompt,
+                                        'dummy', start_time, kwargs)
             
             return {
-                'image_path': os.path.abspath(image_path),
-                'image_base64': base64.b64encode(buffered.getvalue()).decode(),
+                'image_path': stored['path'],
+                'image_id': stored['image_id'],
+                'image_base64': base64.b64encode(image_data).decode(),
                 'generation_time': 0.1,
                 'model': 'local-dummy'
             }
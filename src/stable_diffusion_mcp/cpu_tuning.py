@@ -0,0 +1,102 @@
+"""
+CPU 추론 성능 모드
+GPU 가 없는 노드에서 로컬 파이프라인을 튜닝한다.
+- intra/inter-op 스레드 수 (SD_CPU_THREADS, SD_CPU_INTEROP_THREADS)
+  SD_CPU_THREADS 가 없으면 torch 기본값 (물리 코어 수) 유지, os.cpu_count() 는 SMT 논리 코어까지 세어 과할당
+- UNet/VAE channels_last 메모리 포맷 (SD_CPU_CHANNELS_LAST)
+- bfloat16 autocast (SD_CPU_BF16, AVX512-BF16/AMX 가 있는 CPU 에서 효과적)
+- UNet/VAE torch.compile (SD_CPU_COMPILE, 첫 호출 컴파일 비용이 큼)
+- 로드 직후 예열 추론 (SD_CPU_WARMUP_STEPS, 0 이면 생략)
+기본은 꺼져 있고 (이전 동작: float32, torch 기본 설정, 예열 없음) SD_CPU_PERF_MODE=1 이면 적용한다.
+"""
+
+import os
+from contextlib import nullcontext
+from typing import Any, Dict, Optional
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+class CPUPerfConfig:
+    """CPU 성능 모드 설정"""
+
+    def __init__(self, enabled: bool = True, threads: Optional[int] = None,
+                 interop_threads: Optional[int] = 1, channels_last: bool = True,
+                 bf16: bool = False, compile: bool = False,
+                 warmup_steps: int = 1, warmup_resolution: str = '512x512'):
+        self.enabled = enabled
+        self.threads = threads  # None 이면 torch 기본값 유지
+        self.interop_threads = interop_threads
+        self.channels_last = channels_last
+        self.bf16 = bf16
+        self.compile = compile
+        self.warmup_steps = warmup_steps
+        self.warmup_resolution = warmup_resolution
+
+    @classmethod
+    def from_env(cls) -> "CPUPerfConfig":
+        threads = os.getenv('SD_CPU_THREADS')
+        interop = os.getenv('SD_CPU_INTEROP_THREADS', '1')
+        return cls(
+            enabled=_env_flag('SD_CPU_PERF_MODE', '0'),
+            threads=int(threads) if threads else None,
+            interop_threads=int(interop) if interop else None,
+            channels_last=_env_flag('SD_CPU_CHANNELS_LAST', '1'),
+            bf16=_env_flag('SD_CPU_BF16', '0'),
+            compile=_env_flag('SD_CPU_COMPILE', '0'),
+            warmup_steps=int(os.getenv('SD_CPU_WARMUP_STEPS', '1')),
+            warmup_resolution=os.getenv('SD_CPU_WARMUP_RESOLUTION', '512x512')
+        )
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "threads": self.threads,
+            "interop_threads": self.interop_threads,
+            "channels_last": self.channels_last,
+            "bf16_autocast": self.bf16,
+            "compile": self.compile,
+            "warmup_steps": self.warmup_steps
+        }
+
+def configure_threads(config: CPUPerfConfig):
+    """torch 스레드 풀 크기 설정 (inter-op 는 병렬 작업 시작 전에 한 번만 설정 가능)"""
+    import torch
+
+    if config.threads:
+        torch.set_num_threads(config.threads)
+    if config.interop_threads:
+        try:
+            torch.set_num_interop_threads(config.interop_threads)
+        except RuntimeError:
+            pass  # 이미 병렬 작업이 시작된 프로세스에서는 변경 불가
+
+def apply_cpu_optimizations(pipe, config: CPUPerfConfig):
+    """UNet/VAE 에 channels_last 와 torch.compile 적용 (pipe 는 unet, vae 속성을 가진 객체)"""
+    import torch
+
+    if config.channels_last:
+        pipe.unet.to(memory_format=torch.channels_last)
+        pipe.vae.to(memory_format=torch.channels_last)
+    if config.compile:
+        pipe.unet = torch.compile(pipe.unet)
+        pipe.vae.decode = torch.compile(pipe.vae.decode)
+    return pipe
+
+def inference_context(config: CPUPerfConfig, device: str):
+    """파이프라인 호출을 감쌀 컨텍스트 (CPU bf16 모드에서만 autocast)"""
+    if not (config.enabled and config.bf16 and device == 'cpu'):
+        return nullcontext()
+    import torch
+    return torch.autocast('cpu', dtype=torch.bfloat16)
+
+def warmup(pipe, config: CPUPerfConfig, device: str):
+    """
+    예열 추론 한 번 (스레드 풀 생성, 메모리 할당, torch.compile 컴파일을 첫 요청 전에 처리)
+    compile 을 켰다면 실제 요청 해상도로 예열해야 재컴파일을 피할 수 있다.
+    """
+    if config.warmup_steps <= 0:
+        return
+    width, height = map(int, config.warmup_resolution.split('x'))
+    with inference_context(config, device):
+        pipe(prompt="warmup", num_inference_steps=config.warmup_steps, width=width, height=height)
@@ -0,0 +1,145 @@
+"""
+로컬 추론 실행기
+- 파이프라인 호출을 전용 스레드 풀에서 실행 (이벤트 루프를 막지 않음)
+- 동시에 받아들이는 요청 수를 제한하고, 가득 차면 QueueFullError 로 즉시 거절
+- 대기 깊이와 대기/실행 시간 분위수 보고
+- 같은 파이프라인 객체는 한 번에 한 스레드만 호출 (exclusive): diffusers 파이프라인은 호출마다
+  스케줄러 상태 (set_timesteps, _step_index) 와 파이프라인 속성을 바꾸므로 동시 호출하면 결과가 섞인다.
+  워커가 여러 개면 서로 다른 모델/스케줄러 뷰와 업스케일 같은 다른 작업만 병렬로 실행된다.
+torch 연산은 GIL 을 놓기 때문에 스레드 풀로 충분하고, 파이프라인 객체를 프로세스 간에 복사할 필요가 없다.
+"""
+
+import os
+import math
+import time
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Callable, Dict
+
+from .provider_health import Backpressure, LatencyTracker
+
+INFERENCE_WORKERS = int(os.getenv('SD_INFERENCE_WORKERS', '1'))  # 파이프라인 객체당 동시 호출은 항상 1
+INFERENCE_MAX_PENDING = int(os.getenv('SD_INFERENCE_MAX_PENDING', '8'))
+
+class QueueFullError(Backpressure):
+    """추론 대기열이 가득 참"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"추론 대기열 가득 참 - {retry_after}초 후 재시도")
+        self.retry_after = retry_after
+
+class GenerationCancelled(Exception):
+    """요청한 쪽이 모두 떠나서 디노이징을 스텝 사이에서 중단함 (완료 스텝, 전체 스텝, 중단까지 걸린 초)"""
+
+    def __init__(self, completed: int, total: int, elapsed: float):
+        super().__init__(completed, total, elapsed)
+        self.completed = completed
+        self.total = total
+        self.elapsed = elapsed
+
+    @property
+    def saved_seconds(self) -> float:
+        """남은 스텝을 지금까지의 스텝당 시간으로 추정한 절약 시간"""
+        return self.elapsed / max(1, self.completed) * (self.total - self.completed)
+
+    def __str__(self) -> str:
+        return f"{self.completed}/{self.total} 스텝에서 취소됨"
+
+class InferenceExecutor:
+    """제한된 대기열을 가진 추론 전용 스레드 풀"""
+
+    def __init__(self, max_workers: int = INFERENCE_WORKERS,
+                 max_pending: int = INFERENCE_MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sd-inference')
+        self._lock = threading.Lock()
+        self.pending = 0        # 받아들였지만 아직 끝나지 않은 요청
+        self.queued_jobs = 0    # 워커를 기다리는 작업
+        self.running_jobs = 0
+        self.completed_jobs = 0
+        self.rejected = 0
+        self.wait_times = LatencyTracker()
+        self.run_times = LatencyTracker()
+        self._pipeline_locks: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self.pipeline_waits = 0  # 같은 파이프라인을 다른 스레드가 쓰고 있어서 기다린 횟수
+
+    def retry_after(self) -> int:
+        """대기 중인 요청이 빠지는 데 걸릴 예상 시간 (초)"""
+        with self._lock:
+            per_job = self.run_times.percentile(0.5) or 1.0
+        return max(1, math.ceil(per_job * self.pending / self.max_workers))
+
+    @asynccontextmanager
+    async def slot(self):
+        """요청 하나를 대기열에 받아들임 (가득 차면 QueueFullError)"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise QueueFullError(self.retry_after())
+        self.pending += 1
+        try:
+            yield
+        finally:
+            self.pending -= 1
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> asyncio.Future:
+        """작업을 스레드 풀에 넣고 즉시 future 반환"""
+        submitted = time.perf_counter()
+        with self._lock:
+            self.queued_jobs += 1
+
+        def job():
+            started = time.perf_counter()
+            with self._lock:
+                self.queued_jobs -= 1
+                self.running_jobs += 1
+                self.wait_times.record(started - submitted)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running_jobs -= 1
+                    self.completed_jobs += 1
+                    self.run_times.record(time.perf_counter() - started)
+
+        return asyncio.get_running_loop().run_in_executor(self._pool, job)
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        return await self.submit(func, *args, **kwargs)
+
+    @contextmanager
+    def exclusive(self, pipe):
+        """pipe 호출 구간을 다른 추론 스레드와 겹치지 않게 잠금 (파이프라인 객체별)"""
+        with self._lock:
+            lock = self._pipeline_locks.get(pipe)
+            if lock is None:
+                lock = self._pipeline_locks[pipe] = threading.Lock()
+        if not lock.acquire(blocking=False):
+            with self._lock:
+                self.pipeline_waits += 1
+            lock.acquire()
+        try:
+            yield
+        finally:
+            lock.release()
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "queued_jobs": self.queued_jobs,
+                "running_jobs": self.running_jobs,
+                "completed_jobs": self.completed_jobs,
+                "rejected": self.rejected,
+                "pipeline_waits": self.pipeline_waits,
+                "wait_time": self.wait_times.stats(),
+                "run_time": self.run_times.stats()
+            }
@@ -0,0 +1,70 @@
+"""
+공유 비동기 HTTP 클라이언트
+- 앱 수명 동안 유지되는 aiohttp 세션 (keep-alive 연결 풀)
+- 호스트별 연결 수 제한, DNS 캐시 TTL 은 환경 변수로 설정
+"""
+
+import os
+import asyncio
+from typing import Optional
+
+import aiohttp
+
+DEFAULT_POOL_LIMIT = int(os.getenv('SD_HTTP_POOL_LIMIT', '100'))
+DEFAULT_LIMIT_PER_HOST = int(os.getenv('SD_HTTP_LIMIT_PER_HOST', '10'))
+DEFAULT_KEEPALIVE_TIMEOUT = float(os.getenv('SD_HTTP_KEEPALIVE_TIMEOUT', '30'))
+DEFAULT_DNS_CACHE_TTL = int(os.getenv('SD_HTTP_DNS_CACHE_TTL', '300'))
+
+class SharedHTTPClient:
+    """앱 전체에서 재사용하는 aiohttp 세션 래퍼"""
+
+    def __init__(self, limit: int = DEFAULT_POOL_LIMIT,
+                 limit_per_host: int = DEFAULT_LIMIT_PER_HOST,
+                 keepalive_timeout: float = DEFAULT_KEEPALIVE_TIMEOUT,
+                 dns_cache_ttl: int = DEFAULT_DNS_CACHE_TTL):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _is_usable(self) -> bool:
+        # 세션은 생성된 이벤트 루프에 묶여 있으므로 루프가 바뀌면 다시 만든다
+        return (self._session is not None and not self._session.closed
+                and self._loop is asyncio.get_running_loop())
+
+    async def start(self) -> aiohttp.ClientSession:
+        """세션 생성 (이미 열려 있으면 그대로 반환)"""
+        if not self._is_usable():
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._loop = asyncio.get_running_loop()
+        return self._session
+
+    async def session(self) -> aiohttp.ClientSession:
+        """열린 세션 반환 (startup 이벤트 없이 호출된 경우 지연 생성)"""
+        return await self.start()
+
+    async def close(self):
+        """세션과 연결 풀 정리"""
+        if self._session is not None and not self._session.closed:
+            if self._loop is asyncio.get_running_loop():
+                await self._session.close()
+        self._session = None
+        self._loop = None
+
+    def stats(self) -> dict:
+        """연결 풀 설정 요약"""
+        return {
+            "open": self._session is not None and not self._session.closed,
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "keepalive_timeout": self.keepalive_timeout,
+            "dns_cache_ttl": self.dns_cache_ttl
+        }
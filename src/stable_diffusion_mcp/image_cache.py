@@ -0,0 +1,118 @@
+"""
+생성 결과 캐시 (콘텐츠 주소 기반)
+- 키: 정규화한 ImageRequest 의 SHA-256 해시
+- 시드가 지정된 (결정적) 요청만 캐시 대상
+- 메모리 LRU 계층 (용량 기준 축출) → 이미지 저장소 인덱스 계층 (캐시 키 → 콘텐츠 해시)
+- 이미지 바이트는 저장소 파일 하나만 두고 사본을 쓰지 않으므로, 저장소 GC 가 파일을 지우면 인덱스 계층도 빠짐
+
+get/put 은 SQLite/파일 I/O 를 하므로 async 핸들러에서는 asyncio.to_thread 로 호출할 것.
+"""
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+CACHE_MEMORY_BYTES = int(float(os.getenv('SD_CACHE_MEMORY_MB', '64')) * 1024 * 1024)
+
+def _normalize_text(text: Optional[str]) -> Optional[str]:
+    return " ".join(text.split()) if text is not None else None
+
+def request_fingerprint(request) -> str:
+    """정규화한 요청 파라미터의 SHA-256 해시"""
+    normalized = {
+        "prompt": _normalize_text(request.prompt),
+        "negative_prompt": _normalize_text(request.negative_prompt),
+        "resolution": request.resolution.strip().lower(),
+        "steps": int(request.num_inference_steps),
+        "guidance_scale": round(float(request.guidance_scale), 4),
+        "seed": request.seed,
+        "scheduler": request.scheduler,
+        "model": request.model,
+        # 초안 → 업스케일 모드는 초안 해상도/업스케일러에 따라 결과가 다름
+        "upscale": ([request.upscaler, round(float(request.draft_scale), 4)]
+                    if request.generation_mode == 'draft_upscale' else None),
+        # 출력 인코딩이 다르면 결과 바이트도 다름
+        "output": [request.output_format, request.quality,
+                   request.png_compress_level, request.optimize]
+    }
+    encoded = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def request_cache_key(request) -> Optional[str]:
+    """결정적 요청의 캐시 키 (시드가 없으면 None)"""
+    if request.seed is None:
+        return None
+    return request_fingerprint(request)
+
+class ImageResultCache:
+    """메모리 LRU + 이미지 저장소 인덱스 2계층 이미지 결과 캐시"""
+
+    def __init__(self, store, memory_max_bytes: int = CACHE_MEMORY_BYTES):
+        self.store = store
+        self.memory_max_bytes = memory_max_bytes
+        self._memory: "OrderedDict[str, Tuple[bytes, Dict[str, Any]]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _remember(self, key: str, image_data: bytes, metadata: Dict[str, Any]):
+        if len(image_data) > self.memory_max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key)[0])
+        self._memory[key] = (image_data, metadata)
+        self._memory_bytes += len(image_data)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[Tuple[bytes, Dict[str, Any]]]:
+        """(이미지 바이트, 메타데이터) 반환, 없으면 None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry
+
+        record = self.store.result(key)
+        image_data = None
+        if record is not None:
+            try:
+                with open(record["path"], 'rb') as f:
+                    image_data = f.read()
+            except OSError:
+                pass
+
+        with self._lock:
+            if image_data is None:
+                self.misses += 1
+                return None
+            self._remember(key, image_data, record["metadata"])
+            self.disk_hits += 1
+        return image_data, record["metadata"]
+
+    def put(self, key: str, digest: str, image_data: bytes, metadata: Dict[str, Any]):
+        """저장소에 이미 저장한 이미지 (digest) 를 결과로 기록"""
+        self.store.put_result(key, digest, metadata)
+        with self._lock:
+            self._remember(key, image_data, metadata)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes
+        }
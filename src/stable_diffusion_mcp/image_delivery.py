@@ -0,0 +1,126 @@
+"""
+생성 이미지 파일 전송
+- GET /images/{id} 용 스트리밍 응답 (청크 단위로 읽어 메모리에 파일 전체를 올리지 않음)
+- ETag / If-None-Match 조건부 요청 (304)
+- 단일 Range 요청 (206 / 416), 다중 범위는 전체 응답으로 대체
+- multipart/mixed 응답 본문 생성 (JSON 메타데이터 + 이미지 바이너리)
+"""
+
+import os
+import re
+import json
+import uuid
+import hashlib
+import mimetypes
+from typing import Dict, Iterator, Optional, Tuple
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+IMAGE_ID_PATTERN = re.compile(r'^[A-Za-z0-9_\-]+$')
+CACHE_CONTROL = "public, max-age=86400"
+
+class RangeNotSatisfiable(Exception):
+    """요청한 바이트 범위가 파일 크기를 벗어남"""
+
+def find_image(directory: str, image_id: str) -> Optional[str]:
+    """id 에 해당하는 이미지 파일 경로 (디렉토리 밖 경로나 없는 파일이면 None)"""
+    if not IMAGE_ID_PATTERN.match(image_id):
+        return None
+    for extension in ('.png', '.jpg', '.jpeg', '.webp'):
+        path = os.path.join(directory, image_id + extension)
+        if os.path.isfile(path):
+            return path
+    return None
+
+def file_etag(stat: os.stat_result) -> str:
+    """파일 크기와 수정 시각 기반 ETag (파일을 다시 읽지 않음)"""
+    token = f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+    return '"' + hashlib.md5(token.encode()).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Range 헤더 해석 → (시작, 끝) 포함 범위
+    헤더가 없거나, 형식이 틀리거나, 다중 범위면 None (전체 응답)
+    """
+    if not header or not header.startswith('bytes='):
+        return None
+    spec = header[len('bytes='):].strip()
+    if ',' in spec or '-' not in spec:
+        return None
+    start_text, end_text = (part.strip() for part in spec.split('-', 1))
+    try:
+        if start_text == '':
+            # 접미사 범위: 마지막 N 바이트
+            length = int(end_text)
+            if length <= 0:
+                raise RangeNotSatisfiable()
+            return max(size - length, 0), size - 1
+        start = int(start_text)
+        end = int(end_text) if end_text else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+def iter_file(path: str, start: int, length: int) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def image_file_response(path: str, headers: Dict[str, str]) -> Response:
+    """조건부/부분 요청을 처리한 이미지 파일 스트리밍 응답"""
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = file_etag(stat)
+    media_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    base_headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": CACHE_CONTROL}
+
+    if etag_matches(headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=base_headers)
+
+    try:
+        byte_range = parse_range(headers.get('range'), size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers=dict(base_headers, **{"Content-Range": f"bytes */{size}"}))
+
+    if byte_range is None:
+        return StreamingResponse(iter_file(path, 0, size), media_type=media_type,
+                                 headers=dict(base_headers, **{"Content-Length": str(size)}))
+
+    start, end = byte_range
+    length = end - start + 1
+    return StreamingResponse(iter_file(path, start, length), status_code=206, media_type=media_type,
+                             headers=dict(base_headers, **{
+                                 "Content-Length": str(length),
+                                 "Content-Range": f"bytes {start}-{end}/{size}"
+                             }))
+
+def wants_multipart(accept: Optional[str]) -> bool:
+    return bool(accept) and 'multipart/mixed' in accept
+
+def multipart_response(metadata: dict, image_data: bytes, media_type: str = 'image/png') -> Response:
+    """JSON 응답 본문과 이미지 바이너리를 multipart/mixed 한 번에 전송 (base64 없이)"""
+    boundary = uuid.uuid4().hex
+    body = b''.join([
+        f"--{boundary}\r\nContent-Type: application/json\r\n\r\n".encode(),
+        json.dumps(metadata, ensure_ascii=False).encode('utf-8'),
+        f"\r\n--{boundary}\r\nContent-Type: {media_type}\r\n"
+        f"Content-Length: {len(image_data)}\r\n\r\n".encode(),
+        image_data,
+        f"\r\n--{boundary}--\r\n".encode()
+    ])
+    return Response(content=body, media_type=f"multipart/mixed; boundary={boundary}")
@@ -0,0 +1,15 @@
+"""
+생성 이미지 바이트 저장/인코딩 유틸리티 (구현은 mcp_common.image_io, 도구가 서버 패키지 없이 쓸 수 있도록 분리)
+"""
+
+try:
+    # uvicorn src.stable_diffusion_mcp:app 로 실행하면 mcp_common 은 src 패키지 아래에 있음
+    from ..mcp_common.image_io import (
+        DEFAULT_FORMAT, DEFAULT_PNG_COMPRESS_LEVEL, DEFAULT_QUALITY, EXTENSIONS, IMAGE_FORMATS, MEDIA_TYPES,
+        detect_format, encode_image, output_options, to_format, write_image_bytes
+    )
+except ImportError:
+    from mcp_common.image_io import (
+        DEFAULT_FORMAT, DEFAULT_PNG_COMPRESS_LEVEL, DEFAULT_QUALITY, EXTENSIONS, IMAGE_FORMATS, MEDIA_TYPES,
+        detect_format, encode_image, output_options, to_format, write_image_bytes
+    )
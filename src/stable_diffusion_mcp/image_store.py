@@ -0,0 +1,9 @@
+"""
+생성 이미지 저장소 (구현은 mcp_common.image_store, 목업/Blender 도구가 서버 패키지 없이 쓸 수 있도록 분리)
+"""
+
+try:
+    # uvicorn src.stable_diffusion_mcp:app 로 실행하면 mcp_common 은 src 패키지 아래에 있음
+    from ..mcp_common.image_store import INDEX_FILE, STATS_TTL, STORE_DIR, ImageStore, content_digest
+except ImportError:
+    from mcp_common.image_store import INDEX_FILE, STATS_TTL, STORE_DIR, ImageStore, content_digest
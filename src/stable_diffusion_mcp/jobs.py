@@ -0,0 +1,165 @@
+"""
+비동기 이미지 생성 작업 저장소
+- POST /jobs 로 만든 작업의 상태/진행률/결과를 프로세스 메모리에 보관
+- 끝난 작업은 TTL 이 지나면 축출
+- 진행 이벤트는 구독자 (SSE 스트림) 에게 전달, 추론 스레드에서도 안전하게 발행 가능
+- 디노이징 미리보기는 최신 한 장만 보관하고 이벤트로도 발행 (base64)
+- 취소하면 실행 중인 작업 태스크를 취소 (로컬 배치는 기다리는 요청이 모두 떠나면 다음 스텝에서 중단)
+"""
+
+import os
+import time
+import uuid
+import base64
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+JOB_TTL_SECONDS = float(os.getenv('SD_JOB_TTL_SECONDS', '3600'))
+JOB_MAX_ENTRIES = int(os.getenv('SD_JOB_MAX_ENTRIES', '1000'))
+
+class Job:
+    """이미지 생성 작업 하나의 상태"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    TERMINAL = (SUCCEEDED, FAILED, CANCELLED)
+
+    def __init__(self, request: Dict[str, Any], loop: asyncio.AbstractEventLoop):
+        self.id = uuid.uuid4().hex
+        self.request = request
+        self.status = self.QUEUED
+        self.progress = {"step": 0, "total": request.get("num_inference_steps")}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.preview: Optional[bytes] = None
+        self.preview_step = 0
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.task: Optional[asyncio.Task] = None
+        self._loop = loop
+        self._subscribers = set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in self.TERMINAL
+
+    def _broadcast(self, event: Dict[str, Any]):
+        self.updated_at = time.time()
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def publish(self, event: Dict[str, Any]):
+        """구독자에게 이벤트 전달 (다른 스레드에서 호출해도 안전)"""
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._broadcast(event)
+        else:
+            self._loop.call_soon_threadsafe(self._broadcast, event)
+
+    def set_status(self, status: str):
+        self.status = status
+        self.publish({"type": "status", "status": status})
+
+    def report_progress(self, step: int, total: int, preview: Optional[bytes] = None):
+        """디노이징 스텝 콜백 (추론 스레드에서 호출됨), 미리보기 스텝이면 preview 이미지 바이트도 받음"""
+        self.progress = {"step": step, "total": total}
+        self.publish({"type": "progress", "step": step, "total": total})
+        if preview is not None:
+            self.preview = preview
+            self.preview_step = step
+            self.publish({"type": "preview", "step": step, "total": total,
+                          "image_base64": base64.b64encode(preview).decode()})
+
+    def succeed(self, result: Dict[str, Any]):
+        self.result = result
+        self.status = self.SUCCEEDED
+        self.publish({"type": "result", "status": self.status, "result": result})
+
+    def fail(self, error: str):
+        self.error = error
+        self.status = self.FAILED
+        self.publish({"type": "error", "status": self.status, "error": error})
+
+    def cancel(self) -> bool:
+        """실행 중/대기 중인 작업 취소 (이미 끝났으면 False)"""
+        if self.finished:
+            return False
+        self.mark_cancelled()
+        if self.task is not None:
+            self.task.cancel()
+        return True
+
+    def mark_cancelled(self):
+        if self.finished:
+            return
+        self.status = self.CANCELLED
+        self.publish({"type": "cancelled", "status": self.status})
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+class JobStore:
+    """작업 보관소 (끝난 작업은 TTL 이후, 또는 개수 초과 시 오래된 것부터 축출)"""
+
+    def __init__(self, ttl: float = JOB_TTL_SECONDS, max_entries: int = JOB_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.created = 0
+        self.evicted = 0
+
+    def create(self, request: Dict[str, Any]) -> Job:
+        self.evict_expired()
+        job = Job(request, asyncio.get_running_loop())
+        self._jobs[job.id] = job
+        self.created += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.evict_expired()
+        return self._jobs.get(job_id)
+
+    def evict_expired(self):
+        now = time.time()
+        finished = [job for job in self._jobs.values() if job.finished]
+        overflow = len(self._jobs) - self.max_entries
+        for job in finished:
+            if now - job.updated_at >= self.ttl or overflow > 0:
+                del self._jobs[job.id]
+                self.evicted += 1
+                overflow -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "jobs": len(self._jobs),
+            "by_status": counts,
+            "created": self.created,
+            "evicted": self.evicted,
+            "ttl_seconds": self.ttl
+        }
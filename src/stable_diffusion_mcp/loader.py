@@ -0,0 +1,105 @@
+"""
+로컬 파이프라인 지연/백그라운드 로딩
+- torch/diffusers 임포트와 모델 로드를 별도 스레드에서 실행해 서버 시작을 막지 않음
+- 로딩 단계와 경과 시간을 보고 (/ready 준비 상태 확인용)
+
+로딩 모드 (SD_PIPELINE_LOAD):
+- background: 시작 직후 백그라운드 스레드에서 로드 (기본값)
+- lazy: 첫 로컬 생성 요청 때 로드
+- eager: 시작 이벤트에서 로드가 끝날 때까지 대기 (이전 동작)
+- off: 로컬 파이프라인 사용 안 함
+"""
+
+import os
+import time
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+PIPELINE_LOAD_MODE = os.getenv('SD_PIPELINE_LOAD', 'background')
+LOAD_MODES = ('background', 'lazy', 'eager', 'off')
+
+class PipelineLoader:
+    """load_fn(report_stage) 를 한 번만 백그라운드 스레드에서 실행하고 상태를 추적"""
+
+    NOT_STARTED = 'not_started'
+    LOADING = 'loading'
+    READY = 'ready'
+    FAILED = 'failed'
+    DISABLED = 'disabled'
+
+    def __init__(self, load_fn: Callable[[Callable[[str], None]], bool],
+                 mode: str = PIPELINE_LOAD_MODE):
+        if mode not in LOAD_MODES:
+            raise ValueError(f"지원하지 않는 로딩 모드: {mode}")
+        self.load_fn = load_fn
+        self.mode = mode
+        self.status = self.DISABLED if mode == 'off' else self.NOT_STARTED
+        self.stage: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self._future: Optional[Future] = None
+
+    def report_stage(self, stage: str):
+        self.stage = stage
+        print(f"⏳ 파이프라인 로딩: {stage}")
+
+    def _run(self) -> bool:
+        try:
+            ok = self.load_fn(self.report_stage)
+            if not ok:
+                self.error = self.error or "파이프라인 초기화 실패"
+            return ok
+        except Exception as e:
+            self.error = str(e)
+            return False
+        finally:
+            self.finished_at = time.perf_counter()
+
+    def _done(self, future: Future):
+        self.status = self.READY if future.result() else self.FAILED
+        if self.status == self.FAILED:
+            print("경고: Stable Diffusion 파이프라인 초기화 실패. 더미 모드로 실행됩니다.")
+
+    def start(self) -> Optional[Future]:
+        """로딩 시작 (이미 시작했으면 기존 future 반환)"""
+        if self.status == self.DISABLED:
+            return None
+        if self._future is None:
+            self.status = self.LOADING
+            self.started_at = time.perf_counter()
+            pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sd-loader')
+            self._future = pool.submit(self._run)
+            self._future.add_done_callback(self._done)
+            pool.shutdown(wait=False)
+        return self._future
+
+    async def wait(self) -> bool:
+        """로딩을 (필요하면 시작하고) 끝날 때까지 기다림"""
+        future = self.start()
+        if future is None:
+            return False
+        return await asyncio.wrap_future(future)
+
+    def can_load_on_demand(self) -> bool:
+        """lazy 모드에서 아직 실패하지 않았으면 첫 요청 때 로드 가능"""
+        return self.mode == 'lazy' and self.status in (self.NOT_STARTED, self.LOADING)
+
+    def is_settled(self) -> bool:
+        """더 이상 로딩 중인 작업이 없음 (준비 완료, 실패, 비활성 또는 lazy 대기)"""
+        if self.status == self.NOT_STARTED:
+            return self.mode == 'lazy'
+        return self.status != self.LOADING
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.perf_counter()) - self.started_at, 2)
+        return {
+            "mode": self.mode,
+            "status": self.status,
+            "stage": self.stage,
+            "elapsed_seconds": elapsed,
+            "error": self.error
+        }
@@ -0,0 +1,273 @@
+"""
+해상도 기반 피크 메모리 추정과 메모리 예산 입장 제어
+- 추정: UNet 활성값 (잠재 픽셀 × CFG 배치) 과 VAE 디코드 (출력 픽셀) 중 큰 쪽
+  VAE 디코드가 큰 해상도에서 지배적이다 (SD VAE 실측: 출력 픽셀당 약 3.9KB, 1024x1024 에서 약 4GB)
+- 임계 픽셀 수 (SD_VAE_TILING_MIN_PIXELS) 를 넘으면 VAE 타일링, 배치가 2 이상이면 슬라이싱을 자동으로 켬
+  → 디코드 피크가 타일 한 장 / 이미지 한 장 크기로 제한됨
+- 메모리 예산 (SD_MEMORY_BUDGET_MB, 기본은 전체 메모리의 60%) 안에서만 배치를 실행하고
+  자리가 나지 않으면 SD_MEMORY_ADMIT_TIMEOUT 초 후 429 로 거절
+- 배치마다 실제 피크 RSS 증가량을 기록하고, 추정 대비 비율로 추정기를 보정
+"""
+
+import os
+import math
+import time
+import asyncio
+import threading
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .executor import QueueFullError
+
+UNET_BYTES_PER_LATENT_PX = float(os.getenv('SD_MEM_UNET_KB_PER_LATENT_PX', '150')) * 1024
+VAE_BYTES_PER_PX = float(os.getenv('SD_MEM_VAE_KB_PER_PX', '3.9')) * 1024
+VAE_TILE_SIZE = int(os.getenv('SD_VAE_TILE_SIZE', '768'))  # SD 2.1 VAE sample_size (타일 한 변)
+VAE_TILING_MIN_PIXELS = int(os.getenv('SD_VAE_TILING_MIN_PIXELS', str(768 * 768)))
+CALIBRATION_MIN_SAMPLES = int(os.getenv('SD_MEM_CALIBRATION_MIN_SAMPLES', '5'))
+MEMORY_ADMIT_TIMEOUT = float(os.getenv('SD_MEMORY_ADMIT_TIMEOUT', '120'))
+
+def _total_memory() -> int:
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return 0
+
+def _budget_from_env() -> int:
+    value = os.getenv('SD_MEMORY_BUDGET_MB', 'auto')
+    if value == 'auto':
+        return int(_total_memory() * 0.6)
+    return int(float(value) * 1024 * 1024)  # 0 이면 입장 제어 없음
+
+MEMORY_BUDGET_BYTES = _budget_from_env()
+
+def current_rss() -> int:
+    """현재 프로세스 RSS (바이트, /proc 가 없으면 0)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+class MemoryAdmissionError(QueueFullError):
+    """메모리 예산 안에 자리가 나지 않아 거절 (QueueFullError 와 같이 429 로 처리)"""
+
+    def __init__(self, retry_after: int, needed: int):
+        super().__init__(retry_after)
+        self.args = (f"메모리 예산 초과 (필요 {needed / 1024 / 1024:.0f}MB) - {retry_after}초 후 재시도",)
+
+class MemoryEstimator:
+    """배치 피크 메모리 추정 (활성값 기준, 모델 가중치는 제외) 과 실측 기반 보정"""
+
+    def __init__(self, unet_bytes_per_latent_px: float = UNET_BYTES_PER_LATENT_PX,
+                 vae_bytes_per_px: float = VAE_BYTES_PER_PX,
+                 tile_size: int = VAE_TILE_SIZE,
+                 tiling_min_pixels: int = VAE_TILING_MIN_PIXELS,
+                 calibration_min_samples: int = CALIBRATION_MIN_SAMPLES,
+                 max_samples: int = 200):
+        self.unet_bytes_per_latent_px = unet_bytes_per_latent_px
+        self.vae_bytes_per_px = vae_bytes_per_px
+        self.tile_size = tile_size
+        self.tiling_min_pixels = tiling_min_pixels
+        self.calibration_min_samples = calibration_min_samples
+        self.samples: Deque[Dict[str, Any]] = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def vae_options(self, width: int, height: int, batch: int) -> Tuple[bool, bool]:
+        """(타일링, 슬라이싱) 자동 결정"""
+        tiling = width * height > self.tiling_min_pixels
+        slicing = batch > 1 and width * height * batch > self.tiling_min_pixels
+        return tiling, slicing
+
+    def raw_estimate(self, width: int, height: int, batch: int) -> int:
+        """보정 전 추정 피크 (바이트)"""
+        tiling, slicing = self.vae_options(width, height, batch)
+        latent_px = (width // 8) * (height // 8)
+        unet = self.unet_bytes_per_latent_px * latent_px * batch * 2  # classifier-free guidance
+        decoded_px = min(width * height, self.tile_size ** 2) if tiling else width * height
+        vae = self.vae_bytes_per_px * decoded_px * (1 if slicing else batch)
+        return int(max(unet, vae))
+
+    def scale(self) -> float:
+        """실측/추정 비율의 90분위 (표본이 적으면 1.0, 0.5~4 로 제한)"""
+        with self._lock:
+            ratios = sorted(s["ratio"] for s in self.samples if s["ratio"] is not None)
+        if len(ratios) < self.calibration_min_samples:
+            return 1.0
+        p90 = ratios[min(len(ratios) - 1, math.ceil(0.9 * len(ratios)) - 1)]
+        return min(4.0, max(0.5, p90))
+
+    def estimate(self, width: int, height: int, batch: int) -> int:
+        return int(self.raw_estimate(width, height, batch) * self.scale())
+
+    def record(self, width: int, height: int, batch: int, peak_bytes: int, seconds: float):
+        """배치 한 번의 실측 피크 RSS 증가량 기록"""
+        raw = self.raw_estimate(width, height, batch)
+        tiling, slicing = self.vae_options(width, height, batch)
+        with self._lock:
+            self.samples.append({
+                "resolution": f"{width}x{height}",
+                "batch": batch,
+                "vae_tiling": tiling,
+                "vae_slicing": slicing,
+                "estimated_mb": round(raw / 1024 / 1024, 1),
+                "peak_rss_mb": round(peak_bytes / 1024 / 1024, 1),
+                "ratio": round(peak_bytes / raw, 3) if raw and peak_bytes else None,
+                "seconds": round(seconds, 3),
+                "at": time.time()
+            })
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            recent: List[Dict[str, Any]] = list(self.samples)[-10:]
+            count = len(self.samples)
+        return {
+            "unet_kb_per_latent_px": self.unet_bytes_per_latent_px / 1024,
+            "vae_kb_per_px": self.vae_bytes_per_px / 1024,
+            "vae_tile_size": self.tile_size,
+            "vae_tiling_min_pixels": self.tiling_min_pixels,
+            "calibration_scale": self.scale(),
+            "samples": count,
+            "recent": recent
+        }
+
+class PeakRSSSampler:
+    """블록 실행 동안 RSS 를 주기적으로 읽어 시작 대비 최대 증가량을 측정"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.baseline = 0
+        self.peak = 0
+        self.seconds = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        self.baseline = self.peak = current_rss()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._poll, name='rss-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+        self.seconds = time.perf_counter() - self._started
+
+    @property
+    def delta(self) -> int:
+        return max(0, self.peak - self.baseline)
+
+class VAEModeGate:
+    """
+    VAE 타일링/슬라이싱 설정 전환 게이트
+    VAE 모듈은 스케줄러 뷰/배치 사이에 공유되므로, 다른 설정으로 실행 중인 배치가 있으면 끝날 때까지 기다린다.
+    실행 중 카운터와 설정은 VAE 인스턴스별로 관리 (다른 모델의 VAE 는 서로 기다리지 않음)
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        # VAE → [타일링, 슬라이싱, 실행 중인 배치 수]
+        self._states: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+    @contextmanager
+    def use(self, pipe, tiling: bool, slicing: bool):
+        vae = getattr(pipe, 'vae', None)
+        if vae is None or not hasattr(vae, 'use_tiling'):
+            yield
+            return
+        with self._cond:
+            state = self._states.setdefault(vae, [tiling, slicing, 0])
+            self._cond.wait_for(lambda: state[2] == 0 or state[:2] == [tiling, slicing])
+            if state[2] == 0:
+                vae.use_tiling = tiling
+                vae.use_slicing = slicing
+                state[:2] = [tiling, slicing]
+            state[2] += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                state[2] -= 1
+                self._cond.notify_all()
+
+class MemoryAdmission:
+    """메모리 예산 입장 제어 (요청 순서대로 입장, 예산보다 큰 배치는 혼자일 때 실행)"""
+
+    def __init__(self, budget_bytes: int = MEMORY_BUDGET_BYTES, timeout: float = MEMORY_ADMIT_TIMEOUT):
+        self.budget_bytes = budget_bytes
+        self.timeout = timeout
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.admitted = 0
+        self.waited = 0
+        self.rejected = 0
+        self._waiters: Deque[Tuple[int, asyncio.Future]] = deque()
+
+    def _fits(self, nbytes: int) -> bool:
+        return self.in_use == 0 or self.in_use + nbytes <= self.budget_bytes
+
+    def _grant(self, nbytes: int):
+        self.in_use += nbytes
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        self.admitted += 1
+
+    def _wake(self):
+        while self._waiters:
+            nbytes, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if not self._fits(nbytes):
+                break
+            self._waiters.popleft()
+            self._grant(nbytes)
+            future.set_result(None)
+
+    @asynccontextmanager
+    async def reserve(self, nbytes: int):
+        """nbytes 를 예산에서 잡고 블록이 끝나면 반환"""
+        if not self.budget_bytes:
+            yield
+            return
+        if not self._waiters and self._fits(nbytes):
+            self._grant(nbytes)
+        else:
+            future = asyncio.get_running_loop().create_future()
+            waiter = (nbytes, future)
+            self._waiters.append(waiter)
+            self.waited += 1
+            try:
+                await asyncio.wait_for(future, self.timeout)
+            except BaseException as e:
+                if future.done() and not future.cancelled():
+                    self.in_use -= nbytes  # 자리를 받은 직후 취소됨
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                self._wake()
+                if isinstance(e, asyncio.TimeoutError):
+                    self.rejected += 1
+                    raise MemoryAdmissionError(max(1, math.ceil(self.timeout / 4)), nbytes) from None
+                raise
+        try:
+            yield
+        finally:
+            self.in_use -= nbytes
+            self._wake()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budget_bytes": self.budget_bytes,
+            "in_use_bytes": self.in_use,
+            "peak_in_use_bytes": self.peak_in_use,
+            "waiting": sum(1 for _, f in self._waiters if not f.done()),
+            "admitted": self.admitted,
+            "waited": self.waited,
+            "rejected": self.rejected
+        }
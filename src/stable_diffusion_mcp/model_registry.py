@@ -0,0 +1,265 @@
+"""
+로컬 모델 레지스트리
+- 카탈로그 (SD_MODELS="별칭=모델 id,..."): 여러 체크포인트를 재시작 없이 요청별로 선택
+- 필요할 때 로드하고 메모리 예산 (SD_MODEL_MEMORY_MB) 안에서 상주, 넘으면 가장 오래 안 쓴 모델부터 축출
+- 기본 모델 (SD_DEFAULT_MODEL, 없으면 카탈로그의 첫 모델) 은 고정 상주 (축출하지 않음)
+- 가중치 파일이 같은 컴포넌트 (VAE, 텍스트 인코더) 는 이미 상주한 모듈을 넘겨 다시 로드하지 않고 공유
+- 모델별 로드 시간, 상주 여부, 메모리 사용량 보고
+"""
+
+import gc
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_MODELS = "sd21=stabilityai/stable-diffusion-2-1,sd15=stable-diffusion-v1-5/stable-diffusion-v1-5"
+MODEL_CATALOG_SPEC = os.getenv('SD_MODELS', DEFAULT_MODELS)
+DEFAULT_MODEL = os.getenv('SD_DEFAULT_MODEL')  # 없으면 카탈로그의 첫 모델
+MODEL_MEMORY_BYTES = int(float(os.getenv('SD_MODEL_MEMORY_MB', '12288')) * 1024 * 1024)
+
+# 모델 간에 공유할 수 있는 컴포넌트 (가중치 지문이 같을 때만)
+SHAREABLE_COMPONENTS = ('vae', 'text_encoder')
+
+# 컴포넌트 이름 → (가중치 지문, 파일 크기)
+ComponentFiles = Dict[str, Tuple[str, int]]
+
+def parse_model_catalog(spec: str) -> "OrderedDict[str, str]":
+    """'별칭=모델 id,...' 파싱 (별칭이 없으면 모델 id 의 마지막 부분을 별칭으로 사용)"""
+    catalog: "OrderedDict[str, str]" = OrderedDict()
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        alias, sep, model_id = item.partition('=')
+        if not sep:
+            model_id, alias = alias, alias.rsplit('/', 1)[-1]
+        catalog[alias.strip()] = model_id.strip()
+    return catalog
+
+def _file_fingerprint(path: str) -> str:
+    """허브 캐시 파일은 blob 이름 (LFS sha256) 을, 그 외에는 (실제 경로, 크기, 수정 시각) 을 지문으로 사용
+
+    로컬 디렉터리의 가중치를 매 로드마다 통째로 해시하면 GB 당 수 초가 걸리므로 내용은 읽지 않음
+    (같은 파일을 가리키는 심볼릭 링크는 공유되고, 다른 위치에 복사한 파일은 별개 컴포넌트로 취급)
+    """
+    real = os.path.realpath(path)
+    if real != os.path.abspath(path) and os.path.basename(os.path.dirname(real)) == 'blobs':
+        return os.path.basename(real)
+    stat = os.stat(real)
+    return hashlib.sha256(f"{real}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()
+
+def _weight_files(directory: str) -> List[str]:
+    """from_pretrained 가 기본 (variant 없음) 으로 읽는 가중치 파일"""
+    names = sorted(os.listdir(directory))
+    for suffix in ('.safetensors', '.bin'):
+        files = [n for n in names if n.endswith(suffix) and n.count('.') == 1]
+        if files:
+            return [os.path.join(directory, n) for n in files]
+    return []
+
+def snapshot_components(model_id: str) -> ComponentFiles:
+    """모델 스냅샷 (없으면 다운로드) 의 컴포넌트별 가중치 지문과 크기"""
+    from diffusers import DiffusionPipeline
+
+    root = model_id if os.path.isdir(model_id) else DiffusionPipeline.download(model_id)
+    components: ComponentFiles = {}
+    for name in sorted(os.listdir(root)):
+        directory = os.path.join(root, name)
+        if not os.path.isdir(directory):
+            continue
+        files = _weight_files(directory)
+        if files:
+            fingerprint = hashlib.sha256(
+                ','.join(_file_fingerprint(f) for f in files).encode()).hexdigest()
+            components[name] = (fingerprint, sum(os.path.getsize(f) for f in files))
+    return components
+
+def module_bytes(module) -> int:
+    """torch 모듈의 파라미터 + 버퍼 바이트 수 (모듈이 아니면 0)"""
+    if not hasattr(module, 'parameters'):
+        return 0
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.element_size() * t.nelement() for t in tensors)
+
+class ResidentModel:
+    """상주 중인 모델 하나"""
+
+    def __init__(self, alias: str, model_id: str, pipeline, files: ComponentFiles, load_seconds: float):
+        self.alias = alias
+        self.model_id = model_id
+        self.pipeline = pipeline
+        self.files = files
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.uses = 0
+        # 컴포넌트 이름 → (모듈 id, 바이트): 공유 모듈은 전체 합계에서 한 번만 센다
+        components = getattr(pipeline, 'components', {}) or {}
+        self.modules = {name: (id(module), module_bytes(module))
+                        for name, module in components.items() if module_bytes(module)}
+
+class ModelRegistry:
+    """
+    요청 시 모델을 로드하고 메모리 예산 안에서 LRU 로 상주시키는 레지스트리
+    load_fn(model_id, shared_components, report_stage) → 파이프라인 (블로킹, 추론/로더 스레드에서 호출)
+    inspect_fn(model_id) → 컴포넌트별 (가중치 지문, 크기) (로드 전에 공유 가능 여부와 필요 메모리 추정)
+    """
+
+    def __init__(self, load_fn: Callable[[str, Dict[str, Any], Callable[[str], None]], Any],
+                 catalog: Optional[Dict[str, str]] = None,
+                 default: Optional[str] = DEFAULT_MODEL,
+                 budget_bytes: int = MODEL_MEMORY_BYTES,
+                 inspect_fn: Callable[[str], ComponentFiles] = snapshot_components):
+        self.load_fn = load_fn
+        self.inspect_fn = inspect_fn
+        self.catalog = OrderedDict(catalog if catalog is not None else parse_model_catalog(MODEL_CATALOG_SPEC))
+        default = default or next(iter(self.catalog))
+        if default not in self.catalog:
+            raise ValueError(f"기본 모델 '{default}' 이 카탈로그에 없음: {list(self.catalog)}")
+        self.default = default
+        self.budget_bytes = budget_bytes
+        self._resident: "OrderedDict[str, ResidentModel]" = OrderedDict()  # LRU 순서 (앞이 가장 오래됨)
+        self._history: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # 로드는 한 번에 하나 (예산 계산이 겹치지 않도록)
+        self.evictions = 0
+
+    def resolve(self, name: Optional[str]) -> str:
+        """별칭 또는 모델 id → 별칭 (None 이면 기본 모델)"""
+        if name is None:
+            return self.default
+        if name in self.catalog:
+            return name
+        for alias, model_id in self.catalog.items():
+            if model_id == name:
+                return alias
+        raise ValueError(f"알 수 없는 모델: {name} (사용 가능: {', '.join(self.catalog)})")
+
+    def model_id(self, name: Optional[str]) -> str:
+        return self.catalog[self.resolve(name)]
+
+    def touch(self, name: Optional[str]):
+        """상주 모델 사용 기록 (LRU 순서 갱신)"""
+        alias = self.resolve(name)
+        with self._lock:
+            entry = self._resident.get(alias)
+            if entry is not None:
+                self._resident.move_to_end(alias)
+                entry.last_used = time.time()
+                entry.uses += 1
+
+    def get(self, name: Optional[str], report_stage: Callable[[str], None] = print):
+        """상주 중이면 바로 반환, 아니면 로드 (필요하면 다른 모델 축출)"""
+        alias = self.resolve(name)
+        self.touch(alias)
+        with self._lock:
+            if alias in self._resident:
+                return self._resident[alias].pipeline
+        with self._load_lock:
+            with self._lock:
+                if alias in self._resident:
+                    return self._resident[alias].pipeline
+            return self._load(alias, report_stage)
+
+    def _load(self, alias: str, report_stage: Callable[[str], None]):
+        model_id = self.catalog[alias]
+        started = time.perf_counter()
+        report_stage(f"{model_id} 파일 확인")
+        files = self.inspect_fn(model_id)
+
+        shared = self._shareable(files)
+        needed = sum(size for name, (_, size) in files.items() if name not in shared)
+        self._evict_until(needed, keep=alias)
+
+        report_stage(f"{model_id} 로드" + (f" (공유: {', '.join(sorted(shared))})" if shared else ""))
+        pipeline = self.load_fn(model_id, shared, report_stage)
+        entry = ResidentModel(alias, model_id, pipeline, files, round(time.perf_counter() - started, 3))
+        entry.uses = 1
+        with self._lock:
+            self._resident[alias] = entry
+            history = self._history.setdefault(alias, {"loads": 0})
+            history["loads"] += 1
+            history["last_load_seconds"] = entry.load_seconds
+        self._evict_until(0, keep=alias)
+        print(f"📦 모델 로드: {alias} ({model_id}) {entry.load_seconds:.1f}초")
+        return pipeline
+
+    def _shareable(self, files: ComponentFiles) -> Dict[str, Any]:
+        """가중치 지문이 같은 상주 컴포넌트"""
+        shared = {}
+        with self._lock:
+            for name in SHAREABLE_COMPONENTS:
+                if name not in files:
+                    continue
+                for entry in self._resident.values():
+                    module = getattr(entry.pipeline, name, None)
+                    if module is not None and entry.files.get(name, (None,))[0] == files[name][0]:
+                        shared[name] = module
+                        break
+        return shared
+
+    def _resident_bytes(self) -> int:
+        unique = {}
+        for entry in self._resident.values():
+            unique.update(entry.modules.values())
+        return sum(unique.values())
+
+    def _evict_until(self, extra: int, keep: str):
+        """상주 메모리 + extra 가 예산 안에 들어올 때까지 LRU 축출 (기본 모델과 keep 은 제외)"""
+        if not self.budget_bytes:
+            return
+        evicted = []
+        with self._lock:
+            while self._resident_bytes() + extra > self.budget_bytes:
+                victim = next((a for a in self._resident if a not in (keep, self.default)), None)
+                if victim is None:
+                    break
+                evicted.append(self._resident.pop(victim))
+                self.evictions += 1
+        if evicted:
+            for entry in evicted:
+                print(f"♻️ 모델 축출: {entry.alias} ({entry.model_id})")
+            evicted.clear()
+            gc.collect()  # 다른 모델과 공유하지 않는 모듈의 메모리를 바로 반환
+
+    def is_resident(self, name: Optional[str]) -> bool:
+        with self._lock:
+            return self.resolve(name) in self._resident
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            module_owners: Dict[int, int] = {}
+            for entry in self._resident.values():
+                for module_id, _ in entry.modules.values():
+                    module_owners[module_id] = module_owners.get(module_id, 0) + 1
+            models = {}
+            for alias, model_id in self.catalog.items():
+                entry = self._resident.get(alias)
+                history = self._history.get(alias, {})
+                info = {
+                    "model_id": model_id,
+                    "resident": entry is not None,
+                    "default": alias == self.default,
+                    "loads": history.get("loads", 0),
+                    "load_seconds": history.get("last_load_seconds")
+                }
+                if entry is not None:
+                    info.update({
+                        "bytes": sum(size for _, size in entry.modules.values()),
+                        "shared_components": sorted(name for name, (module_id, _) in entry.modules.items()
+                                                    if module_owners[module_id] > 1),
+                        "uses": entry.uses,
+                        "last_used": entry.last_used
+                    })
+                models[alias] = info
+            return {
+                "default": self.default,
+                "budget_bytes": self.budget_bytes,
+                "resident_bytes": self._resident_bytes(),
+                "resident": list(self._resident),
+                "evictions": self.evictions,
+                "models": models
+            }
@@ -0,0 +1,41 @@
+"""
+디노이징 중간 미리보기
+중간 잠재값 (4채널, 출력의 1/8 해상도) 을 VAE 디코드 없이 고정 선형 투영으로 RGB 로 근사한다.
+- SD 1.x/2.x VAE 잠재 공간의 채널 → RGB 계수 (잠재값과 디코드 결과의 최소제곱 근사)
+- 행렬곱 한 번이라 VAE 디코드 (수 초) 대신 수 ms, 1024x1024 요청이면 128x128 미리보기
+- 미리보기는 작은 jpeg 로 인코딩해서 진행률 콜백의 preview 인자로 전달
+"""
+
+import os
+from typing import Any
+
+from PIL import Image
+
+from .image_io import encode_image
+
+PREVIEW_FORMAT = os.getenv('SD_PREVIEW_FORMAT', 'jpeg')
+PREVIEW_QUALITY = int(os.getenv('SD_PREVIEW_QUALITY', '70'))
+
+# 잠재 채널별 (R, G, B) 기여도
+LATENT_RGB_FACTORS = [
+    [0.298, 0.207, 0.208],
+    [0.187, 0.286, 0.173],
+    [-0.158, 0.189, 0.264],
+    [-0.184, -0.271, -0.473],
+]
+
+def latents_to_image(latents: Any) -> Image.Image:
+    """잠재값 하나 (C, H, W) → 근사 RGB 이미지 (H, W)"""
+    import torch
+
+    factors = torch.tensor(LATENT_RGB_FACTORS, dtype=torch.float32)
+    rgb = torch.einsum('chw,cr->hwr', latents.detach().float().cpu()[:factors.shape[0]], factors)
+    pixels = ((rgb + 1) * 127.5).clamp(0, 255).to(torch.uint8).numpy()
+    return Image.fromarray(pixels, 'RGB')
+
+def encode_preview(latents: Any) -> bytes:
+    return encode_image(latents_to_image(latents), PREVIEW_FORMAT, quality=PREVIEW_QUALITY)
+
+def preview_due(step: int, total: int, every: int) -> bool:
+    """every 스텝마다 미리보기 (마지막 스텝은 최종 이미지가 대신함)"""
+    return every > 0 and step % every == 0 and step < total
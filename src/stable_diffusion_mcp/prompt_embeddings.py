@@ -0,0 +1,83 @@
+"""
+텍스트 인코더 (CLIP) 프롬프트 임베딩 LRU 캐시
+- 키: (모델 id, 토크나이즈된 토큰 id 열) — 공백 차이나 77 토큰 이후 잘린 부분은 같은 키
+- 값: pipeline.encode_prompt 로 만든 prompt_embeds 텐서 (파이프라인 dtype/디바이스)
+- 같은 프롬프트를 여러 시드로 돌리는 작업에서 텍스트 인코더 재실행을 생략
+- 항목 수/메모리 용량 기준 축출, 적중률과 메모리 사용량 보고
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+EMBED_CACHE_ENTRIES = int(os.getenv('SD_EMBED_CACHE_ENTRIES', '256'))
+EMBED_CACHE_BYTES = int(float(os.getenv('SD_EMBED_CACHE_MB', '64')) * 1024 * 1024)
+
+def _tensor_bytes(tensor) -> int:
+    return tensor.element_size() * tensor.nelement()
+
+class PromptEmbeddingCache:
+    """(모델 id, 토큰 id 열) → prompt_embeds LRU 캐시 (추론 스레드 간 공유)"""
+
+    def __init__(self, max_entries: int = EMBED_CACHE_ENTRIES, max_bytes: int = EMBED_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(pipe, model_id: str, text: str) -> Tuple[str, Tuple[int, ...]]:
+        """파이프라인 토크나이저로 토큰화한 결과를 키로 사용"""
+        tokenizer = pipe.tokenizer
+        input_ids = tokenizer(text, padding="max_length", max_length=tokenizer.model_max_length,
+                              truncation=True).input_ids
+        return model_id, tuple(input_ids)
+
+    def encode(self, pipe, model_id: str, text: str):
+        """캐시된 임베딩 반환, 없으면 텍스트 인코더를 실행해 저장 ([1, 토큰 수, 차원])"""
+        import torch
+
+        key = self.key(pipe, model_id, text)
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        with torch.no_grad():
+            embeds, _ = pipe.encode_prompt(text, pipe._execution_device, 1, False)
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = embeds
+                self._bytes += _tensor_bytes(embeds)
+                self._evict()
+        return embeds
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= _tensor_bytes(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None
+        }
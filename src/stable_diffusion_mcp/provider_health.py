@@ -0,0 +1,182 @@
+"""
+이미지 프로바이더 상태 추적
+- 프로바이더별 지연 시간 분위수 (헤징 지연 자동 산정용)
+- 서킷 브레이커 (closed → open → half_open) 와 상태 점수
+stable_diffusion_mcp 앱과 CloudImageGenerator 가 같은 레지스트리를 공유한다.
+"""
+
+import os
+import math
+import time
+import asyncio
+from collections import deque
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+BREAKER_WINDOW = int(os.getenv('SD_BREAKER_WINDOW', '20'))
+BREAKER_MIN_CALLS = int(os.getenv('SD_BREAKER_MIN_CALLS', '5'))
+BREAKER_ERROR_RATE = float(os.getenv('SD_BREAKER_ERROR_RATE', '0.5'))
+BREAKER_OPEN_SECONDS = float(os.getenv('SD_BREAKER_OPEN_SECONDS', '30'))
+BREAKER_LATENCY_BUDGET = float(os.getenv('SD_BREAKER_LATENCY_BUDGET', '10'))
+
+class LatencyTracker:
+    """최근 성공 호출의 지연 시간을 고정 크기 윈도우로 보관"""
+
+    def __init__(self, window: int = 100):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """q (0~1) 분위수, 샘플이 없으면 None"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+        return ordered[index]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "count": len(self.samples),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95)
+        }
+
+class CircuitOpenError(Exception):
+    """서킷이 열려 있어 프로바이더 호출을 건너뜀"""
+
+class Backpressure(Exception):
+    """서버 과부하로 호출을 거절함 (프로바이더 실패로 집계하지 않음)"""
+
+class CircuitBreaker:
+    """최근 호출의 오류율로 프로바이더를 차단하고 주기적으로 재시도"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, window: int = BREAKER_WINDOW,
+                 min_calls: int = BREAKER_MIN_CALLS,
+                 error_rate_threshold: float = BREAKER_ERROR_RATE,
+                 open_seconds: float = BREAKER_OPEN_SECONDS,
+                 latency_budget: float = BREAKER_LATENCY_BUDGET,
+                 half_open_max_calls: int = 1,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.open_seconds = open_seconds
+        self.latency_budget = latency_budget
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+        self.outcomes = deque(maxlen=window)  # True = 성공
+        self.latency = LatencyTracker()
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self.times_opened = 0
+        self.skipped = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and self.clock() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._probes_in_flight = 0
+        return self._state
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def health_score(self) -> float:
+        """0~1 점수: 성공률 × 지연 점수 (p95 가 지연 예산 이내면 1)"""
+        p95 = self.latency.percentile(0.95)
+        latency_score = 1.0 if not p95 else min(1.0, self.latency_budget / p95)
+        return round((1.0 - self.error_rate()) * latency_score, 3)
+
+    def allow_request(self) -> bool:
+        """호출 가능 여부 (half_open 에서는 제한된 수의 탐색 호출만 허용)"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._probes_in_flight < self.half_open_max_calls:
+            self._probes_in_flight += 1
+            return True
+        self.skipped += 1
+        return False
+
+    def _trip(self):
+        self._state = self.OPEN
+        self._opened_at = self.clock()
+        self._probes_in_flight = 0
+        self.times_opened += 1
+        print(f"⛔ {self.name} 서킷 열림 (오류율 {self.error_rate():.0%})")
+
+    def record_success(self, seconds: float):
+        self.outcomes.append(True)
+        self.latency.record(seconds)
+        if self._state == self.HALF_OPEN:
+            self._state = self.CLOSED
+            self._probes_in_flight = 0
+            self.outcomes.clear()
+            self.outcomes.append(True)
+            print(f"✅ {self.name} 서킷 닫힘 (복구)")
+
+    def record_failure(self):
+        self.outcomes.append(False)
+        if self._state == self.HALF_OPEN:
+            self._trip()
+        elif (self._state == self.CLOSED and len(self.outcomes) >= self.min_calls
+              and self.error_rate() >= self.error_rate_threshold):
+            self._trip()
+
+    def release(self):
+        """결과 없이 끝난 호출 (취소) 의 탐색 슬롯 반환"""
+        if self._state == self.HALF_OPEN and self._probes_in_flight > 0:
+            self._probes_in_flight -= 1
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """브레이커를 거쳐 프로바이더 호출, 결과와 지연을 기록"""
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} 서킷 열림 - 호출 건너뜀")
+        started = time.perf_counter()
+        try:
+            result = await func(*args, **kwargs)
+        except (asyncio.CancelledError, Backpressure):
+            self.release()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success(time.perf_counter() - started)
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate(), 3),
+            "calls": len(self.outcomes),
+            "health_score": self.health_score(),
+            "latency": self.latency.stats(),
+            "times_opened": self.times_opened,
+            "skipped": self.skipped
+        }
+
+class ProviderHealthRegistry:
+    """프로바이더 이름별 서킷 브레이커 모음"""
+
+    def __init__(self, **breaker_options):
+        self.breaker_options = breaker_options
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        if name not in self.breakers:
+            self.breakers[name] = CircuitBreaker(name, **self.breaker_options)
+        return self.breakers[name]
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {name: breaker.snapshot() for name, breaker in self.breakers.items()}
+
+# 앱과 CloudImageGenerator 가 공유하는 기본 레지스트리
+provider_registry = ProviderHealthRegistry()
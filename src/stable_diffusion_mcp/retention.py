@@ -0,0 +1,60 @@
+"""
+생성 이미지 보존 정책과 백그라운드 GC
+- 정책/GC 는 mcp_common.retention 공용 구현, 설정은 SD_ 접두사 환경 변수
+  (SD_GC_MAX_MB, SD_GC_MAX_AGE_HOURS, SD_GC_KEEP_LAST, SD_GC_INTERVAL_SECONDS)
+- 수집 단위는 저장소 인덱스의 해시 (접근 시각은 인덱스의 accessed_at)
+- 저장소 루트에 남은 이전 버전의 평면 파일 (robot_<provider>_<timestamp>.png 등) 도 같은 예산으로 수집
+  (인덱스에 없으므로 파일 mtime/atime 기준, GET /images/{파일 이름} 으로 계속 제공되다가 축출됨)
+- 결과 캐시 (image_cache) 는 따로 파일을 두지 않고 저장소 해시를 가리키므로,
+  파일이 수집되면 ImageStore.remove 가 해당 결과 기록도 지움
+- 기본값은 제한 없음 (옵트인), SD_GC_MAX_MB 또는 SD_GC_MAX_AGE_HOURS 를 지정해야 수집 시작
+"""
+
+import os
+from typing import Callable, List, Tuple
+
+try:
+    # uvicorn src.<서버>:app 로 실행하면 mcp_common 은 src 패키지 아래에 있음
+    from ..mcp_common.retention import GarbageCollector, RetentionEntry, RetentionPolicy, gc_interval
+except ImportError:
+    # src/ 가 sys.path 에 있을 때 (테스트, tools)
+    from mcp_common.retention import GarbageCollector, RetentionEntry, RetentionPolicy, gc_interval
+
+ENV_PREFIX = 'SD'
+
+LEGACY_PREFIX = 'robot_'
+LEGACY_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+def legacy_entries(directory: str) -> List[RetentionEntry]:
+    """저장소 루트의 이전 평면 이미지 파일 (키는 파일 경로)"""
+    entries = []
+    if not os.path.isdir(directory):
+        return entries
+    with os.scandir(directory) as it:
+        for entry in it:
+            if (entry.is_file() and entry.name.startswith(LEGACY_PREFIX)
+                    and os.path.splitext(entry.name)[1].lower() in LEGACY_EXTENSIONS):
+                st = entry.stat()
+                entries.append(RetentionEntry(entry.path, st.st_size, st.st_mtime, max(st.st_atime, st.st_mtime)))
+    return entries
+
+def image_store_collector(store, policy: RetentionPolicy) -> Callable[[], Tuple[int, int]]:
+    """ImageStore 인덱스 + 루트의 이전 평면 파일 기준 수집 함수 (인덱스 항목은 accessed_at 사용)"""
+    def collect():
+        legacy = legacy_entries(os.path.abspath(store.root))
+        legacy_paths = {entry.key for entry in legacy}
+        files = reclaimed = 0
+        for entry in policy.select(store.retention_entries() + legacy):
+            if entry.key in legacy_paths:
+                try:
+                    os.remove(entry.key)
+                except FileNotFoundError:
+                    continue
+                freed = entry.size
+            else:
+                freed = store.remove(entry.key, entry.created_at)
+            if freed is not None:
+                files += 1
+                reclaimed += freed
+        return files, reclaimed
+    return collect
@@ -0,0 +1,89 @@
+"""
+로컬 파이프라인 스케줄러 선택과 품질 프리셋
+- 스케줄러 이름 → diffusers 스케줄러 클래스 (+ 설정 덮어쓰기)
+- 품질 프리셋 (preview/standard/final) → (스케줄러, 스텝 수)
+- 파이프라인마다 스케줄러별 뷰를 캐시: 가중치 모듈은 공유하고 스케줄러만 다른 파이프라인 객체
+  (원본 파이프라인의 scheduler 를 바꿔 끼우지 않으므로 다른 스케줄러 요청에는 영향이 없다.
+  스케줄러 객체 자체는 호출마다 타임스텝/스텝 인덱스가 바뀌므로, 같은 뷰를 쓰는 요청끼리는
+  InferenceExecutor.exclusive 로 한 번에 하나씩 실행한다)
+"""
+
+import threading
+import weakref
+from typing import Any, Dict, Literal, Optional, Tuple
+
+SchedulerName = Literal['default', 'ddim', 'pndm', 'euler', 'euler_a', 'dpm++', 'dpm++_karras', 'unipc']
+QualityPreset = Literal['preview', 'standard', 'final']
+
+# 이름 → (diffusers 클래스 이름, from_config 덮어쓰기), default 는 모델에 포함된 스케줄러
+SCHEDULERS: Dict[str, Optional[Tuple[str, Dict[str, Any]]]] = {
+    'default': None,
+    'ddim': ('DDIMScheduler', {}),
+    'pndm': ('PNDMScheduler', {}),
+    'euler': ('EulerDiscreteScheduler', {}),
+    'euler_a': ('EulerAncestralDiscreteScheduler', {}),
+    'dpm++': ('DPMSolverMultistepScheduler', {}),
+    'dpm++_karras': ('DPMSolverMultistepScheduler', {'use_karras_sigmas': True}),
+    'unipc': ('UniPCMultistepScheduler', {}),
+}
+
+# 프리셋 → (스케줄러, 스텝 수): 멀티스텝 솔버는 적은 스텝에서도 기본 스케줄러 20스텝에 가까운 품질
+QUALITY_PRESETS: Dict[str, Tuple[str, int]] = {
+    'preview': ('dpm++', 8),
+    'standard': ('dpm++', 20),
+    'final': ('dpm++_karras', 35),
+}
+
+def resolve_preset(preset: Optional[str], scheduler: Optional[str], steps: int,
+                   explicit: set) -> Tuple[Optional[str], int]:
+    """
+    프리셋을 (스케줄러, 스텝 수) 로 풀기 (요청에 직접 지정한 값이 우선)
+    'default' 는 None 으로 정규화해서 캐시 키/배치 키가 갈리지 않게 한다.
+    """
+    if preset is not None:
+        preset_scheduler, preset_steps = QUALITY_PRESETS[preset]
+        if 'scheduler' not in explicit:
+            scheduler = preset_scheduler
+        if 'num_inference_steps' not in explicit:
+            steps = preset_steps
+    return (None if scheduler == 'default' else scheduler), steps
+
+class SchedulerCache:
+    """파이프라인별 스케줄러 뷰 캐시 (파이프라인이 해제되면 같이 해제)"""
+
+    def __init__(self):
+        self._views: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.hits = 0
+
+    def pipeline_for(self, pipe, name: Optional[str]):
+        """name 스케줄러를 쓰는 파이프라인 (default/None 이면 원본 그대로)"""
+        if name is None or SCHEDULERS.get(name) is None:
+            return pipe
+        with self._lock:
+            views = self._views.setdefault(pipe, {})
+            view = views.get(name)
+            if view is not None:
+                self.hits += 1
+                return view
+            view = views[name] = self._build(pipe, name)
+            self.created += 1
+            return view
+
+    @staticmethod
+    def _build(pipe, name: str):
+        import diffusers
+
+        class_name, overrides = SCHEDULERS[name]
+        scheduler = getattr(diffusers, class_name).from_config(pipe.scheduler.config, **overrides)
+        # components 는 같은 모듈 객체를 가리키므로 가중치를 다시 로드/복사하지 않음
+        options = {}
+        if 'requires_safety_checker' in pipe.config:
+            options['requires_safety_checker'] = pipe.config['requires_safety_checker']
+        return type(pipe)(**{**pipe.components, 'scheduler': scheduler}, **options)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            cached = sorted({name for views in self._views.values() for name in views})
+        return {"cached": cached, "created": self.created, "hits": self.hits}
@@ -0,0 +1,54 @@
+"""
+동일 요청 합치기 (single-flight)
+같은 키의 작업이 이미 진행 중이면 새 작업을 시작하지 않고 그 결과를 함께 받는다.
+기다리는 호출자가 모두 취소되면 작업도 취소한다 (아무도 받지 않을 결과에 추론 자원을 쓰지 않음).
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+class SingleFlight:
+    """키별로 진행 중인 작업 하나만 실행하고 결과를 모든 호출자에게 전달"""
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self.leaders = 0
+        self.dedup_hits = 0
+        self.abandoned = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None and not task.done():
+            self.dedup_hits += 1
+            print("🔗 진행 중인 동일 요청에 합류")
+        else:
+            self.leaders += 1
+            # 호출자 하나가 끊겨도 다른 호출자를 위해 작업은 계속 진행
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda _: self._forget(key, task))
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+                if self._waiters[key] == 0 and not task.done():
+                    self.abandoned += 1
+                    task.cancel()
+            raise
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "dedup_hits": self.dedup_hits,
+            "abandoned": self.abandoned
+        }
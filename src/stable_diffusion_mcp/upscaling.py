@@ -0,0 +1,125 @@
+"""
+2단계 "초안 → 업스케일" 생성
+- 초안: 요청 해상도 × SD_DRAFT_SCALE (8의 배수) 에서 디노이징 — UNet 비용은 픽셀 수에 비례하므로
+  1024x1024 → 512x512 초안이면 스텝당 연산이 약 1/4
+- 업스케일: 이름으로 등록된 업스케일러가 초안을 요청 해상도로 키움
+  · lanczos: PIL Lanczos 리샘플링 (기본, 모델 없음, 수십 ms)
+  · latent: diffusers StableDiffusionLatentUpscalePipeline (x2 잠재 공간 업스케일러, 필요 시 로드)
+  ESRGAN 등 다른 모델은 register_upscaler 로 추가
+- 모델 업스케일러가 실패하면 Lanczos 로 대신하고 실제 사용한 업스케일러를 기록
+- 모델 업스케일러 (inference = True, 등록 업스케일러의 기본값) 는 추론 스레드 풀에서,
+  Lanczos 처럼 모델 없는 업스케일러는 별도 스레드에서 실행해 디퓨전 배치 뒤에 줄 서지 않게 함
+"""
+
+import os
+import threading
+from io import BytesIO
+from typing import Any, Callable, Dict, Tuple
+
+from PIL import Image
+
+from .image_io import encode_image
+
+DEFAULT_UPSCALER = os.getenv('SD_UPSCALER', 'lanczos')
+DRAFT_SCALE = float(os.getenv('SD_DRAFT_SCALE', '0.5'))
+DRAFT_MIN_SIZE = int(os.getenv('SD_DRAFT_MIN_SIZE', '256'))  # 이보다 작은 초안은 구도가 무너짐
+LATENT_UPSCALER_MODEL = os.getenv('SD_LATENT_UPSCALER_MODEL', 'stabilityai/sd-x2-latent-upscaler')
+LATENT_UPSCALER_STEPS = int(os.getenv('SD_LATENT_UPSCALER_STEPS', '20'))
+
+def draft_size(width: int, height: int, scale: float = DRAFT_SCALE,
+               min_size: int = DRAFT_MIN_SIZE) -> Tuple[int, int]:
+    """초안 해상도 (8의 배수, 짧은 변이 min_size 이상, 요청 해상도 이하)"""
+    factor = max(scale, min(1.0, min_size / min(width, height)))
+    return (min(width, max(8, round(width * factor / 8) * 8)),
+            min(height, max(8, round(height * factor / 8) * 8)))
+
+class LanczosUpscaler:
+    """PIL Lanczos 리샘플링"""
+    name = 'lanczos'
+    inference = False
+
+    def upscale(self, image: Image.Image, width: int, height: int, prompt: str) -> Image.Image:
+        if image.size == (width, height):
+            return image
+        return image.resize((width, height), Image.LANCZOS)
+
+class LatentUpscaler:
+    """
+    SD x2 잠재 공간 업스케일러 (프롬프트 조건부 디노이징으로 디테일 복원)
+    첫 호출에 로드하고, 파이프라인 객체는 스레드 간 공유가 안 되므로 호출을 직렬화한다.
+    출력은 정확히 2배라서 요청 해상도와 다르면 Lanczos 로 맞춘다.
+    """
+    name = 'latent'
+    inference = True
+
+    def __init__(self, model_id: str = LATENT_UPSCALER_MODEL, steps: int = LATENT_UPSCALER_STEPS):
+        self.model_id = model_id
+        self.steps = steps
+        self._pipe = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        import torch
+        from diffusers import StableDiffusionLatentUpscalePipeline
+
+        cuda = torch.cuda.is_available()
+        pipe = StableDiffusionLatentUpscalePipeline.from_pretrained(
+            self.model_id, torch_dtype=torch.float16 if cuda else torch.float32)
+        return pipe.to("cuda" if cuda else "cpu")
+
+    def upscale(self, image: Image.Image, width: int, height: int, prompt: str) -> Image.Image:
+        with self._lock:
+            if self._pipe is None:
+                self._pipe = self._load()
+            upscaled = self._pipe(prompt=prompt, image=image.convert('RGB'),
+                                  num_inference_steps=self.steps, guidance_scale=0).images[0]
+        return LanczosUpscaler().upscale(upscaled, width, height, prompt)
+
+# 이름 → 업스케일러 팩토리 (첫 사용 시 한 번 생성)
+UPSCALERS: Dict[str, Callable[[], Any]] = {
+    'lanczos': LanczosUpscaler,
+    'latent': LatentUpscaler,
+}
+_instances: Dict[str, Any] = {}
+_instances_lock = threading.Lock()
+
+def register_upscaler(name: str, factory: Callable[[], Any]):
+    """업스케일러 추가/교체 (factory() 는 upscale(image, width, height, prompt) 를 가진 객체)"""
+    with _instances_lock:
+        UPSCALERS[name] = factory
+        _instances.pop(name, None)
+
+def uses_inference_pool(name: str) -> bool:
+    """업스케일러가 모델을 돌리는지 (inference 속성이 없으면 모델로 간주)"""
+    return getattr(UPSCALERS.get(name), 'inference', True)
+
+def get_upscaler(name: str):
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = UPSCALERS[name]()
+        return _instances[name]
+
+def upscale_image(data: bytes, width: int, height: int, upscaler: str, prompt: str,
+                  encode_options: Dict[str, Any]) -> Tuple[bytes, str]:
+    """
+    초안 바이트를 요청 해상도로 업스케일해서 다시 인코딩 (블로킹, uses_inference_pool 에 따라 추론 스레드나 별도 스레드에서 실행)
+    반환: (이미지 바이트, 실제 사용한 업스케일러)
+    """
+    image = Image.open(BytesIO(data))
+    image.load()
+    used = upscaler
+    try:
+        result = get_upscaler(upscaler).upscale(image, width, height, prompt)
+    except Exception as e:
+        if upscaler == 'lanczos':
+            raise
+        print(f"⚠️ 업스케일러 '{upscaler}' 실패, Lanczos 로 대체: {e}")
+        result = get_upscaler('lanczos').upscale(image, width, height, prompt)
+        used = 'lanczos'
+    return encode_image(result, **encode_options), used
+
+def upscaler_stats() -> Dict[str, Any]:
+    with _instances_lock:
+        loaded = sorted(_instances)
+    return {"available": sorted(UPSCALERS), "default": DEFAULT_UPSCALER, "loaded": loaded,
+            "draft_scale": DRAFT_SCALE, "draft_min_size": DRAFT_MIN_SIZE}
@@ -0,0 +1,414 @@
+"""
+멀티 프로세스 로컬 추론 워커 풀 (SD_WORKER_PROCESSES > 0 일 때)
+- 워커 N개를 spawn 으로 띄우고 각각 CPU 코어 묶음에 고정 (sched_setaffinity), 스레드 수 = 코어 수
+- 가중치는 한 번만 torch 파일로 내보내고 워커는 mmap 으로 붙인다 (load_state_dict assign=True)
+  → 읽기 전용 페이지 캐시를 모든 워커가 공유하므로 워커 수만큼 메모리가 늘지 않음
+- 배치는 처리 중인 이미지 수가 가장 적은 워커로 보냄
+- 진행률 콜백 (미리보기 포함) 은 결과 큐로 전달되어 부모 프로세스에서 호출됨
+- 기다리던 쪽이 취소하면 워커별 취소 큐로 작업 id 를 보내고, 워커는 스텝마다 받은 id 집합을 확인해 배치를 중단
+  (여러 작업을 취소해도 서로 덮어쓰지 않음)
+- 가중치 파일은 기본적으로 사용자 캐시 디렉토리 (~/.cache/stable_diffusion_mcp/model_weights) 에 둠
+단일 torch 프로세스는 코어가 많아질수록 스케일링이 떨어지므로, 큰 노드에서는 작은 프로세스 여러 개가 처리량이 높다.
+"""
+
+import os
+import time
+import queue
+import importlib
+import itertools
+import threading
+import multiprocessing
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .executor import GenerationCancelled
+
+WORKER_PROCESSES = int(os.getenv('SD_WORKER_PROCESSES', '0'))
+WORKER_WEIGHTS_DIR = os.getenv('SD_WORKER_WEIGHTS_DIR', os.path.join(
+    os.getenv('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+    'stable_diffusion_mcp', 'model_weights'))
+WORKER_START_TIMEOUT = float(os.getenv('SD_WORKER_START_TIMEOUT', '1800'))
+
+def core_slices(workers: int, cores: Optional[Sequence[int]] = None) -> List[List[int]]:
+    """사용 가능한 코어를 워커 수만큼 연속 구간으로 나눔 (코어보다 워커가 많으면 돌려 씀)"""
+    if cores is None:
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+    cores = list(cores)
+    slices = []
+    for index in range(workers):
+        chunk = cores[index * len(cores) // workers:(index + 1) * len(cores) // workers]
+        slices.append(chunk or [cores[index % len(cores)]])
+    return slices
+
+def weights_path(model_id: str, channels_last: bool, directory: str = WORKER_WEIGHTS_DIR) -> str:
+    slug = model_id.strip('/').replace('/', '--')
+    return os.path.join(directory, f"{slug}{'-cl' if channels_last else ''}.pt")
+
+def torch_components(pipe) -> Dict[str, Any]:
+    import torch
+
+    return {name: module for name, module in pipe.components.items() if isinstance(module, torch.nn.Module)}
+
+def export_mapped_weights(pipe, path: str):
+    """
+    파이프라인 모듈 가중치를 mmap 으로 열 수 있는 torch 파일로 저장 (원자적 교체)
+    state_dict 에 없는 비영속 버퍼도 함께 저장해서 meta 디바이스 뼈대에 그대로 붙일 수 있게 한다.
+    텐서 stride 가 보존되므로 channels_last 로 바꾼 뒤 저장하면 워커에서 다시 복사하지 않는다.
+    """
+    import torch
+
+    payload = {}
+    for name, module in torch_components(pipe).items():
+        state = module.state_dict()
+        buffers = {key: value for key, value in module.named_buffers() if key not in state}
+        payload[name] = {"state": state, "buffers": buffers}
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    torch.save(payload, tmp_path)
+    os.replace(tmp_path, path)
+
+def load_mapped_weights(path: str) -> Dict[str, Any]:
+    """가중치 파일을 mmap 으로 열기 (텐서 데이터는 접근할 때 페이지 캐시에서 읽힘)"""
+    import torch
+
+    return torch.load(path, mmap=True, weights_only=True)
+
+def map_weights(pipe, payload: Dict[str, Any]):
+    """load_mapped_weights 결과를 모듈 파라미터/버퍼로 직접 사용 (복사 없음)"""
+    for name, tensors in payload.items():
+        module = getattr(pipe, name)
+        module.load_state_dict(tensors["state"], assign=True)
+        for key, value in tensors["buffers"].items():
+            owner, _, attr = key.rpartition('.')
+            module.get_submodule(owner)._buffers[attr] = value
+        module.eval()
+    return pipe
+
+def export_pipeline_weights(model_id: str, path: str, channels_last: bool):
+    """(별도 프로세스) 모델을 한 번 로드해서 mmap 용 가중치 파일로 내보냄"""
+    import torch
+    from diffusers import StableDiffusionPipeline
+
+    pipe = StableDiffusionPipeline.from_pretrained(model_id, torch_dtype=torch.float32)
+    if channels_last:
+        pipe.unet.to(memory_format=torch.channels_last)
+        pipe.vae.to(memory_format=torch.channels_last)
+    export_mapped_weights(pipe, path)
+
+def build_mapped_pipeline(model_id: str, path: str):
+    """
+    (워커 프로세스) model_index.json 기준으로 meta 디바이스 뼈대를 만들고 mmap 가중치를 붙임
+    토크나이저/스케줄러처럼 가중치가 없는 컴포넌트는 스냅샷에서 그대로 로드한다.
+    """
+    import torch
+    import diffusers
+    from diffusers import DiffusionPipeline
+
+    payload = load_mapped_weights(path)
+    root = model_id if os.path.isdir(model_id) else DiffusionPipeline.download(model_id)
+    index = DiffusionPipeline.load_config(root)
+
+    components, options = {}, {}
+    for name, value in index.items():
+        if name.startswith('_'):
+            continue
+        if not isinstance(value, (list, tuple)):
+            options[name] = value
+            continue
+        library, class_name = value
+        if library is None:
+            components[name] = None
+            continue
+        cls = getattr(importlib.import_module(library), class_name)
+        folder = os.path.join(root, name)
+        if name in payload:
+            with torch.device('meta'):
+                if hasattr(cls, 'load_config'):
+                    components[name] = cls.from_config(cls.load_config(folder))
+                else:
+                    components[name] = cls(cls.config_class.from_pretrained(folder))
+        else:
+            components[name] = cls.from_pretrained(folder)
+    pipe = getattr(diffusers, index['_class_name'])(**components, **options)
+    return map_weights(pipe, payload)
+
+def _pin(cores: List[int]):
+    if cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+
+def worker_main(index: int, cores: List[int], threads: int, model_id: str, path: str,
+                factory: Callable[[str, str], Any], jobs, results, cancels):
+    """워커 프로세스 본체: 코어 고정 → 파이프라인 구성 → 배치 작업 처리"""
+    _pin(cores)
+    import torch
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+    # worker_main 을 언피클링할 때 패키지는 이미 부모 환경 변수로 임포트됐으므로 워커 설정은 객체에 직접 반영
+    package = importlib.import_module(__package__)
+    package.cpu_perf.threads = threads
+    package.cpu_perf.interop_threads = 1
+    package.worker_pool.processes = 0
+    cancelled = set()
+
+    def should_cancel(job_id: int) -> bool:
+        while True:
+            try:
+                cancelled.add(cancels.get_nowait())
+            except queue.Empty:
+                return job_id in cancelled
+
+    try:
+        pipe = factory(model_id, path)
+        if package.cpu_perf.enabled:
+            package.apply_cpu_optimizations(pipe, package.cpu_perf)
+            package.warmup(pipe, package.cpu_perf, 'cpu')
+        package.pipeline = pipe
+        package.pipeline_device = 'cpu'
+    except Exception as e:
+        results.put(('failed', index, os.getpid(), str(e)))
+        return
+    results.put(('ready', index, os.getpid(), None))
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, batch_key, payloads, wants_progress = job
+
+        def progress(item: int):
+            return lambda step, total, preview=None: results.put(
+                ('progress', index, job_id, (item, step, total, preview)))
+
+        items = [(package.ImageRequest(**payload), progress(i) if wants else None)
+                 for i, (payload, wants) in enumerate(zip(payloads, wants_progress))]
+        try:
+            results.put(('done', index, job_id, package.run_pipeline_batch(
+                batch_key, items, lambda: should_cancel(job_id))))
+        except package.GenerationCancelled as e:
+            results.put(('cancelled', index, job_id, (e.completed, e.total, e.elapsed)))
+        except Exception as e:
+            results.put(('error', index, job_id, str(e)))
+        # 작업은 보낸 순서대로 처리되므로 끝난 작업까지의 취소 id 는 더 필요 없음
+        cancelled.difference_update([cancelled_id for cancelled_id in cancelled if cancelled_id <= job_id])
+
+class Worker:
+    """부모 프로세스에서 본 워커 하나의 상태"""
+
+    def __init__(self, index: int, cores: List[int], process, jobs, cancels):
+        self.index = index
+        self.cores = cores
+        self.process = process
+        self.jobs = jobs
+        self.cancels = cancels  # 중단할 작업 id 를 워커로 보내는 큐
+        self.pid: Optional[int] = None
+        self.ready = False
+        self.error: Optional[str] = None
+        self.in_flight = 0       # 보냈지만 끝나지 않은 이미지 수 (최소 부하 선택 기준)
+        self.completed = 0
+        self.busy_seconds = 0.0
+
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+class WorkerPool:
+    """
+    로컬 추론 워커 프로세스 풀
+    factory(model_id, weights_path) → 파이프라인 (워커에서 호출, 최상위 함수여야 함)
+    exporter(model_id, weights_path, channels_last) → 가중치 파일 생성 (별도 프로세스에서 호출)
+    """
+
+    def __init__(self, processes: int = WORKER_PROCESSES, model_id: Optional[str] = None,
+                 factory: Callable[[str, str], Any] = build_mapped_pipeline,
+                 exporter: Callable[[str, str, bool], None] = export_pipeline_weights,
+                 weights_dir: str = WORKER_WEIGHTS_DIR, channels_last: bool = True,
+                 cores: Optional[Sequence[int]] = None,
+                 on_interrupted: Optional[Callable[[Any], None]] = None):
+        self.processes = processes
+        self.model_id = model_id
+        self.factory = factory
+        self.exporter = exporter
+        self.weights_dir = weights_dir
+        self.channels_last = channels_last
+        self.cores = cores
+        self.on_interrupted = on_interrupted  # 워커가 스텝 사이에서 중단한 배치 (GenerationCancelled) 보고
+        self.workers: List[Worker] = []
+        self._context = multiprocessing.get_context('spawn')
+        self._results = None
+        self._reader: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._ready_changed = threading.Condition()
+        self._jobs: Dict[int, Tuple[Any, Worker, List[Optional[Callable]], float]] = {}
+        self._job_ids = itertools.count()
+        self.dispatched = 0
+        self.failed_jobs = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.processes > 0
+
+    @property
+    def ready(self) -> bool:
+        return any(w.ready and w.alive() for w in self.workers)
+
+    def weights_path(self) -> str:
+        return weights_path(self.model_id, self.channels_last, self.weights_dir)
+
+    def start(self, report_stage: Callable[[str], None] = print) -> bool:
+        """가중치 파일 준비 → 워커 시작 → 준비 완료까지 대기 (블로킹, 로더 스레드에서 호출)"""
+        path = self.weights_path()
+        if not os.path.exists(path):
+            report_stage(f"mmap 가중치 내보내기 ({path})")
+            exporter = self._context.Process(target=self.exporter, args=(self.model_id, path, self.channels_last))
+            exporter.start()
+            exporter.join()
+            if exporter.exitcode != 0 or not os.path.exists(path):
+                raise RuntimeError(f"가중치 내보내기 실패 (exit {exporter.exitcode})")
+
+        report_stage(f"추론 워커 {self.processes}개 시작")
+        self._results = self._context.Queue()
+        for index, cores in enumerate(core_slices(self.processes, self.cores)):
+            jobs = self._context.Queue()
+            cancels = self._context.Queue()
+            process = self._context.Process(
+                target=worker_main, name=f"sd-worker-{index}", daemon=True,
+                args=(index, cores, max(1, len(cores)), self.model_id, path, self.factory, jobs, self._results,
+                      cancels))
+            process.start()
+            self.workers.append(Worker(index, cores, process, jobs, cancels))
+        self._reader = threading.Thread(target=self._read_results, name='sd-worker-results', daemon=True)
+        self._reader.start()
+
+        deadline = time.monotonic() + WORKER_START_TIMEOUT
+        with self._ready_changed:
+            while not all(w.ready or w.error or not w.alive() for w in self.workers):
+                if not self._ready_changed.wait(timeout=max(0.0, deadline - time.monotonic())):
+                    break
+        ready = sum(w.ready for w in self.workers)
+        report_stage(f"추론 워커 준비 {ready}/{self.processes}")
+        return ready > 0
+
+    def _read_results(self):
+        """결과 큐 수신 스레드: 준비 알림, 진행률, 완료/오류를 future 와 콜백으로 전달"""
+        while not self._stopping.is_set():
+            try:
+                kind, index, key, value = self._results.get(timeout=0.5)
+            except queue.Empty:
+                self._fail_dead_workers()
+                continue
+            except (EOFError, OSError):
+                break
+            worker = self.workers[index]
+            if kind in ('ready', 'failed'):
+                with self._ready_changed:
+                    worker.pid = key
+                    worker.ready = kind == 'ready'
+                    worker.error = value
+                    self._ready_changed.notify_all()
+            elif kind == 'progress':
+                entry = self._jobs.get(key)
+                if entry is not None:
+                    item, step, total, preview = value
+                    callback = entry[2][item]
+                    if callback is not None and preview is not None:
+                        callback(step, total, preview=preview)
+                    elif callback is not None:
+                        callback(step, total)
+            elif kind == 'cancelled':
+                # 기다리던 쪽은 이미 떠났으므로 future 없이 절약 시간만 보고
+                self._jobs.pop(key, None)
+                worker.busy_seconds += value[2]
+                if self.on_interrupted is not None:
+                    self.on_interrupted(GenerationCancelled(*value))
+            else:
+                entry = self._jobs.pop(key, None)
+                if entry is None:
+                    continue
+                future, worker, _, started = entry
+                worker.completed += len(value) if kind == 'done' else 0
+                worker.busy_seconds += time.perf_counter() - started
+                if kind == 'done':
+                    self._resolve(future, value)
+                else:
+                    self.failed_jobs += 1
+                    self._resolve(future, exception=Exception(f"워커 {index} 오류: {value}"))
+
+    def _fail_dead_workers(self):
+        for job_id, (future, worker, _, _) in list(self._jobs.items()):
+            if not worker.alive():
+                self._jobs.pop(job_id, None)
+                self.failed_jobs += 1
+                self._resolve(future, exception=Exception(f"워커 {worker.index} 종료됨 (exit {worker.process.exitcode})"))
+        with self._ready_changed:
+            self._ready_changed.notify_all()
+
+    @staticmethod
+    def _resolve(future, result=None, exception: Optional[BaseException] = None):
+        def settle():
+            if future.done():
+                return
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        future.get_loop().call_soon_threadsafe(settle)
+
+    def least_loaded(self) -> Worker:
+        candidates = [w for w in self.workers if w.ready and w.alive()]
+        if not candidates:
+            raise Exception("사용 가능한 추론 워커 없음")
+        return min(candidates, key=lambda w: (w.in_flight, w.completed))
+
+    async def submit(self, batch_key: Tuple, items: List[Tuple[Any, Optional[Callable]]]) -> List[bytes]:
+        """배치를 가장 한가한 워커로 보내고 결과 (인코딩된 이미지 바이트 목록) 를 기다림"""
+        import asyncio
+
+        worker = self.least_loaded()
+        future = asyncio.get_running_loop().create_future()
+        job_id = next(self._job_ids)
+        callbacks = [callback for _, callback in items]
+        self._jobs[job_id] = (future, worker, callbacks, time.perf_counter())
+        worker.in_flight += len(items)
+        self.dispatched += 1
+        try:
+            worker.jobs.put((job_id, batch_key, [request.model_dump() for request, _ in items],
+                             [callback is not None for callback in callbacks]))
+            return await future
+        except asyncio.CancelledError:
+            worker.cancels.put(job_id)
+            raise
+        finally:
+            worker.in_flight -= len(items)
+            self._jobs.pop(job_id, None)
+
+    def shutdown(self, timeout: float = 5.0):
+        self._stopping.set()
+        for worker in self.workers:
+            if worker.alive():
+                worker.jobs.put(None)
+        for worker in self.workers:
+            worker.process.join(timeout)
+            if worker.alive():
+                worker.process.terminate()
+        self.workers = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "processes": self.processes,
+            "dispatched_batches": self.dispatched,
+            "failed_batches": self.failed_jobs,
+            "workers": [{
+                "index": w.index,
+                "pid": w.pid,
+                "cores": w.cores,
+                "ready": w.ready,
+                "alive": w.alive(),
+                "in_flight": w.in_flight,
+                "completed_images": w.completed,
+                "busy_seconds": round(w.busy_seconds, 3),
+                "error": w.error
+            } for w in self.workers]
+        }
@@ -1,6 +1,10 @@
 import requests
 import json
 import os
+import time
+
+# 서버의 Job.TERMINAL 과 같은 종료 상태 (패키지를 임포트하면 torch/FastAPI 까지 불러오므로 값만 맞춤)
+TERMINAL_STATUSES = ('succeeded', 'failed', 'cancelled')
 
 print("Generating robot arm image...")
 
@@ -19,9 +23,26 @@ try:
         'guidance_scale': 7.5
     }
     
-    response = requests.post('http://localhost:8001/create_robot_image', json=data)
-    if response.status_code == 200:
-        result = response.json()
+    # 작업 등록 후 완료될 때까지 상태 조회 (긴 로컬 생성에도 연결이 끊기지 않음)
+    response = requests.post('http://localhost:8001/jobs', json=data)
+    if response.status_code == 202:
+        job = response.json()
+        while job['status'] not in TERMINAL_STATUSES:
+            time.sleep(2)
+            status_response = requests.get(f"http://localhost:8001/jobs/{job['job_id']}")
+            if status_response.status_code != 200:
+                # 작업이 TTL 로 축출됐거나 서버가 재시작된 경우 (404 본문에는 status 가 없음)
+                raise Exception(f"job status request failed: {status_response.status_code} {status_response.text}")
+            job = status_response.json()
+            progress = job['progress']
+            print(f"  ... {job['status']} ({progress['step']}/{progress['total']} steps)")
+        
+        if job['status'] == 'failed':
+            raise Exception(job['error'])
+        if job['status'] == 'cancelled':
+            raise Exception('job was cancelled')
+        
+        result = job['result']
         print('=== Image Generation Result ===')
         print('Image Path:', result['image_path'])
         print('Generation Time:', result['generation_time'], 'seconds')
@@ -0,0 +1,107 @@
+"""
+테스트 공용 가짜 파이프라인과 픽스처
+- FakePipeline: diffusers 파이프라인 호출 규약만 흉내내는 파이프라인 (호출/스텝 기록, 스텝 지연, 잠재값 콜백)
+- isolated_app: 작업 디렉토리를 tmp_path 로 옮기고 요청 간 상태 (프로바이더 상태, 동일 요청 합치기, 작업 저장소,
+  이미지 저장소/결과 캐시) 를 새로 만듦 → 저장소 인덱스나 캐시 파일이 저장소 작업 트리에 남지 않음
+- local_only: isolated_app + 클라우드 프로바이더 차단, 짧은 배치 대기로 로컬 파이프라인 경로만 사용
+"""
+
+import pytest
+import sys
+import os
+import json
+import time
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+
+class PipelineOutput:
+    def __init__(self, images):
+        self.images = images
+
+class FakePipeline:
+    """
+    호출마다 배치 (프롬프트, 생성기 수, 스텝 수, 크기) 를 calls 에 기록하는 테스트용 파이프라인
+    - call_delay: 호출 전체를 막는 시간 (스텝과 무관한 동기 작업)
+    - step_delay: 스텝마다 멈추는 시간, 스텝 끝마다 callback_on_step_end 호출
+    - latents: 콜백 인자로 (배치, 4, H/8, W/8) 잠재값을 넘김 (미리보기 경로)
+    - max_active: 동시에 실행 중이던 호출 수의 최댓값
+    """
+
+    def __init__(self, step_delay: float = 0.0, call_delay: float = 0.0, latents: bool = False):
+        self.step_delay = step_delay
+        self.call_delay = call_delay
+        self.latents = latents
+        self.calls = []
+        self.steps_run = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt, width, height, num_inference_steps=1, generator=None,
+                 callback_on_step_end=None, **kwargs):
+        with self._lock:
+            self.calls.append({"prompts": list(prompt), "generators": len(generator or []),
+                               "steps": num_inference_steps, "size": (width, height)})
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            return self._run(prompt, width, height, num_inference_steps, callback_on_step_end)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def _run(self, prompt, width, height, num_inference_steps, callback_on_step_end):
+        time.sleep(self.call_delay)
+        callback_kwargs = {}
+        if self.latents:
+            import torch
+            callback_kwargs["latents"] = torch.zeros(len(prompt), 4, height // 8, width // 8)
+        for step in range(num_inference_steps):
+            time.sleep(self.step_delay)
+            self.steps_run += 1
+            if callback_on_step_end is not None:
+                callback_on_step_end(self, step, 1000 - step, callback_kwargs)
+        return PipelineOutput([Image.new('RGB', (width, height)) for _ in prompt])
+
+def parse_sse(body: str):
+    """SSE 응답 본문 → data 이벤트 목록"""
+    return [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+
+@pytest.fixture
+def isolated_app(monkeypatch, tmp_path):
+    """tmp_path 에서 실행되고 요청 간 상태를 공유하지 않는 sd 모듈"""
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp.image_cache import ImageResultCache
+    from stable_diffusion_mcp.image_store import ImageStore
+    from stable_diffusion_mcp.jobs import JobStore
+    from stable_diffusion_mcp.provider_health import ProviderHealthRegistry
+    from stable_diffusion_mcp.single_flight import SingleFlight
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sd, 'provider_registry', ProviderHealthRegistry(min_calls=100))
+    monkeypatch.setattr(sd, 'generation_flight', SingleFlight())
+    monkeypatch.setattr(sd, 'job_store', JobStore())
+    store = ImageStore(str(tmp_path / 'generated_images'))
+    monkeypatch.setattr(sd, 'image_store', store)
+    monkeypatch.setattr(sd, 'image_cache', ImageResultCache(store))
+    return sd
+
+@pytest.fixture
+def local_only(monkeypatch, isolated_app):
+    """클라우드 프로바이더를 막고 로컬 배치 경로만 쓰는 sd 모듈, use(pipe) 로 파이프라인 지정"""
+    from stable_diffusion_mcp.batching import MicroBatcher
+    sd = isolated_app
+
+    async def unavailable(prompt, **kwargs):
+        raise Exception("down")
+
+    monkeypatch.setattr(sd, 'generate_with_huggingface', unavailable)
+    monkeypatch.setattr(sd, 'generate_with_stability', unavailable)
+    monkeypatch.setattr(sd, 'local_batcher', MicroBatcher(sd.run_local_batch, max_wait=0.01))
+
+    def use(pipe):
+        monkeypatch.setattr(sd, 'pipeline', pipe)
+        return pipe
+    return use
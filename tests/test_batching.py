@@ -0,0 +1,82 @@
+import pytest
+import sys
+import os
+import asyncio
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    import httpx
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp.batching import MicroBatcher
+    from conftest import FakePipeline
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+class TestMicroBatcher:
+    """배치 스케줄러 단위 테스트"""
+
+    def test_groups_by_key_and_routes_results(self):
+        batches = []
+
+        async def run_batch(key, items):
+            batches.append((key, list(items)))
+            return [f"{key}:{item}" for item in items]
+
+        async def scenario():
+            batcher = MicroBatcher(run_batch, max_batch_size=8, max_wait=0.05)
+            return await asyncio.gather(
+                batcher.submit('a', 1), batcher.submit('b', 2), batcher.submit('a', 3)
+            ), batcher.stats()
+
+        results, stats = asyncio.run(scenario())
+        assert results == ['a:1', 'b:2', 'a:3']
+        assert sorted(batches) == [('a', [1, 3]), ('b', [2])]
+        assert stats["batches"] == 2
+        assert stats["largest_batch"] == 2
+
+    def test_full_batch_flushes_without_waiting(self):
+        async def run_batch(key, items):
+            return items
+
+        async def scenario():
+            batcher = MicroBatcher(run_batch, max_batch_size=2, max_wait=10.0)
+            return await asyncio.wait_for(
+                asyncio.gather(batcher.submit('k', 1), batcher.submit('k', 2)), timeout=1.0)
+
+        assert asyncio.run(scenario()) == [1, 2]
+
+    def test_batch_failure_reaches_every_caller(self):
+        async def run_batch(key, items):
+            raise RuntimeError("out of memory")
+
+        async def scenario():
+            batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait=0.01)
+            return await asyncio.gather(batcher.submit('k', 1), batcher.submit('k', 2),
+                                        return_exceptions=True)
+
+        assert all(isinstance(r, RuntimeError) for r in asyncio.run(scenario()))
+
+class TestLocalBatching:
+    """로컬 파이프라인 경로 배칭 연동 테스트"""
+
+    def test_concurrent_local_requests_share_one_pipeline_call(self, monkeypatch, local_only):
+        fake_pipeline = local_only(FakePipeline())
+        monkeypatch.setattr(sd, 'local_batcher',
+                            MicroBatcher(sd.run_local_batch, max_batch_size=4, max_wait=0.2))
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=sd.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await asyncio.gather(*[
+                    client.post("/create_robot_image", json={
+                        "prompt": f"robot {i}", "resolution": "64x64",
+                        "num_inference_steps": 2, "seed": i
+                    }) for i in range(4)
+                ])
+
+        responses = asyncio.run(scenario())
+        assert all(r.status_code == 200 for r in responses)
+        assert all(r.json()["metadata"]["api_used"] == "local" for r in responses)
+        assert len(fake_pipeline.calls) == 1
+        assert sorted(fake_pipeline.calls[0]["prompts"]) == [f"robot {i}" for i in range(4)]
+        assert fake_pipeline.calls[0]["generators"] == 4
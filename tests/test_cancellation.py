@@ -0,0 +1,113 @@
+import pytest
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+torch = pytest.importorskip('torch')
+
+try:
+    import httpx
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp.cancellation import (
+        CancellationMetrics, ClientDisconnected, DeadlineExceeded, effective_timeout, run_until_cancelled
+    )
+    from conftest import FakePipeline
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+class FakeHTTPRequest:
+    """disconnect_after 초 뒤부터 연결이 끊긴 것으로 보이는 요청"""
+
+    def __init__(self, disconnect_after: float):
+        self.headers = {}
+        self.disconnect_at = time.monotonic() + disconnect_after
+
+    async def is_disconnected(self) -> bool:
+        return time.monotonic() >= self.disconnect_at
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = CancellationMetrics()
+    monkeypatch.setattr(sd, 'cancellation_metrics', metrics)
+    return metrics
+
+class TestRunUntilCancelled:
+    """기한/연결 끊김 감시 테스트"""
+
+    def test_deadline_and_disconnect_cancel_inner_task(self):
+        cancelled = []
+
+        async def forever():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def disconnected():
+            return True
+
+        async def scenario():
+            with pytest.raises(DeadlineExceeded):
+                await run_until_cancelled(forever(), timeout=0.05)
+            with pytest.raises(ClientDisconnected):
+                await run_until_cancelled(forever(), is_disconnected=disconnected, poll_interval=0.01)
+            return await run_until_cancelled(asyncio.sleep(0, result="ok"), timeout=1)
+
+        assert asyncio.run(scenario()) == "ok"
+        assert cancelled == [True, True]
+
+    def test_effective_timeout(self):
+        assert effective_timeout(None, 600) == 600
+        assert effective_timeout(5, 600) == 5
+        assert effective_timeout(None, 0) is None
+
+class TestCreateRobotImageCancellation:
+    """/create_robot_image 기한 초과/연결 끊김 테스트"""
+
+    def test_deadline_interrupts_local_denoising(self, local_only, metrics):
+        pipe = local_only(FakePipeline(step_delay=0.05))
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=sd.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.post("/create_robot_image", json={
+                    "prompt": "robot", "resolution": "64x64", "num_inference_steps": 40, "timeout_seconds": 0.3})
+                await asyncio.sleep(0.2)  # 추론 스레드가 다음 스텝 경계에서 멈출 시간
+            return response
+
+        response = asyncio.run(scenario())
+        assert response.status_code == 504
+
+        stats = metrics.stats()
+        assert pipe.steps_run < 40
+        assert stats["cancelled_requests"] == {"deadline": 1}
+        assert stats["interrupted_batches"] == 1
+        assert stats["skipped_steps"] == 40 - pipe.steps_run
+        assert stats["saved_compute_seconds"] > 0
+
+    def test_disconnect_aborts_fallback_chain(self, monkeypatch, isolated_app, metrics):
+        calls = []
+
+        async def hanging_huggingface(prompt, **kwargs):
+            calls.append("huggingface")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                calls.append("huggingface-cancelled")
+                raise
+
+        async def stability(prompt, **kwargs):
+            calls.append("stability")
+            raise Exception("down")
+
+        monkeypatch.setattr(sd, 'generate_with_huggingface', hanging_huggingface)
+        monkeypatch.setattr(sd, 'generate_with_stability', stability)
+
+        request = sd.ImageRequest(prompt="robot", resolution="64x64")
+        response = asyncio.run(sd.create_robot_image(request, FakeHTTPRequest(disconnect_after=0.1)))
+        assert response.status_code == 499
+        assert calls == ["huggingface", "huggingface-cancelled"]  # 다음 프로바이더로 넘어가지 않음
+        assert metrics.stats()["cancelled_requests"] == {"disconnect": 1}
@@ -0,0 +1,239 @@
+import pytest
+import sys
+import os
+import time
+import base64
+import asyncio
+import statistics
+from io import BytesIO
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    from aiohttp import web
+    from PIL import Image
+    from stable_diffusion_mcp.cloud_proxy import CloudImageGenerator, HuggingFaceAPI, StabilityAIAPI
+    from stable_diffusion_mcp.provider_health import ProviderHealthRegistry
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+def tiny_png() -> bytes:
+    buffered = BytesIO()
+    Image.new('RGB', (8, 8), color='gray').save(buffered, format="PNG")
+    return buffered.getvalue()
+
+class StubProvider:
+    """HuggingFace/Stability 응답을 흉내내는 로컬 스텁 서버 (연결별 포트 기록)"""
+
+    def __init__(self):
+        self.peers = []
+        self.image = tiny_png()
+        self.runner = None
+        self.base_url = None
+
+    async def hf_handler(self, request):
+        self.peers.append(request.transport.get_extra_info('peername')[1])
+        return web.Response(body=self.image, content_type="image/png")
+
+    async def stability_handler(self, request):
+        self.peers.append(request.transport.get_extra_info('peername')[1])
+        return web.json_response({"artifacts": [{"base64": base64.b64encode(self.image).decode()}]})
+
+    async def hanging_handler(self, request):
+        await self.released.wait()
+        return web.Response(status=504)
+
+    async def start(self):
+        self.released = asyncio.Event()
+        stub = web.Application()
+        stub.router.add_post('/hf', self.hf_handler)
+        stub.router.add_post('/stability', self.stability_handler)
+        stub.router.add_post('/hang', self.hanging_handler)
+        self.runner = web.AppRunner(stub)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        self.released.set()
+        await self.runner.cleanup()
+
+class TestCloudImageGeneratorPooling:
+    """CloudImageGenerator 연결 풀 테스트"""
+
+    def test_lifecycle_opens_and_closes_sessions(self):
+        """start/close 로 프로바이더별 세션 수명 관리"""
+        async def scenario():
+            generator = CloudImageGenerator(limit_per_host=3, dns_cache_ttl=60)
+            await generator.start()
+            stats = generator.pool_stats()
+            assert set(stats) == {'stability', 'huggingface'}
+            assert all(s["open"] and s["limit_per_host"] == 3 for s in stats.values())
+            assert all(s["dns_cache_ttl"] == 60 for s in stats.values())
+            await generator.close()
+            assert not any(s["open"] for s in generator.pool_stats().values())
+
+        asyncio.run(scenario())
+
+    def test_connections_are_reused(self, monkeypatch, tmp_path):
+        """연속 요청이 하나의 TCP 연결을 재사용"""
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setenv('STABILITY_API_KEY', 'test_key')
+
+        async def scenario():
+            stub = StubProvider()
+            await stub.start()
+            generator = CloudImageGenerator()
+            generator.apis['huggingface'].model_url = f"{stub.base_url}/hf"
+            stability = StabilityAIAPI(http_client=generator.apis['huggingface'].http_client)
+            stability.base_url = f"{stub.base_url}/stability"
+            await generator.start()
+            try:
+                for _ in range(10):
+                    await generator.apis['huggingface'].generate("robot")
+                    await stability.generate("robot", resolution="8x8")
+            finally:
+                await generator.close()
+                await stub.stop()
+            assert len(stub.peers) == 20
+            assert len(set(stub.peers)) == 1
+
+        asyncio.run(scenario())
+
+    def test_pooled_p50_latency_is_lower(self, monkeypatch, tmp_path):
+        """호출마다 세션을 새로 여는 방식보다 p50 지연이 낮음"""
+        monkeypatch.chdir(tmp_path)
+
+        async def timed(api):
+            started = time.perf_counter()
+            await api.generate("robot")
+            return time.perf_counter() - started
+
+        async def scenario():
+            stub = StubProvider()
+            await stub.start()
+            url = f"{stub.base_url}/hf"
+            try:
+                fresh = []
+                for _ in range(30):
+                    api = HuggingFaceAPI()
+                    api.model_url = url
+                    fresh.append(await timed(api))
+                    await api.http_client.close()
+                fresh_connections = len(set(stub.peers))
+
+                stub.peers.clear()
+                pooled_api = HuggingFaceAPI()
+                pooled_api.model_url = url
+                await timed(pooled_api)  # 연결 예열
+                pooled = [await timed(pooled_api) for _ in range(30)]
+                await pooled_api.http_client.close()
+            finally:
+                await stub.stop()
+            assert fresh_connections == 30
+            assert len(set(stub.peers)) == 1
+            assert statistics.median(pooled) < statistics.median(fresh)
+
+        asyncio.run(scenario())
+
+    def test_provider_timeout_bounds_hanging_calls(self, monkeypatch):
+        """응답 없는 프로바이더 호출은 프로바이더별 타임아웃에서 끊김"""
+        monkeypatch.setenv('STABILITY_API_KEY', 'test_key')
+
+        async def scenario():
+            stub = StubProvider()
+            await stub.start()
+            apis = [HuggingFaceAPI(timeout=0.2), StabilityAIAPI(timeout=0.2)]
+            apis[0].model_url = apis[1].base_url = f"{stub.base_url}/hang"
+            try:
+                for api in apis:
+                    started = time.perf_counter()
+                    with pytest.raises(asyncio.TimeoutError):
+                        await api.generate("robot", resolution="8x8")
+                    assert time.perf_counter() - started < 2
+            finally:
+                for api in apis:
+                    await api.http_client.close()
+                await stub.stop()
+
+        asyncio.run(scenario())
+
+class FakeAPI:
+    """지정한 시간 뒤 성공하거나 실패하는 테스트용 프로바이더"""
+
+    def __init__(self, delay: float, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.cancelled = False
+
+    def is_available(self) -> bool:
+        return True
+
+    async def generate(self, prompt: str, **kwargs):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.fail:
+            raise Exception("fake failure")
+        return {'image_path': f"{self.delay}.png", 'model': 'fake'}
+
+def make_generator(**kwargs):
+    generator = CloudImageGenerator(health=ProviderHealthRegistry(), **kwargs)
+    generator.apis = {
+        'slow': FakeAPI(5.0),
+        'fast': FakeAPI(0.05),
+        'local': FakeAPI(0.0)
+    }
+    return generator
+
+class TestHedgedGeneration:
+    """헤징/레이스 모드 테스트"""
+
+    def test_hedged_starts_next_provider_after_delay(self):
+        """느린 프로바이더가 지연을 넘기면 다음 프로바이더 결과를 사용"""
+        async def scenario():
+            generator = make_generator(hedge_mode='hedged', hedge_delay=0.1)
+            started = time.perf_counter()
+            result = await generator.generate_image("robot")
+            elapsed = time.perf_counter() - started
+            await asyncio.sleep(0)
+            assert result['api_used'] == 'fast'
+            assert elapsed < 1.0
+            assert generator.apis['slow'].cancelled
+
+        asyncio.run(scenario())
+
+    def test_race_starts_top_n_at_once(self):
+        """race 모드는 상위 N개를 동시에 시작"""
+        async def scenario():
+            generator = make_generator(hedge_mode='race', hedge_delay=10.0, race_top_n=2)
+            started = time.perf_counter()
+            result = await generator.generate_image("robot")
+            assert result['api_used'] == 'fast'
+            assert time.perf_counter() - started < 1.0
+
+        asyncio.run(scenario())
+
+    def test_local_fallback_after_all_hedged_failures(self):
+        """헤징 대상이 모두 실패하면 로컬 백업 사용"""
+        async def scenario():
+            generator = make_generator(hedge_mode='hedged', hedge_delay=0.01)
+            generator.apis['slow'] = FakeAPI(0.0, fail=True)
+            generator.apis['fast'] = FakeAPI(0.0, fail=True)
+            result = await generator.generate_image("robot")
+            assert result['api_used'] == 'local'
+
+        asyncio.run(scenario())
+
+    def test_hedge_delay_follows_latency_percentile(self):
+        """고정 지연이 없으면 관측된 지연 분위수로 헤지 지연 산정"""
+        generator = make_generator(hedge_percentile=0.95, default_hedge_delay=3.0)
+        assert generator.hedge_delay_for('slow') == 3.0
+        for seconds in [0.1] * 19 + [0.9]:
+            generator.health.get('slow').latency.record(seconds)
+        assert generator.hedge_delay_for('slow') == 0.1
+        generator.health.get('slow').latency.record(0.9)
+        assert generator.hedge_delay_for('slow') == 0.9
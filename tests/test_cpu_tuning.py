@@ -0,0 +1,78 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+torch = pytest.importorskip('torch')
+
+try:
+    from stable_diffusion_mcp.cpu_tuning import (
+        CPUPerfConfig, apply_cpu_optimizations, configure_threads, inference_context, warmup
+    )
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+class ConvPipeline:
+    """unet/vae 속성과 호출 기록을 가진 테스트용 파이프라인"""
+
+    def __init__(self):
+        self.unet = torch.nn.Conv2d(4, 4, 3)
+        self.vae = torch.nn.Conv2d(4, 3, 3)
+        self.calls = []
+
+    def __call__(self, **kwargs):
+        self.calls.append((kwargs, torch.is_autocast_enabled('cpu')))
+
+class TestCPUPerfConfig:
+    """환경 변수 파싱 테스트"""
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv('SD_CPU_PERF_MODE', '1')
+        monkeypatch.setenv('SD_CPU_THREADS', '3')
+        monkeypatch.setenv('SD_CPU_BF16', 'true')
+        monkeypatch.setenv('SD_CPU_CHANNELS_LAST', '0')
+        monkeypatch.setenv('SD_CPU_WARMUP_STEPS', '0')
+        config = CPUPerfConfig.from_env()
+        assert config.enabled
+        assert config.threads == 3
+        assert config.interop_threads == 1
+        assert config.bf16 and not config.channels_last and not config.compile
+        assert config.describe()["warmup_steps"] == 0
+
+    def test_defaults_keep_baseline_behaviour(self, monkeypatch):
+        monkeypatch.delenv('SD_CPU_PERF_MODE', raising=False)
+        monkeypatch.delenv('SD_CPU_THREADS', raising=False)
+        config = CPUPerfConfig.from_env()
+        assert not config.enabled
+        assert config.threads is None
+
+    def test_unset_threads_keep_torch_default(self):
+        before = torch.get_num_threads()
+        configure_threads(CPUPerfConfig(interop_threads=None))
+        assert torch.get_num_threads() == before
+
+class TestCPUOptimizations:
+    """channels_last / autocast / 예열 테스트"""
+
+    def test_channels_last_weights(self):
+        pipe = apply_cpu_optimizations(ConvPipeline(), CPUPerfConfig())
+        assert pipe.unet.weight.is_contiguous(memory_format=torch.channels_last)
+        assert pipe.vae.weight.is_contiguous(memory_format=torch.channels_last)
+
+    def test_bf16_autocast_only_when_enabled_on_cpu(self):
+        with inference_context(CPUPerfConfig(bf16=True), 'cpu'):
+            assert torch.is_autocast_enabled('cpu')
+        with inference_context(CPUPerfConfig(bf16=True), 'cuda'):
+            assert not torch.is_autocast_enabled('cpu')
+        with inference_context(CPUPerfConfig(enabled=False, bf16=True), 'cpu'):
+            assert not torch.is_autocast_enabled('cpu')
+
+    def test_warmup_runs_configured_steps_and_resolution(self):
+        pipe = ConvPipeline()
+        warmup(pipe, CPUPerfConfig(bf16=True, warmup_steps=2, warmup_resolution='64x32'), 'cpu')
+        warmup(pipe, CPUPerfConfig(warmup_steps=0), 'cpu')
+
+        assert len(pipe.calls) == 1
+        kwargs, autocast = pipe.calls[0]
+        assert (kwargs["num_inference_steps"], kwargs["width"], kwargs["height"]) == (2, 64, 32)
+        assert autocast
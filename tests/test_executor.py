@@ -0,0 +1,117 @@
+import pytest
+import sys
+import os
+import time
+import asyncio
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    import httpx
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp import ImageRequest
+    from stable_diffusion_mcp.executor import InferenceExecutor, QueueFullError
+    from conftest import FakePipeline
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+class TestInferenceExecutor:
+    """추론 실행기 단위 테스트"""
+
+    def test_blocking_work_runs_off_the_event_loop(self):
+        async def scenario():
+            executor = InferenceExecutor(max_workers=1, max_pending=4)
+            job = executor.submit(time.sleep, 0.3)
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            loop_latency = time.perf_counter() - started
+            await job
+            executor.shutdown()
+            return loop_latency, executor.stats()
+
+        loop_latency, stats = asyncio.run(scenario())
+        assert loop_latency < 0.1
+        assert stats["completed_jobs"] == 1
+        assert stats["run_time"]["count"] == 1
+
+    def test_full_queue_rejects_with_retry_after(self):
+        async def scenario():
+            executor = InferenceExecutor(max_workers=1, max_pending=1)
+            async with executor.slot():
+                with pytest.raises(QueueFullError) as excinfo:
+                    async with executor.slot():
+                        pass
+            executor.shutdown()
+            return excinfo.value, executor.stats()
+
+        error, stats = asyncio.run(scenario())
+        assert error.retry_after >= 1
+        assert stats["rejected"] == 1
+        assert stats["pending"] == 0
+
+    def test_exclusive_serializes_calls_per_pipeline(self):
+        first, second = FakePipeline(call_delay=0.1), FakePipeline(call_delay=0.1)
+
+        def call(executor, pipe):
+            with executor.exclusive(pipe):
+                pipe(["robot"], 8, 8)
+
+        async def scenario():
+            executor = InferenceExecutor(max_workers=4, max_pending=8)
+            await asyncio.gather(*[executor.run(call, executor, pipe) for pipe in (first, first, first, second)])
+            executor.shutdown()
+            return executor.stats()
+
+        stats = asyncio.run(scenario())
+        assert first.max_active == 1
+        assert len(first.calls) == 3
+        assert stats["pipeline_waits"] >= 1
+
+class TestLocalInferenceBackpressure:
+    """/create_robot_image 로컬 경로 오프로딩/백프레셔 테스트"""
+
+    def test_health_stays_responsive_and_overflow_gets_429(self, monkeypatch, local_only):
+        executor = InferenceExecutor(max_workers=1, max_pending=1)
+        local_only(FakePipeline(call_delay=0.5))
+        monkeypatch.setattr(sd, 'inference_executor', executor)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=sd.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                first = asyncio.create_task(client.post("/create_robot_image", json={
+                    "prompt": "robot one", "resolution": "64x64"}))
+                await asyncio.sleep(0.1)
+                started = time.perf_counter()
+                health = await client.get("/health")
+                health_latency = time.perf_counter() - started
+                overflow = await client.post("/create_robot_image", json={
+                    "prompt": "robot two", "resolution": "64x64"})
+                return await first, health, health_latency, overflow
+
+        first, health, health_latency, overflow = asyncio.run(scenario())
+        executor.shutdown()
+        assert first.status_code == 200
+        assert first.json()["metadata"]["api_used"] == "local"
+        assert health_latency < 0.3
+        assert health.json()["inference_queue"]["pending"] == 1
+        assert overflow.status_code == 429
+        assert int(overflow.headers["Retry-After"]) >= 1
+        # 대기열 초과는 로컬 프로바이더 실패로 집계하지 않음
+        assert sd.provider_registry.get('local').error_rate() == 0.0
+
+    def test_parallel_workers_never_share_a_pipeline_call(self, monkeypatch):
+        pytest.importorskip('torch')
+        pipe = FakePipeline(call_delay=0.05)
+        executor = InferenceExecutor(max_workers=3, max_pending=8)
+        monkeypatch.setattr(sd, 'pipeline', pipe)
+        monkeypatch.setattr(sd, 'inference_executor', executor)
+
+        async def scenario():
+            return await asyncio.gather(*[
+                executor.run(sd.run_pipeline_batch, (8, 8, 2, 7.5, None, sd.DEFAULT_MODEL),
+                             [(ImageRequest(prompt="robot", seed=seed, resolution="8x8"), None)])
+                for seed in range(3)])
+
+        results = asyncio.run(scenario())
+        executor.shutdown()
+        assert all(len(result) == 1 for result in results)
+        assert pipe.max_active == 1
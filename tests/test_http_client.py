@@ -0,0 +1,107 @@
+import pytest
+import sys
+import os
+import time
+import asyncio
+from io import BytesIO
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    from aiohttp import web
+    import httpx
+    from PIL import Image
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp.http_client import SharedHTTPClient
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+SLOW_DELAY = 0.3
+
+def tiny_png() -> bytes:
+    buffered = BytesIO()
+    Image.new('RGB', (8, 8), color='gray').save(buffered, format="PNG")
+    return buffered.getvalue()
+
+async def start_stub_server(delay: float = SLOW_DELAY):
+    """느린 이미지 API를 흉내내는 로컬 스텁 서버"""
+    body = tiny_png()
+
+    async def handler(request):
+        await asyncio.sleep(delay)
+        return web.Response(body=body, content_type="image/png")
+
+    stub = web.Application()
+    stub.router.add_post('/generate', handler)
+    runner = web.AppRunner(stub)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/generate"
+
+class TestSharedHTTPClient:
+    """공유 HTTP 클라이언트 테스트"""
+
+    def test_session_is_reused(self):
+        """같은 루프 안에서는 세션을 재사용"""
+        async def scenario():
+            client = SharedHTTPClient(limit_per_host=4)
+            first = await client.session()
+            second = await client.session()
+            assert first is second
+            assert client.stats()["limit_per_host"] == 4
+            await client.close()
+            assert client.stats()["open"] is False
+
+        asyncio.run(scenario())
+
+    def test_concurrent_cloud_calls_do_not_serialize(self, monkeypatch):
+        """느린 프로바이더 호출이 동시에 진행되는지 부하 테스트"""
+        async def scenario():
+            runner, url = await start_stub_server()
+            monkeypatch.setitem(sd.CLOUD_APIS['huggingface'], 'url', url)
+            client = SharedHTTPClient(limit_per_host=16)
+            monkeypatch.setattr(sd, 'http_client', client)
+            try:
+                started = time.perf_counter()
+                results = await asyncio.gather(*[
+                    sd.generate_with_huggingface("robot") for _ in range(8)
+                ])
+                elapsed = time.perf_counter() - started
+            finally:
+                await client.close()
+                await runner.cleanup()
+            assert all(r == tiny_png() for r in results)
+            # 직렬 실행이면 8 * 0.3초 = 2.4초 이상 걸린다
+            assert elapsed < SLOW_DELAY * 4
+
+        asyncio.run(scenario())
+
+    def test_health_responds_during_slow_generation(self, monkeypatch, tmp_path):
+        """느린 이미지 생성 중에도 /health 가 즉시 응답"""
+        async def scenario():
+            runner, url = await start_stub_server(delay=1.0)
+            monkeypatch.setitem(sd.CLOUD_APIS['huggingface'], 'url', url)
+            monkeypatch.setitem(sd.CLOUD_APIS['stability'], 'enabled', False)
+            monkeypatch.setattr(sd, 'http_client', SharedHTTPClient())
+            monkeypatch.chdir(tmp_path)
+            transport = httpx.ASGITransport(app=sd.app)
+            try:
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    generation = asyncio.create_task(client.post(
+                        "/create_robot_image",
+                        json={"prompt": "test robot", "resolution": "64x64"}
+                    ))
+                    await asyncio.sleep(0.1)
+                    started = time.perf_counter()
+                    health = await client.get("/health")
+                    health_latency = time.perf_counter() - started
+                    response = await generation
+            finally:
+                await sd.http_client.close()
+                await runner.cleanup()
+            assert health.status_code == 200
+            assert health_latency < 0.5
+            assert response.status_code == 200, response.text
+
+        asyncio.run(scenario())
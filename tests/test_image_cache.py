@@ -0,0 +1,176 @@
+import pytest
+import sys
+import os
+import time
+import asyncio
+from io import BytesIO
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    import httpx
+    from PIL import Image
+    from fastapi.testclient import TestClient
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp import ImageRequest
+    from stable_diffusion_mcp.image_cache import ImageResultCache, request_cache_key
+    from stable_diffusion_mcp.image_store import ImageStore
+    from stable_diffusion_mcp.single_flight import SingleFlight
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+def tiny_png(color='gray') -> bytes:
+    buffered = BytesIO()
+    Image.new('RGB', (8, 8), color=color).save(buffered, format="PNG")
+    return buffered.getvalue()
+
+class TestRequestCacheKey:
+    """캐시 키 정규화 테스트"""
+
+    def test_seedless_requests_are_not_cached(self):
+        assert request_cache_key(ImageRequest(prompt="robot")) is None
+
+    def test_key_ignores_whitespace_differences(self):
+        first = ImageRequest(prompt="red  robot arm ", seed=7)
+        second = ImageRequest(prompt=" red robot\narm", seed=7)
+        assert request_cache_key(first) == request_cache_key(second)
+
+    def test_key_changes_with_generation_params(self):
+        base = ImageRequest(prompt="robot", seed=7)
+        assert request_cache_key(base) != request_cache_key(ImageRequest(prompt="robot", seed=8))
+        assert request_cache_key(base) != request_cache_key(
+            ImageRequest(prompt="robot", seed=7, num_inference_steps=30))
+
+class TestImageResultCache:
+    """메모리/저장소 인덱스 계층 캐시 테스트"""
+
+    def put(self, cache, key, data, metadata=None):
+        digest = cache.store.put(data, 'png')["digest"]
+        cache.put(key, digest, data, metadata or {})
+        return digest
+
+    def test_memory_lru_eviction(self, tmp_path):
+        data = tiny_png()
+        cache = ImageResultCache(ImageStore(str(tmp_path)), memory_max_bytes=len(data) * 2)
+        for key in ('a', 'b', 'c'):
+            self.put(cache, key, data)
+        assert cache.stats()["memory_entries"] == 2
+        assert cache.get('c') is not None
+        assert cache.stats()["memory_hits"] == 1
+        # 'a' 는 메모리에서 밀려났지만 저장소 인덱스 계층에 남아 있음
+        assert cache.get('a') is not None
+        assert cache.stats()["disk_hits"] == 1
+
+    def test_index_tier_survives_restart(self, tmp_path):
+        data = tiny_png()
+        self.put(ImageResultCache(ImageStore(str(tmp_path))), 'key', data, {"api_used": "local"})
+        restarted = ImageResultCache(ImageStore(str(tmp_path)))
+        image_data, metadata = restarted.get('key')
+        assert image_data == data
+        assert metadata == {"api_used": "local"}
+        assert restarted.get('missing') is None
+        assert restarted.stats()["misses"] == 1
+
+    def test_no_second_copy_and_gc_drops_result(self, tmp_path):
+        data = tiny_png()
+        store = ImageStore(str(tmp_path))
+        digest = self.put(ImageResultCache(store), 'key', data)
+        image_files = [name for _, _, names in os.walk(tmp_path) for name in names if name.endswith('.png')]
+        assert image_files == [f"{digest}.png"]
+
+        assert store.remove(digest, time.time()) == len(data)
+        assert store.result('key') is None
+        assert ImageResultCache(store).get('key') is None
+
+class TestCreateImageCache:
+    """/create_robot_image 캐시 연동 테스트"""
+
+    def test_repeated_seeded_request_hits_cache(self, monkeypatch, isolated_app):
+        calls = {'count': 0}
+
+        async def fake_huggingface(prompt, **kwargs):
+            calls['count'] += 1
+            return tiny_png('red')
+
+        monkeypatch.setattr(sd, 'generate_with_huggingface', fake_huggingface)
+
+        client = TestClient(sd.app)
+        payload = {"prompt": "test robot", "resolution": "64x64", "seed": 42, "include_base64": True}
+        first = client.post("/create_robot_image", json=payload).json()
+        second = client.post("/create_robot_image", json=payload).json()
+
+        assert calls['count'] == 1
+        assert "cache_hit" not in first["metadata"]
+        assert second["metadata"]["cache_hit"] is True
+        assert second["image_base64"] == first["image_base64"]
+        # 캐시 적중도 저장소 경로를 반환하고 캐시 계층 경로/확장자를 메타데이터에 넣지 않음
+        assert second["image_path"] == first["image_path"]
+        assert not {"image_path", "extension"} & set(second["metadata"])
+        assert client.get("/health").json()["image_cache"]["memory_hits"] == 1
+
+    def test_cache_hit_restores_image_removed_by_gc(self, monkeypatch, isolated_app):
+        async def fake_huggingface(prompt, **kwargs):
+            return tiny_png('green')
+
+        monkeypatch.setattr(sd, 'generate_with_huggingface', fake_huggingface)
+
+        client = TestClient(sd.app)
+        payload = {"prompt": "gc robot", "resolution": "64x64", "seed": 7}
+        first = client.post("/create_robot_image", json=payload).json()
+        os.remove(first["image_path"])  # 저장소 GC 가 파일만 지운 상황
+        assert client.get(first["image_url"]).status_code == 404
+
+        second = client.post("/create_robot_image", json=payload).json()
+        assert second["metadata"]["cache_hit"] is True
+        assert second["image_url"] == first["image_url"]
+        served = client.get(second["image_url"])
+        assert served.status_code == 200
+        assert served.content == tiny_png('green')
+
+class TestSingleFlight:
+    """동일 요청 합치기 테스트"""
+
+    def test_concurrent_identical_requests_share_one_generation(self, monkeypatch, isolated_app):
+        calls = {'count': 0}
+
+        async def slow_huggingface(prompt, **kwargs):
+            calls['count'] += 1
+            await asyncio.sleep(0.2)
+            return tiny_png('blue')
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=sd.app)
+            payload = {"prompt": "preview robot", "resolution": "64x64"}
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                responses = await asyncio.gather(*[
+                    client.post("/create_robot_image", json=payload) for _ in range(4)
+                ])
+                other = await client.post("/create_robot_image",
+                                          json=dict(payload, prompt="another robot"))
+            return responses, other
+
+        monkeypatch.setattr(sd, 'generate_with_huggingface', slow_huggingface)
+
+        responses, other = asyncio.run(scenario())
+        assert all(r.status_code == 200 for r in responses)
+        assert len({r.json()["image_path"] for r in responses}) == 1
+        assert other.status_code == 200
+        assert calls['count'] == 2
+        stats = sd.generation_flight.stats()
+        assert stats["dedup_hits"] == 3
+        assert stats["leaders"] == 2
+        assert stats["in_flight"] == 0
+
+    def test_failure_is_shared_and_forgotten(self):
+        flight = SingleFlight()
+
+        async def boom():
+            await asyncio.sleep(0.05)
+            raise ValueError("boom")
+
+        async def scenario():
+            results = await asyncio.gather(flight.do('k', boom), flight.do('k', boom),
+                                           return_exceptions=True)
+            assert all(isinstance(r, ValueError) for r in results)
+            assert flight.stats()["in_flight"] == 0
+
+        asyncio.run(scenario())
@@ -0,0 +1,96 @@
+import pytest
+import sys
+import os
+import json
+from io import BytesIO
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    from PIL import Image
+    from fastapi.testclient import TestClient
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp.image_delivery import RangeNotSatisfiable, parse_range
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+def provider_png() -> bytes:
+    buffered = BytesIO()
+    Image.effect_noise((64, 64), 40).convert('RGB').save(buffered, format="PNG")
+    return buffered.getvalue()
+
+class TestParseRange:
+    """Range 헤더 해석 테스트"""
+
+    def test_ranges(self):
+        assert parse_range(None, 100) is None
+        assert parse_range("bytes=0-9", 100) == (0, 9)
+        assert parse_range("bytes=90-", 100) == (90, 99)
+        assert parse_range("bytes=-10", 100) == (90, 99)
+        assert parse_range("bytes=50-500", 100) == (50, 99)
+        # 다중 범위/잘못된 형식은 전체 응답
+        assert parse_range("bytes=0-1,5-6", 100) is None
+        assert parse_range("items=0-1", 100) is None
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range("bytes=100-", 100)
+
+class TestImageDelivery:
+    """/create_robot_image 응답 모드와 GET /images/{id} 테스트"""
+
+    def setup_method(self):
+        self.image_bytes = provider_png()
+
+    @pytest.fixture
+    def client(self, monkeypatch, isolated_app):
+        async def huggingface(prompt, **kwargs):
+            return self.image_bytes
+
+        monkeypatch.setattr(sd, 'generate_with_huggingface', huggingface)
+        return TestClient(sd.app)
+
+    def test_base64_is_opt_in_and_image_is_served_by_url(self, client):
+        body = client.post("/create_robot_image", json={"prompt": "robot"}).json()
+        assert body["image_base64"] is None
+        assert body["image_url"] == f"/images/{body['image_id']}"
+
+        full = client.get(body["image_url"])
+        assert full.status_code == 200
+        assert full.headers["content-type"] == "image/png"
+        assert full.headers["accept-ranges"] == "bytes"
+        assert full.content == self.image_bytes
+
+        cached = client.get(body["image_url"], headers={"If-None-Match": full.headers["etag"]})
+        assert cached.status_code == 304
+        assert cached.content == b""
+
+    def test_range_requests(self, client):
+        url = client.post("/create_robot_image", json={"prompt": "robot"}).json()["image_url"]
+        size = len(self.image_bytes)
+
+        partial = client.get(url, headers={"Range": "bytes=10-19"})
+        assert partial.status_code == 206
+        assert partial.headers["content-range"] == f"bytes 10-19/{size}"
+        assert partial.content == self.image_bytes[10:20]
+
+        tail = client.get(url, headers={"Range": "bytes=-8"})
+        assert tail.content == self.image_bytes[-8:]
+
+        beyond = client.get(url, headers={"Range": f"bytes={size}-"})
+        assert beyond.status_code == 416
+        assert beyond.headers["content-range"] == f"bytes */{size}"
+
+    def test_unknown_or_unsafe_ids_are_404(self, client):
+        assert client.get("/images/missing").status_code == 404
+        assert client.get("/images/..%2Fsecret").status_code == 404
+
+    def test_multipart_response_carries_json_and_binary(self, client):
+        response = client.post("/create_robot_image", json={"prompt": "robot"},
+                               headers={"Accept": "multipart/mixed"})
+        content_type = response.headers["content-type"]
+        assert content_type.startswith("multipart/mixed; boundary=")
+        boundary = content_type.split("boundary=")[1].encode()
+
+        parts = response.content.split(b"--" + boundary)
+        json_part = parts[1].split(b"\r\n\r\n", 1)[1].rstrip(b"\r\n")
+        image_part = parts[2].split(b"\r\n\r\n", 1)[1][:-2]
+        assert json.loads(json_part)["metadata"]["api_used"] == "huggingface"
+        assert image_part == self.image_bytes
@@ -0,0 +1,128 @@
+import pytest
+import sys
+import os
+import base64
+import asyncio
+from io import BytesIO
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    from PIL import Image
+    from PIL.PngImagePlugin import PngInfo
+    from fastapi.testclient import TestClient
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp.cloud_proxy import LocalFallbackAPI
+    from stable_diffusion_mcp.image_cache import request_cache_key
+    from stable_diffusion_mcp.image_io import detect_format, encode_image, output_options, to_format
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+def encoded(image_format: str, **params) -> bytes:
+    buffered = BytesIO()
+    Image.new('RGB', (16, 16), color='orange').save(buffered, format=image_format, **params)
+    return buffered.getvalue()
+
+class TestImageBytes:
+    """이미지 바이트 포맷 처리 테스트"""
+
+    def test_detect_format_from_magic_bytes(self):
+        assert detect_format(encoded('PNG')) == 'png'
+        assert detect_format(encoded('JPEG')) == 'jpeg'
+        assert detect_format(encoded('WEBP')) == 'webp'
+        assert detect_format(b'not an image') is None
+
+    def test_matching_format_passes_through_unchanged(self):
+        data = encoded('PNG')
+        result, converted = to_format(data, 'png')
+        assert result is data
+        assert converted is False
+
+    def test_other_format_is_converted_once(self):
+        result, converted = to_format(encoded('JPEG'), 'png')
+        assert converted is True
+        assert detect_format(result) == 'png'
+
+class TestCreateRobotImagePassThrough:
+    """/create_robot_image 가 프로바이더 바이트를 재인코딩하지 않는지 확인"""
+
+    def test_provider_png_is_written_and_returned_verbatim(self, monkeypatch, isolated_app):
+        # 텍스트 청크가 들어간 PNG 는 재인코딩되면 바이트가 달라짐
+        info = PngInfo()
+        info.add_text("source", "provider")
+        provider_bytes = encoded('PNG', pnginfo=info)
+
+        async def huggingface(prompt, **kwargs):
+            return provider_bytes
+
+        monkeypatch.setattr(sd, 'generate_with_huggingface', huggingface)
+
+        response = TestClient(sd.app).post("/create_robot_image",
+                                           json={"prompt": "robot", "include_base64": True})
+        assert response.status_code == 200
+        body = response.json()
+        with open(body["image_path"], 'rb') as f:
+            assert f.read() == provider_bytes
+        assert base64.b64decode(body["image_base64"]) == provider_bytes
+
+class TestOutputFormat:
+    """출력 포맷 옵션 테스트"""
+
+    def test_output_options_defaults_and_validation(self):
+        assert output_options({}) == {'image_format': 'png', 'quality': 85,
+                                      'compress_level': 6, 'optimize': False}
+        assert output_options({'output_format': 'jpg'})['image_format'] == 'jpeg'
+        with pytest.raises(ValueError):
+            output_options({'output_format': 'gif'})
+
+    def test_encode_honors_format_and_compress_level(self):
+        image = Image.effect_noise((64, 64), 30).convert('RGB')
+        assert detect_format(encode_image(image, 'webp', quality=50)) == 'webp'
+        assert detect_format(encode_image(image.convert('RGBA'), 'jpeg')) == 'jpeg'
+        stored = encode_image(image, 'png', compress_level=0)
+        compressed = encode_image(image, 'png', compress_level=9)
+        assert len(stored) > len(compressed)
+
+    def test_request_format_reaches_file_and_cache_key(self, monkeypatch, isolated_app):
+        async def huggingface(prompt, **kwargs):
+            return encoded('PNG')
+
+        monkeypatch.setattr(sd, 'generate_with_huggingface', huggingface)
+
+        body = TestClient(sd.app).post("/create_robot_image", json={
+            "prompt": "robot", "output_format": "webp", "quality": 60}).json()
+        assert body["image_path"].endswith(".webp")
+        assert body["metadata"]["output_format"] == "webp"
+        with open(body["image_path"], 'rb') as f:
+            assert detect_format(f.read()) == 'webp'
+
+        png_key = request_cache_key(sd.ImageRequest(prompt="robot", seed=1))
+        webp_key = request_cache_key(sd.ImageRequest(prompt="robot", seed=1, output_format="webp"))
+        assert png_key != webp_key
+
+    def test_format_conversion_runs_off_event_loop(self, monkeypatch, isolated_app):
+        import threading
+        loop_threads, convert_threads = [], []
+        original = sd.to_format
+
+        async def huggingface(prompt, **kwargs):
+            loop_threads.append(threading.get_ident())
+            return encoded('PNG')
+
+        def recording_to_format(*args, **kwargs):
+            convert_threads.append(threading.get_ident())
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(sd, 'generate_with_huggingface', huggingface)
+        monkeypatch.setattr(sd, 'to_format', recording_to_format)
+
+        response = TestClient(sd.app).post("/create_robot_image", json={
+            "prompt": "robot", "output_format": "jpeg"})
+        assert response.status_code == 200
+        assert convert_threads and convert_threads[0] != loop_threads[0]
+
+    def test_cloud_proxy_local_fallback_honors_format(self, monkeypatch, tmp_path):
+        monkeypatch.chdir(tmp_path)
+        result = asyncio.run(LocalFallbackAPI().generate(
+            "robot", resolution="32x32", output_format="jpeg", quality=70))
+        assert result['image_path'].endswith(".jpg")
+        assert detect_format(base64.b64decode(result['image_base64'])) == 'jpeg'
@@ -0,0 +1,130 @@
+import pytest
+import sys
+import os
+import sqlite3
+import subprocess
+import threading
+from contextlib import closing
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    from fastapi.testclient import TestClient
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp.image_store import ImageStore, INDEX_FILE, content_digest
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+class TestImageStore:
+    """콘텐츠 해시 이미지 저장소 테스트"""
+
+    def test_files_are_content_addressed_and_sharded(self, tmp_path):
+        store = ImageStore(str(tmp_path / 'images'))
+        record = store.put(b'first image', 'png', prompt="robot", provider="local")
+        digest = content_digest(b'first image')
+
+        assert record["image_id"] == digest
+        assert record["path"] == str(tmp_path / 'images' / digest[:2] / digest[2:4] / f"{digest}.png")
+        with open(record["path"], 'rb') as f:
+            assert f.read() == b'first image'
+        assert store.path_for(digest) == record["path"]
+        assert store.path_for("0" * 64) is None
+
+    def test_same_second_writes_do_not_overwrite(self, tmp_path):
+        store = ImageStore(str(tmp_path))
+        threads = [threading.Thread(target=store.put, args=(f"image {i}".encode(), 'png'),
+                                    kwargs={"provider": "huggingface"}) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = store.stats()
+        assert stats["records"] == 8
+        assert stats["files"] == 8
+
+    def test_duplicate_content_is_stored_once(self, tmp_path):
+        store = ImageStore(str(tmp_path))
+        store.put(b'same', 'png', prompt="a")
+        store.put(b'same', 'png', prompt="b")
+        stats = store.stats()
+        assert stats["records"] == 2
+        assert stats["files"] == 1
+        assert stats["bytes"] == 4
+
+    def test_stats_are_cached_and_do_not_create_index(self, tmp_path):
+        store = ImageStore(str(tmp_path / 'images'), stats_ttl=60)
+        assert store.stats()["records"] == 0
+        assert not os.path.exists(tmp_path / 'images' / INDEX_FILE)
+        store.put(b'new', 'png')
+        assert store.stats()["records"] == 0  # TTL 안에서는 이전 집계 재사용
+        store.stats_ttl = 0
+        assert store.stats()["records"] == 1
+
+    def test_latest_by_prompt_and_by_provider(self, tmp_path):
+        store = ImageStore(str(tmp_path))
+        store.put(b'1', 'png', prompt="arm", provider="huggingface",
+                  params={"seed": 1}, timings={"generation_time": 1.5})
+        store.put(b'2', 'png', prompt="gripper", provider="local")
+        store.put(b'3', 'webp', prompt="arm", provider="local")
+
+        latest = store.latest()
+        assert latest["digest"] == content_digest(b'3')
+        assert latest["format"] == "webp"
+        assert store.latest(provider="huggingface")["timings"] == {"generation_time": 1.5}
+        assert [r["digest"] for r in store.by_prompt("arm")] == [content_digest(b'3'), content_digest(b'1')]
+        assert [r["prompt"] for r in store.by_provider("local")] == ["arm", "gripper"]
+        assert store.by_prompt("arm")[-1]["params"] == {"seed": 1}
+
+    def test_lookups_use_indexes_instead_of_scans(self, tmp_path):
+        store = ImageStore(str(tmp_path))
+        store.put(b'x', 'png', prompt="arm", provider="local")
+        queries = [
+            "SELECT * FROM images ORDER BY created_at DESC, id DESC LIMIT 1",
+            "SELECT * FROM images WHERE prompt = 'arm' ORDER BY created_at DESC, id DESC LIMIT 20",
+            "SELECT * FROM images WHERE provider = 'local' ORDER BY created_at DESC, id DESC LIMIT 20",
+        ]
+        with closing(sqlite3.connect(str(tmp_path / INDEX_FILE))) as conn:
+            for query in queries:
+                plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN " + query))
+                assert "USING INDEX" in plan, plan
+                assert "TEMP B-TREE" not in plan, plan
+
+class TestCreateRobotImageStore:
+    """/create_robot_image 결과가 저장소에 기록되는지 확인"""
+
+    def test_generated_image_is_indexed(self, monkeypatch, isolated_app):
+        async def huggingface(prompt, **kwargs):
+            return b'\x89PNG\r\n\x1a\n fake'
+
+        store = sd.image_store
+        monkeypatch.setattr(sd, 'generate_with_huggingface', huggingface)
+
+        client = TestClient(sd.app)
+        body = client.post("/create_robot_image", json={"prompt": "arm", "seed": 3}).json()
+        record = store.latest()
+        assert body["image_id"] == record["digest"]
+        assert body["image_path"] == record["path"]
+        assert record["provider"] == "huggingface"
+        assert record["params"]["seed"] == 3
+        assert "generation_time" in record["timings"]
+        assert client.get(body["image_url"]).content == b'\x89PNG\r\n\x1a\n fake'
+
+class TestStandaloneImport:
+    """도구가 서버 패키지 없이 저장소/인코딩 모듈을 쓰는지 테스트"""
+
+    def test_store_and_image_io_import_without_the_server_package(self):
+        src = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+        script = (
+            "import sys\n"
+            f"sys.path.insert(0, {src!r})\n"
+            "from mcp_common.image_io import encode_image\n"
+            "from mcp_common.image_store import ImageStore\n"
+            "print(sorted(m for m in sys.modules if m.split('.')[0] in ('stable_diffusion_mcp', 'fastapi', 'torch')))\n"
+        )
+        result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "[]"
+
+    def test_server_modules_reexport_the_shared_store(self):
+        from mcp_common.image_store import ImageStore as SharedStore
+        assert ImageStore is SharedStore
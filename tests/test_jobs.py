@@ -0,0 +1,68 @@
+import pytest
+import sys
+import os
+import asyncio
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    import httpx
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp.jobs import Job, JobStore
+    from conftest import FakePipeline, parse_sse
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+class TestJobStore:
+    """작업 저장소 단위 테스트"""
+
+    def test_finished_jobs_expire_after_ttl(self):
+        async def scenario():
+            store = JobStore(ttl=60)
+            running = store.create({"num_inference_steps": 5})
+            running.set_status(Job.RUNNING)
+            done = store.create({"num_inference_steps": 5})
+            done.succeed({"image_path": "x.png"})
+            done.updated_at -= 120
+            running.updated_at -= 120
+            assert store.get(done.id) is None
+            assert store.get(running.id) is running
+            assert store.stats()["evicted"] == 1
+
+        asyncio.run(scenario())
+
+class TestJobsAPI:
+    """/jobs 엔드포인트 테스트"""
+
+    def setup_method(self):
+        self.steps = 4
+
+    def test_job_reports_progress_and_result(self, local_only):
+        local_only(FakePipeline(step_delay=0.01))
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=sd.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                created = await client.post("/jobs", json={
+                    "prompt": "robot", "resolution": "64x64",
+                    "num_inference_steps": self.steps})
+                job_id = created.json()["job_id"]
+                events = await client.get(f"/jobs/{job_id}/events")
+                final = await client.get(f"/jobs/{job_id}")
+                missing = await client.get("/jobs/unknown")
+            return created, events, final, missing
+
+        created, events, final, missing = asyncio.run(scenario())
+        assert created.status_code == 202
+        assert created.json()["status"] in ("queued", "running")
+        assert events.headers["content-type"].startswith("text/event-stream")
+
+        parsed = parse_sse(events.text)
+        steps = [e["step"] for e in parsed if e["type"] == "progress"]
+        assert steps == list(range(1, self.steps + 1))
+        assert parsed[-1]["type"] == "result"
+
+        body = final.json()
+        assert body["status"] == "succeeded"
+        assert body["progress"] == {"step": self.steps, "total": self.steps}
+        assert body["result"]["metadata"]["api_used"] == "local"
+        assert missing.status_code == 404
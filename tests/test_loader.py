@@ -0,0 +1,112 @@
+import pytest
+import sys
+import os
+import time
+import asyncio
+import threading
+import subprocess
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    import httpx
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp.loader import PipelineLoader
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..', 'src')
+
+class TestPipelineLoader:
+    """파이프라인 로더 단위 테스트"""
+
+    def test_background_load_reports_stage_and_becomes_ready(self):
+        release = threading.Event()
+
+        def load(report_stage):
+            report_stage("모델 가중치 로드")
+            release.wait(5)
+            return True
+
+        async def scenario():
+            loader = PipelineLoader(load, mode='background')
+            loader.start()
+            await asyncio.sleep(0.05)
+            during = loader.snapshot()
+            settled_during = loader.is_settled()
+            release.set()
+            ok = await loader.wait()
+            return during, settled_during, ok, loader
+
+        during, settled_during, ok, loader = asyncio.run(scenario())
+        assert during["status"] == "loading"
+        assert during["stage"] == "모델 가중치 로드"
+        assert settled_during is False
+        assert ok is True
+        assert loader.status == "ready"
+        assert loader.is_settled()
+
+    def test_failed_load_is_settled_with_error(self):
+        def load(report_stage):
+            raise RuntimeError("weights missing")
+
+        loader = PipelineLoader(load, mode='lazy')
+        assert loader.can_load_on_demand()
+        assert asyncio.run(loader.wait()) is False
+        assert loader.status == "failed"
+        assert loader.snapshot()["error"] == "weights missing"
+        assert not loader.can_load_on_demand()
+        assert loader.is_settled()
+
+    def test_off_mode_never_loads(self):
+        loader = PipelineLoader(lambda report_stage: True, mode='off')
+        assert loader.start() is None
+        assert loader.status == "disabled"
+        assert loader.is_settled()
+
+class TestLazyImports:
+    """서버 모듈 임포트가 무거운 의존성을 끌어오지 않는지 확인"""
+
+    def test_import_does_not_load_torch_or_diffusers(self):
+        code = ("import sys; import stable_diffusion_mcp; "
+                "print('torch' in sys.modules, 'diffusers' in sys.modules)")
+        result = subprocess.run([sys.executable, "-c", code], cwd=SRC_DIR,
+                                capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.split() == ["False", "False"]
+
+class TestReadiness:
+    """/health (생존) 와 /ready (준비) 분리 테스트"""
+
+    def test_ready_is_503_while_loading_and_health_stays_200(self, monkeypatch, isolated_app):
+        release = threading.Event()
+
+        def load(report_stage):
+            report_stage("모델 가중치 로드")
+            release.wait(5)
+            return False
+
+        loader = PipelineLoader(load, mode='background')
+        monkeypatch.setattr(sd, 'pipeline_loader', loader)
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=sd.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                loader.start()
+                started = time.perf_counter()
+                health = await client.get("/health")
+                health_latency = time.perf_counter() - started
+                loading = await client.get("/ready")
+                release.set()
+                await loader.wait()
+                settled = await client.get("/ready")
+            return health, health_latency, loading, settled
+
+        health, health_latency, loading, settled = asyncio.run(scenario())
+        assert health.status_code == 200
+        assert health_latency < 0.5
+        assert health.json()["pipeline_loader"]["status"] == "loading"
+        assert loading.status_code == 503
+        assert loading.json()["pipeline_loader"]["stage"] == "모델 가중치 로드"
+        # 로딩 실패는 더미/클라우드 모드로 서비스 가능하므로 준비 완료
+        assert settled.status_code == 200
+        assert settled.json()["pipeline_loader"]["status"] == "failed"
@@ -0,0 +1,154 @@
+import pytest
+import sys
+import os
+import asyncio
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp import ImageRequest
+    from stable_diffusion_mcp.executor import QueueFullError
+    from stable_diffusion_mcp.memory_admission import (
+        MemoryAdmission, MemoryAdmissionError, MemoryEstimator, PeakRSSSampler, VAEModeGate
+    )
+    from conftest import FakePipeline
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+MB = 1024 * 1024
+
+class FakeVAE:
+    use_tiling = False
+    use_slicing = False
+
+class AllocatingPipeline(FakePipeline):
+    """호출 중 VAE 설정을 기록하고 메모리를 잠깐 할당하는 테스트용 파이프라인"""
+
+    def __init__(self):
+        super().__init__()
+        self.vae = FakeVAE()
+        self.seen = []
+
+    def __call__(self, prompt, width, height, **kwargs):
+        self.seen.append((self.vae.use_tiling, self.vae.use_slicing))
+        block = bytearray(64 * MB)
+        block[::4096] = b'\x01' * len(block[::4096])  # 페이지를 실제로 건드려 RSS 증가
+        return super().__call__(prompt, width, height, **kwargs)
+
+class TestMemoryEstimator:
+    """피크 메모리 추정 테스트"""
+
+    def test_large_resolutions_turn_on_tiling_and_cap_estimate(self):
+        estimator = MemoryEstimator()
+        assert estimator.vae_options(512, 512, 1) == (False, False)
+        assert estimator.vae_options(1024, 1024, 1) == (True, False)
+        assert estimator.vae_options(512, 512, 4) == (False, True)
+        vae_only = MemoryEstimator(unet_bytes_per_latent_px=0)
+        untiled = MemoryEstimator(unet_bytes_per_latent_px=0, tiling_min_pixels=10**9)
+        assert vae_only.raw_estimate(1024, 1024, 1) < untiled.raw_estimate(1024, 1024, 1) / 1.5
+        assert estimator.raw_estimate(512, 512, 2) > estimator.raw_estimate(512, 512, 1)
+
+    def test_calibration_scale_follows_measured_ratio(self):
+        estimator = MemoryEstimator(calibration_min_samples=3)
+        raw = estimator.raw_estimate(512, 512, 1)
+        for _ in range(2):
+            estimator.record(512, 512, 1, raw * 2, 1.0)
+        assert estimator.scale() == 1.0  # 표본 부족
+        estimator.record(512, 512, 1, raw * 2, 1.0)
+        assert estimator.scale() == pytest.approx(2.0, rel=0.01)
+        assert estimator.estimate(512, 512, 1) == pytest.approx(raw * 2, rel=0.01)
+
+    def test_peak_rss_sampler_sees_allocation(self):
+        with PeakRSSSampler() as sampler:
+            AllocatingPipeline()(["x"], 8, 8)
+        assert sampler.delta >= 32 * MB or sampler.baseline == 0
+
+class TestMemoryAdmission:
+    """메모리 예산 입장 제어 테스트"""
+
+    def test_reservations_over_budget_wait_in_order(self):
+        admission = MemoryAdmission(budget_bytes=100, timeout=5)
+        order = []
+
+        async def job(name, nbytes, hold):
+            async with admission.reserve(nbytes):
+                order.append(f"{name}+")
+                await asyncio.sleep(hold)
+                order.append(f"{name}-")
+
+        async def scenario():
+            await asyncio.gather(job("a", 60, 0.05), job("b", 60, 0.01), job("c", 30, 0.01))
+
+        asyncio.run(scenario())
+        assert order[:3] == ["a+", "a-", "b+"]  # c 는 b 뒤 순서 유지 (새치기 없음)
+        assert admission.stats()["waited"] == 2
+        assert admission.in_use == 0
+
+    def test_oversized_request_runs_alone_and_timeout_rejects(self):
+        admission = MemoryAdmission(budget_bytes=100, timeout=0.05)
+
+        async def scenario():
+            async with admission.reserve(500):  # 예산보다 커도 혼자면 실행
+                with pytest.raises(MemoryAdmissionError) as raised:
+                    async with admission.reserve(10):
+                        pass
+                return raised.value
+
+        error = asyncio.run(scenario())
+        assert isinstance(error, QueueFullError)  # /create_robot_image 에서 429
+        assert admission.stats()["rejected"] == 1
+        assert admission.in_use == 0
+
+class TestPipelineIntegration:
+    """로컬 배치 실행의 VAE 자동 설정과 피크 기록"""
+
+    def test_batch_enables_tiling_and_records_peak(self, monkeypatch):
+        pipe = AllocatingPipeline()
+        estimator = MemoryEstimator(tiling_min_pixels=32)
+        monkeypatch.setattr(sd, 'pipeline', pipe)
+        monkeypatch.setattr(sd, 'memory_estimator', estimator)
+
+        items = [(ImageRequest(prompt="robot", seed=1, resolution="8x8"), None) for _ in range(2)]
+        sd.run_pipeline_batch((8, 8, 2, 7.5, None, sd.DEFAULT_MODEL), items)
+
+        assert pipe.seen == [(True, True)]
+        sample = estimator.stats()["recent"][-1]
+        assert (sample["resolution"], sample["batch"], sample["vae_tiling"]) == ("8x8", 2, True)
+        assert sample["peak_rss_mb"] >= 0
+
+    def test_vae_mode_gate_is_per_vae(self):
+        gate = VAEModeGate()
+        first, second = AllocatingPipeline(), AllocatingPipeline()
+        entered = threading.Event()
+        release = threading.Event()
+
+        def hold_first():
+            with gate.use(first, True, True):
+                entered.set()
+                release.wait(5)
+
+        holder = threading.Thread(target=hold_first)
+        holder.start()
+        assert entered.wait(5)
+
+        # 다른 VAE 는 첫 번째 VAE 의 배치가 끝나기를 기다리지 않고 자기 설정으로 전환
+        with gate.use(second, False, False):
+            assert (second.vae.use_tiling, second.vae.use_slicing) == (False, False)
+            assert (first.vae.use_tiling, first.vae.use_slicing) == (True, True)
+
+        # 같은 VAE 의 다른 설정은 실행 중인 배치가 끝날 때까지 대기
+        switched = threading.Event()
+
+        def switch_first():
+            with gate.use(first, False, False):
+                switched.set()
+
+        switcher = threading.Thread(target=switch_first)
+        switcher.start()
+        assert not switched.wait(0.2)
+        release.set()
+        assert switched.wait(5)
+        holder.join()
+        switcher.join()
+        assert (first.vae.use_tiling, first.vae.use_slicing) == (False, False)
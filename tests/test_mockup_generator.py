@@ -0,0 +1,87 @@
+import pytest
+import sys
+import os
+import subprocess
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'tools'))
+
+try:
+    import numpy as np
+    from PIL import Image, ImageDraw
+    from mockup_generator import (
+        PIXEL, create_robot_mockup, create_robot_mockups, draw_ellipse, fill_gradient, mockup_params,
+        render_mockup, to_image
+    )
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+class TestVectorizedRenderer:
+    """NumPy 목업 렌더러 테스트"""
+
+    def test_gradient_matches_row_loop(self):
+        width, height = 40, 96
+        canvas = np.zeros((height, width), dtype=PIXEL)
+        fill_gradient(canvas, (26, 26, 46), (30, 40, 50))
+
+        expected = Image.new('RGB', (width, height))
+        draw = ImageDraw.Draw(expected)
+        for y in range(height):
+            draw.line([(0, y), (width, y)], fill=(int(26 + (y / height) * 30), int(26 + (y / height) * 40),
+                                                  int(46 + (y / height) * 50)))
+        assert to_image(canvas).convert('RGB').tobytes() == expected.tobytes()
+
+    def test_ellipse_outline_and_fill(self):
+        canvas = np.zeros((64, 64), dtype=PIXEL)
+        draw_ellipse(canvas, [8, 8, 56, 56], fill='#ff0000', outline='#00ff00', width=3)
+        image = to_image(canvas).convert('RGB')
+        assert image.getpixel((32, 32)) == (255, 0, 0)
+        assert image.getpixel((32, 9)) == (0, 255, 0)
+        assert image.getpixel((2, 2)) == (0, 0, 0)
+
+    def test_params_are_deterministic_per_prompt(self):
+        assert mockup_params("robot arm") == mockup_params("robot arm")
+        assert mockup_params("robot arm") != mockup_params("robot arm", variant=1)
+        canvas = render_mockup(128, 96, mockup_params("gripper"))
+        assert canvas.shape == (96, 128)
+        assert np.array_equal(canvas, render_mockup(128, 96, mockup_params("gripper")))
+
+class TestBatchMockups:
+    """프로세스 풀 배치 생성 테스트"""
+
+    def test_batch_keeps_order_and_stores_images(self, monkeypatch, tmp_path):
+        monkeypatch.chdir(tmp_path)
+        prompts = ["arm", "gripper", "mobile base"]
+        results = create_robot_mockups(prompts, resolution="96x64", variants=2, processes=2)
+
+        assert [(r["variant"]) for r in results] == [0, 1] * 3
+        assert len({r["image_id"] for r in results}) == 6
+        for result in results:
+            with Image.open(result["image_path"]) as image:
+                assert (image.format, image.size) == ('PNG', (96, 64))
+
+    def test_jpeg_output_skips_rgb_conversion(self, monkeypatch, tmp_path):
+        monkeypatch.chdir(tmp_path)
+        result, = create_robot_mockups(["arm"], resolution="64x64", processes=1, output_format="jpeg")
+        with Image.open(result["image_path"]) as image:
+            assert (image.format, image.mode) == ('JPEG', 'RGB')
+
+    def test_default_single_mockup_keeps_the_fixed_design(self, monkeypatch, tmp_path):
+        monkeypatch.chdir(tmp_path)
+        first = create_robot_mockup("arm", resolution="96x64")
+        second = create_robot_mockup("mobile base", resolution="96x64")
+        assert first["image_id"] == second["image_id"]
+        assert first["variant"] is None
+        varied = create_robot_mockup("arm", resolution="96x64", variant=0)
+        assert varied["image_id"] != first["image_id"]
+
+    def test_pool_workers_do_not_import_the_server_package(self):
+        tools = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools')
+        script = (
+            "import sys\n"
+            f"sys.path.insert(0, {tools!r})\n"
+            "import mockup_generator\n"
+            "print(sorted(m for m in sys.modules if m.split('.')[0] in ('stable_diffusion_mcp', 'fastapi', 'torch')))\n"
+        )
+        result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "[]"
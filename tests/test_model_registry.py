@@ -0,0 +1,131 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+torch = pytest.importorskip('torch')
+
+try:
+    from pydantic import ValidationError
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp import ImageRequest
+    from stable_diffusion_mcp.model_registry import ModelRegistry, _file_fingerprint, parse_model_catalog
+    from conftest import FakePipeline
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+LINEAR_BYTES = 10 * 10 * 4 + 10 * 4  # Linear(10, 10) float32 가중치 + 편향
+
+class ComponentPipeline(FakePipeline):
+    """unet/vae/text_encoder 를 가진 테스트용 파이프라인"""
+
+    def __init__(self, model_id, shared):
+        super().__init__()
+        self.model_id = model_id
+        self.unet = torch.nn.Linear(10, 10)
+        self.vae = shared.get('vae') or torch.nn.Linear(10, 10)
+        self.text_encoder = shared.get('text_encoder') or torch.nn.Linear(10, 10)
+
+    @property
+    def components(self):
+        return {"unet": self.unet, "vae": self.vae, "text_encoder": self.text_encoder}
+
+def files(vae="vae-a", text_encoder="te-a", unet=None):
+    return {"unet": (unet or f"unet-{vae}-{text_encoder}", LINEAR_BYTES),
+            "vae": (vae, LINEAR_BYTES), "text_encoder": (text_encoder, LINEAR_BYTES)}
+
+def make_registry(budget_models=2, model_files=None):
+    loads = []
+    model_files = model_files or {"base": files(), "fast": files(vae="vae-b", text_encoder="te-b"),
+                                  "final": files(vae="vae-c", text_encoder="te-c")}
+
+    def load(model_id, shared, report_stage):
+        loads.append((model_id, sorted(shared)))
+        return ComponentPipeline(model_id, shared)
+
+    registry = ModelRegistry(load, catalog={alias: alias for alias in model_files},
+                             budget_bytes=budget_models * 3 * LINEAR_BYTES,
+                             inspect_fn=lambda model_id: model_files[model_id])
+    return registry, loads
+
+class TestModelCatalog:
+    """카탈로그 파싱과 별칭 해석 테스트"""
+
+    def test_parse_aliases_and_bare_ids(self):
+        catalog = parse_model_catalog("sd21=stabilityai/stable-diffusion-2-1, org/other-model")
+        assert list(catalog.items()) == [("sd21", "stabilityai/stable-diffusion-2-1"),
+                                         ("other-model", "org/other-model")]
+
+    def test_request_model_is_resolved_to_alias(self):
+        assert ImageRequest(prompt="robot").model == sd.DEFAULT_MODEL
+        assert ImageRequest(prompt="robot", model=sd.MODEL_ID).model == sd.DEFAULT_MODEL
+        with pytest.raises(ValidationError):
+            ImageRequest(prompt="robot", model="no-such-model")
+
+class TestModelRegistry:
+    """상주/축출/공유 테스트"""
+
+    def test_lru_eviction_keeps_default_pinned(self):
+        registry, loads = make_registry(budget_models=2)
+        registry.get("base")
+        registry.get("fast")
+        registry.get("fast")
+        registry.get("final")  # 예산 2개 → 기본 모델이 아닌 가장 오래된 fast 축출
+
+        stats = registry.stats()
+        assert stats["resident"] == ["base", "final"]
+        assert stats["evictions"] == 1
+        assert not stats["models"]["fast"]["resident"]
+        assert stats["models"]["fast"]["loads"] == 1
+        assert stats["models"]["fast"]["load_seconds"] is not None
+        assert stats["resident_bytes"] <= stats["budget_bytes"]
+        assert [model_id for model_id, _ in loads] == ["base", "fast", "final"]
+
+    def test_resident_model_is_not_reloaded(self):
+        registry, loads = make_registry()
+        first = registry.get("fast")
+        assert registry.get("fast") is first
+        assert len(loads) == 1
+        assert registry.stats()["models"]["fast"]["uses"] == 2
+
+    def test_matching_components_are_shared(self):
+        registry, loads = make_registry(model_files={
+            "base": files(), "variant": files(unet="unet-variant")})
+        base = registry.get("base")
+        variant = registry.get("variant")
+
+        assert loads[1] == ("variant", ["text_encoder", "vae"])
+        assert variant.vae is base.vae and variant.text_encoder is base.text_encoder
+        stats = registry.stats()
+        assert stats["resident_bytes"] == 4 * LINEAR_BYTES  # 공유 모듈은 한 번만
+        assert stats["models"]["variant"]["shared_components"] == ["text_encoder", "vae"]
+
+    def test_local_fingerprint_uses_stat_not_content(self, tmp_path, monkeypatch):
+        weights = tmp_path / "diffusion_pytorch_model.safetensors"
+        weights.write_bytes(b"w" * 1024)
+        link = tmp_path / "link.safetensors"
+        link.symlink_to(weights)
+        first = _file_fingerprint(str(weights))
+        assert _file_fingerprint(str(link)) == first
+
+        # 내용은 읽지 않고 stat 만 사용
+        def no_read(*args, **kwargs):
+            raise AssertionError("가중치 파일을 읽으면 안 됨")
+        monkeypatch.setattr('builtins.open', no_read)
+        assert _file_fingerprint(str(weights)) == first
+        monkeypatch.undo()
+
+        os.utime(weights, ns=(0, 1_000_000_000))
+        assert _file_fingerprint(str(weights)) != first
+
+    def test_batch_uses_requested_model(self, monkeypatch):
+        registry, loads = make_registry(model_files={sd.DEFAULT_MODEL: files(), "fast": files(vae="vae-b")})
+        registry.catalog[sd.DEFAULT_MODEL] = sd.MODEL_ID
+        default_pipe = ComponentPipeline(sd.MODEL_ID, {})
+        monkeypatch.setattr(sd, 'model_registry', registry)
+        monkeypatch.setattr(sd, 'pipeline', default_pipe)
+
+        items = [(ImageRequest(prompt="robot", seed=1, resolution="8x8", model="fast"), None)]
+        assert len(sd.run_pipeline_batch((8, 8, 2, 7.5, None, "fast"), items)) == 1
+        assert default_pipe.calls == []
+        assert loads == [("fast", [])]
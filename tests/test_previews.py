@@ -0,0 +1,73 @@
+import pytest
+import sys
+import os
+import asyncio
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+torch = pytest.importorskip('torch')
+
+try:
+    import httpx
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp.image_io import detect_format
+    from stable_diffusion_mcp.previews import latents_to_image, preview_due
+    from conftest import FakePipeline, parse_sse
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+class TestLatentPreview:
+    """잠재값 → RGB 근사 투영 테스트"""
+
+    def test_projection_keeps_latent_resolution(self):
+        image = latents_to_image(torch.zeros(4, 16, 24))
+        assert (image.mode, image.size) == ('RGB', (24, 16))
+        assert image.getpixel((0, 0)) == (127, 127, 127)  # 잠재값 0 → 중간 회색
+
+    def test_preview_schedule_skips_final_step(self):
+        assert [step for step in range(1, 9) if preview_due(step, 8, 3)] == [3, 6]
+        assert not any(preview_due(step, 8, 0) for step in range(1, 9))
+
+class TestJobPreviewsAndCancel:
+    """/jobs 미리보기 이벤트와 취소 테스트"""
+
+    def test_preview_events_and_latest_preview(self, local_only):
+        local_only(FakePipeline(step_delay=0.01, latents=True))
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=sd.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                created = await client.post("/jobs", json={
+                    "prompt": "robot", "resolution": "64x64", "num_inference_steps": 5, "preview_every": 2})
+                job_id = created.json()["job_id"]
+                events = await client.get(f"/jobs/{job_id}/events")
+                preview = await client.get(f"/jobs/{job_id}/preview")
+            return events, preview
+
+        events, preview = asyncio.run(scenario())
+        previews = [e for e in parse_sse(events.text) if e["type"] == "preview"]
+        assert [e["step"] for e in previews] == [2, 4]
+        assert preview.status_code == 200
+        assert detect_format(preview.content) == 'jpeg'
+        assert preview.headers["x-preview-step"] == "4"
+
+    def test_cancel_stops_local_denoising_early(self, local_only):
+        pipe = local_only(FakePipeline(step_delay=0.05, latents=True))
+
+        async def scenario():
+            transport = httpx.ASGITransport(app=sd.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                created = await client.post("/jobs", json={
+                    "prompt": "robot", "resolution": "64x64", "num_inference_steps": 40})
+                job_id = created.json()["job_id"]
+                while sd.job_store.get(job_id).progress["step"] < 2:
+                    await asyncio.sleep(0.02)
+                cancelled = await client.delete(f"/jobs/{job_id}")
+                await asyncio.sleep(0.3)  # 추론 스레드가 다음 스텝 경계에 도달할 시간
+                final = await client.get(f"/jobs/{job_id}")
+            return cancelled, final
+
+        cancelled, final = asyncio.run(scenario())
+        assert cancelled.json()["status"] == "cancelled"
+        assert final.json()["status"] == "cancelled"
+        assert pipe.steps_run < 40
+        assert sd.local_batcher.stats()["cancelled_batches"] == 1
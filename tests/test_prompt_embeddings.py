@@ -0,0 +1,95 @@
+import pytest
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+torch = pytest.importorskip('torch')
+
+try:
+    from PIL import Image
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp import ImageRequest
+    from stable_diffusion_mcp.prompt_embeddings import PromptEmbeddingCache
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+class TokenizerOutput:
+    def __init__(self, input_ids):
+        self.input_ids = input_ids
+
+class WordTokenizer:
+    """공백 단위로 자르고 최대 길이에 맞춰 패딩하는 테스트용 토크나이저"""
+
+    model_max_length = 6
+
+    def __call__(self, text, padding, max_length, truncation):
+        ids = [hash(word) % 1000 for word in text.split()][:max_length]
+        return TokenizerOutput(ids + [0] * (max_length - len(ids)))
+
+class EncodingPipeline:
+    """encode_prompt 호출 횟수를 세는 테스트용 파이프라인"""
+
+    _execution_device = 'cpu'
+
+    def __init__(self):
+        self.tokenizer = WordTokenizer()
+        self.encoded = []
+        self.calls = []
+
+    def encode_prompt(self, prompt, device, num_images_per_prompt, do_classifier_free_guidance):
+        self.encoded.append(prompt)
+        return torch.full((1, 6, 4), float(len(prompt))), None
+
+    def __call__(self, prompt_embeds, negative_prompt_embeds, width, height, **kwargs):
+        self.calls.append((prompt_embeds, negative_prompt_embeds))
+        return type("Output", (), {"images": [Image.new('RGB', (width, height))
+                                              for _ in range(prompt_embeds.shape[0])]})()
+
+class TestPromptEmbeddingCache:
+    """프롬프트 임베딩 캐시 테스트"""
+
+    def test_same_tokens_hit_and_model_id_separates(self):
+        cache = PromptEmbeddingCache()
+        pipe = EncodingPipeline()
+        first = cache.encode(pipe, "model-a", "red robot arm")
+        again = cache.encode(pipe, "model-a", "red  robot   arm")
+        cache.encode(pipe, "model-b", "red robot arm")
+
+        assert again is first
+        assert pipe.encoded == ["red robot arm", "red robot arm"]
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 2
+        assert stats["hit_rate"] == pytest.approx(1 / 3, abs=1e-3)
+        assert stats["bytes"] == 2 * 6 * 4 * 4
+
+    def test_lru_eviction_by_memory(self):
+        entry_bytes = 6 * 4 * 4
+        cache = PromptEmbeddingCache(max_bytes=2 * entry_bytes)
+        pipe = EncodingPipeline()
+        for text in ("one", "two", "three"):
+            cache.encode(pipe, "m", text)
+        cache.encode(pipe, "m", "one")
+        assert cache.stats()["entries"] == 2
+        assert pipe.encoded == ["one", "two", "three", "one"]
+
+class TestPipelineUsesEmbeddings:
+    """로컬 배치 실행이 캐시된 임베딩을 파이프라인에 넘기는지 확인"""
+
+    def test_batch_reuses_prompt_and_default_negative_embeds(self, monkeypatch):
+        pipe = EncodingPipeline()
+        cache = PromptEmbeddingCache()
+        monkeypatch.setattr(sd, 'pipeline', pipe)
+        monkeypatch.setattr(sd, 'prompt_embedding_cache', cache)
+        cache.encode(pipe, sd.MODEL_ID, sd.DEFAULT_NEGATIVE_PROMPT)  # 로드 시 미리 계산
+
+        items = [(ImageRequest(prompt="robot arm", seed=seed, resolution="8x8"), None)
+                 for seed in range(3)]
+        results = sd.run_pipeline_batch((8, 8, 2, 7.5, None, sd.DEFAULT_MODEL), items)
+
+        assert len(results) == 3
+        assert pipe.encoded == [sd.DEFAULT_NEGATIVE_PROMPT, "robot arm"]
+        prompt_embeds, negative_embeds = pipe.calls[0]
+        assert prompt_embeds.shape == (3, 6, 4)
+        assert negative_embeds.shape == (3, 6, 4)
+        assert cache.stats()["hits"] == 5
@@ -0,0 +1,121 @@
+import pytest
+import sys
+import os
+import asyncio
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    from fastapi.testclient import TestClient
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp.provider_health import (
+        CircuitBreaker, CircuitOpenError, ProviderHealthRegistry
+    )
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestCircuitBreaker:
+    """서킷 브레이커 상태 전이 테스트"""
+
+    def setup_method(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker('test', window=10, min_calls=3,
+                                      error_rate_threshold=0.5, open_seconds=30,
+                                      clock=self.clock)
+
+    def test_opens_after_error_rate_threshold(self):
+        """최소 호출 수 이후 오류율이 임계값을 넘으면 열림"""
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        assert self.breaker.state == CircuitBreaker.CLOSED
+        self.breaker.record_failure()
+        assert self.breaker.state == CircuitBreaker.OPEN
+        assert self.breaker.allow_request() is False
+        assert self.breaker.skipped == 1
+
+    def test_half_open_probe_success_closes(self):
+        """열림 시간이 지나면 탐색 호출 1회만 허용하고 성공 시 닫힘"""
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 31
+        assert self.breaker.state == CircuitBreaker.HALF_OPEN
+        assert self.breaker.allow_request() is True
+        assert self.breaker.allow_request() is False
+        self.breaker.record_success(0.2)
+        assert self.breaker.state == CircuitBreaker.CLOSED
+        assert self.breaker.error_rate() == 0.0
+
+    def test_half_open_probe_failure_reopens(self):
+        """탐색 호출이 실패하면 다시 열림"""
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 31
+        assert self.breaker.allow_request() is True
+        self.breaker.record_failure()
+        assert self.breaker.state == CircuitBreaker.OPEN
+        assert self.breaker.times_opened == 2
+
+    def test_cancelled_probe_releases_slot(self):
+        """취소된 탐색 호출은 결과로 기록하지 않고 슬롯만 반환"""
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 31
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        async def scenario():
+            task = asyncio.create_task(self.breaker.call(hang))
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(scenario())
+        assert self.breaker.state == CircuitBreaker.HALF_OPEN
+        assert self.breaker.allow_request() is True
+
+    def test_health_score_includes_latency(self):
+        """지연이 예산을 넘으면 상태 점수가 낮아짐"""
+        breaker = CircuitBreaker('slow', latency_budget=1.0, clock=self.clock)
+        breaker.record_success(0.5)
+        assert breaker.health_score() == 1.0
+        breaker.record_success(4.0)
+        assert breaker.health_score() == 0.25
+
+class TestFallbackChainSkipsOpenProviders:
+    """/create_robot_image 의 서킷 브레이커 연동 테스트"""
+
+    def test_open_provider_is_skipped(self, monkeypatch, tmp_path):
+        calls = {'huggingface': 0}
+
+        async def failing_huggingface(prompt, **kwargs):
+            calls['huggingface'] += 1
+            raise Exception("down")
+
+        async def failing_stability(prompt, **kwargs):
+            raise Exception("down")
+
+        registry = ProviderHealthRegistry(min_calls=2, open_seconds=300)
+        monkeypatch.setattr(sd, 'provider_registry', registry)
+        monkeypatch.setattr(sd, 'generate_with_huggingface', failing_huggingface)
+        monkeypatch.setattr(sd, 'generate_with_stability', failing_stability)
+        monkeypatch.chdir(tmp_path)
+
+        client = TestClient(sd.app)
+        for _ in range(5):
+            response = client.post("/create_robot_image",
+                                   json={"prompt": "test robot", "resolution": "64x64"})
+            assert response.status_code == 200
+            assert response.json()["metadata"]["api_used"] == "dummy"
+
+        assert calls['huggingface'] == 2
+        providers = client.get("/health").json()["providers"]
+        assert providers["huggingface"]["state"] == "open"
+        assert providers["huggingface"]["skipped"] == 3
@@ -0,0 +1,171 @@
+import pytest
+import sys
+import os
+import time
+import asyncio
+import subprocess
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    from stable_diffusion_mcp.image_store import ImageStore
+    from stable_diffusion_mcp.retention import (
+        ENV_PREFIX as SD_PREFIX, GarbageCollector, RetentionEntry, RetentionPolicy, image_store_collector
+    )
+    from blender_mcp.retention import (
+        ENV_PREFIX as BLENDER_PREFIX, RetentionPolicy as SceneRetentionPolicy, directory_collector, gc_interval
+    )
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+def entry(key, size=10, created_at=0.0, accessed_at=None):
+    return RetentionEntry(key, size, created_at, created_at if accessed_at is None else accessed_at)
+
+class TestRetentionPolicy:
+    """보존 정책 선택 테스트"""
+
+    def test_over_budget_evicts_least_recently_accessed(self):
+        policy = RetentionPolicy(max_bytes=25, max_age_seconds=0, keep_last=0)
+        entries = [entry("old-but-used", created_at=1, accessed_at=100),
+                   entry("mid", created_at=2, accessed_at=2),
+                   entry("new", created_at=3, accessed_at=3)]
+        assert [e.key for e in policy.select(entries, now=200)] == ["mid"]
+
+    def test_max_age_and_keep_last(self):
+        policy = RetentionPolicy(max_bytes=0, max_age_seconds=50, keep_last=1)
+        entries = [entry("a", created_at=0), entry("b", created_at=10), entry("c", created_at=20)]
+        # 가장 최근 1개는 기간이 지나도 보존
+        assert sorted(e.key for e in policy.select(entries, now=1000)) == ["a", "b"]
+
+    def test_no_limits_keeps_everything(self):
+        policy = RetentionPolicy(max_bytes=0, max_age_seconds=0, keep_last=0)
+        assert policy.select([entry("a"), entry("b")], now=1e9) == []
+
+    def test_from_env_reads_server_prefix(self, monkeypatch):
+        monkeypatch.setenv('BLENDER_GC_MAX_MB', '2')
+        monkeypatch.setenv('BLENDER_GC_KEEP_LAST', '3')
+        monkeypatch.setenv('BLENDER_GC_INTERVAL_SECONDS', '0')
+        monkeypatch.delenv('SD_GC_MAX_MB', raising=False)
+        scene_policy = SceneRetentionPolicy.from_env(BLENDER_PREFIX)
+        assert (scene_policy.max_bytes, scene_policy.keep_last) == (2 * 1024 * 1024, 3)
+        assert gc_interval(BLENDER_PREFIX) == 0
+        # 다른 서버 접두사 설정은 섞이지 않음
+        assert RetentionPolicy.from_env(SD_PREFIX).max_bytes == 0
+
+    def test_retention_is_opt_in(self, monkeypatch):
+        for name in ('SD_GC_MAX_MB', 'SD_GC_MAX_AGE_HOURS', 'SD_GC_KEEP_LAST'):
+            monkeypatch.delenv(name, raising=False)
+        policy = RetentionPolicy.from_env(SD_PREFIX)
+        assert not policy.enabled
+        assert policy.select([entry("a", created_at=0)], now=1e9) == []
+
+        async def scenario():
+            gc = GarbageCollector(lambda: (0, 0), interval=60, policy=policy)
+            gc.start()
+            running = gc.stats()["running"]
+            await gc.stop()
+            return running
+
+        assert asyncio.run(scenario()) is False
+
+class TestImageStoreGC:
+    """이미지 저장소 GC 테스트"""
+
+    def test_gc_evicts_lru_files_and_index_rows(self, tmp_path):
+        store = ImageStore(str(tmp_path))
+        first = store.put(b'a' * 100, 'png', prompt="first")
+        second = store.put(b'b' * 100, 'png', prompt="second")
+        third = store.put(b'c' * 100, 'png', prompt="third")
+        time.sleep(0.01)
+        store.path_for(first["digest"])  # 가장 오래된 이미지를 최근에 조회
+
+        policy = RetentionPolicy(max_bytes=250, max_age_seconds=0, keep_last=1)
+        gc = GarbageCollector(image_store_collector(store, policy), policy=policy)
+        files, reclaimed = asyncio.run(gc.run_once())
+
+        assert (files, reclaimed) == (1, 100)
+        assert not os.path.exists(second["path"])
+        assert os.path.exists(first["path"]) and os.path.exists(third["path"])
+        assert store.by_prompt("second") == []
+        stats = gc.stats()
+        assert stats["reclaimed_bytes"] == 100
+        assert stats["reclaimed_files"] == 1
+        assert stats["runs"] == 1
+
+    def test_legacy_flat_files_share_the_budget(self, tmp_path):
+        store = ImageStore(str(tmp_path))
+        stored = store.put(b'n' * 100, 'png', prompt="new")
+        legacy = tmp_path / "robot_hf_20240101_000000.png"
+        legacy.write_bytes(b'o' * 100)
+        os.utime(legacy, (time.time() - 1000, time.time() - 1000))
+        (tmp_path / "notes.txt").write_bytes(b't' * 100)
+
+        policy = RetentionPolicy(max_bytes=150, max_age_seconds=0, keep_last=0)
+        files, reclaimed = image_store_collector(store, policy)()
+
+        assert (files, reclaimed) == (1, 100)
+        assert not legacy.exists()
+        assert os.path.exists(stored["path"]) and (tmp_path / "notes.txt").exists()
+
+    def test_collection_runs_off_the_event_loop(self):
+        def slow_collect():
+            time.sleep(0.3)
+            return 0, 0
+
+        async def scenario():
+            gc = GarbageCollector(slow_collect, interval=60)
+            gc.start()
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            latency = time.perf_counter() - started
+            await gc.stop()
+            return latency
+
+        assert asyncio.run(scenario()) < 0.1
+
+    def test_last_error_is_reported(self):
+        def broken_collect():
+            raise OSError("disk gone")
+
+        gc = GarbageCollector(broken_collect)
+        assert asyncio.run(gc.run_once()) == (0, 0)
+        stats = gc.stats()
+        assert (stats["errors"], stats["last_error"]) == (1, "disk gone")
+
+class TestSceneGC:
+    """Blender 씬 디렉토리 GC 테스트"""
+
+    def test_scene_files_are_evicted_together(self, tmp_path):
+        now = time.time()
+        for index, name in enumerate(["robot_scene_1", "robot_scene_2"]):
+            for suffix in (".blend", "_render.png"):
+                path = tmp_path / f"{name}{suffix}"
+                path.write_bytes(b'x' * 50)
+                os.utime(path, (now - 1000 + index, now - 1000 + index))
+
+        policy = SceneRetentionPolicy(max_bytes=100, max_age_seconds=0, keep_last=0)
+        files, reclaimed = directory_collector(str(tmp_path), policy)()
+        assert (files, reclaimed) == (2, 100)
+        assert sorted(os.listdir(tmp_path)) == ["robot_scene_2.blend", "robot_scene_2_render.png"]
+
+    def test_missing_directory_is_a_no_op(self, tmp_path):
+        collect = directory_collector(str(tmp_path / "missing"), SceneRetentionPolicy())
+        assert collect() == (0, 0)
+
+class TestLaunchImports:
+    """run_servers_fixed.ps1 처럼 src. 패키지 이름으로 실행할 때의 임포트 테스트"""
+
+    def test_apps_and_spawned_workers_import_through_src(self):
+        repo_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+        script = (
+            "import multiprocessing\n"
+            "import src.blender_mcp, src.stable_diffusion_mcp\n"
+            "from src.stable_diffusion_mcp.worker_pool import core_slices\n"
+            "if __name__ == '__main__':\n"
+            "    with multiprocessing.get_context('spawn').Pool(1) as pool:\n"
+            "        print(pool.apply(core_slices, (1, [0])))\n"
+        )
+        env = {k: v for k, v in os.environ.items() if k != 'PYTHONPATH'}
+        result = subprocess.run([sys.executable, '-c', script], cwd=repo_root, env=env,
+                                capture_output=True, text=True, timeout=300)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip() == "[[0]]"
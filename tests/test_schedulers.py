@@ -0,0 +1,100 @@
+import pytest
+import sys
+import os
+import json
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    from fastapi.testclient import TestClient
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp import ImageRequest, app
+    from stable_diffusion_mcp.image_cache import request_fingerprint
+    from stable_diffusion_mcp.schedulers import QUALITY_PRESETS, SchedulerCache
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+def tiny_pipeline(tmp_path):
+    """가중치 다운로드 없이 config 로 만든 초소형 StableDiffusionPipeline"""
+    torch = pytest.importorskip('torch')
+    diffusers = pytest.importorskip('diffusers')
+    transformers = pytest.importorskip('transformers')
+
+    (tmp_path / 'vocab.json').write_text(json.dumps({"<|startoftext|>": 0, "<|endoftext|>": 1, "!": 2}))
+    (tmp_path / 'merges.txt').write_text("#version: 0.2\n")
+    torch.manual_seed(0)
+    return diffusers.StableDiffusionPipeline(
+        vae=diffusers.AutoencoderKL(block_out_channels=(8,), down_block_types=("DownEncoderBlock2D",),
+                                    up_block_types=("UpDecoderBlock2D",), norm_num_groups=4),
+        text_encoder=transformers.CLIPTextModel(transformers.CLIPTextConfig(
+            vocab_size=3, hidden_size=8, intermediate_size=16, num_hidden_layers=1,
+            num_attention_heads=2, projection_dim=8)),
+        tokenizer=transformers.CLIPTokenizer(str(tmp_path / 'vocab.json'), str(tmp_path / 'merges.txt'),
+                                             model_max_length=77),
+        unet=diffusers.UNet2DConditionModel(
+            sample_size=8, block_out_channels=(8, 16), layers_per_block=1,
+            down_block_types=("CrossAttnDownBlock2D", "DownBlock2D"),
+            up_block_types=("UpBlock2D", "CrossAttnUpBlock2D"),
+            cross_attention_dim=8, attention_head_dim=2, norm_num_groups=4),
+        scheduler=diffusers.PNDMScheduler(),
+        safety_checker=None, feature_extractor=None, requires_safety_checker=False
+    )
+
+class TestQualityPresets:
+    """품질 프리셋 → 스케줄러/스텝 수 변환 테스트"""
+
+    def test_preset_sets_scheduler_and_steps(self):
+        request = ImageRequest(prompt="robot", quality_preset="preview")
+        assert (request.scheduler, request.num_inference_steps) == QUALITY_PRESETS["preview"]
+
+    def test_explicit_values_override_preset(self):
+        request = ImageRequest(prompt="robot", quality_preset="preview", num_inference_steps=12)
+        assert (request.scheduler, request.num_inference_steps) == ("dpm++", 12)
+        request = ImageRequest(prompt="robot", quality_preset="final", scheduler="default")
+        assert request.scheduler is None
+        assert request.num_inference_steps == QUALITY_PRESETS["final"][1]
+
+    def test_no_preset_keeps_previous_defaults(self):
+        request = ImageRequest(prompt="robot")
+        assert (request.scheduler, request.num_inference_steps) == (None, 20)
+
+    def test_scheduler_is_part_of_cache_fingerprint(self):
+        base = ImageRequest(prompt="robot", seed=1)
+        assert request_fingerprint(base) != request_fingerprint(ImageRequest(prompt="robot", seed=1, scheduler="euler"))
+        assert request_fingerprint(base) == request_fingerprint(ImageRequest(prompt="robot", seed=1, scheduler="default"))
+
+    def test_schedulers_endpoint(self):
+        response = TestClient(app).get("/schedulers")
+        assert response.status_code == 200
+        data = response.json()
+        assert "dpm++" in data["schedulers"]
+        assert data["quality_presets"]["preview"] == {"scheduler": "dpm++", "steps": 8}
+
+class TestSchedulerCache:
+    """스케줄러 뷰 캐시 테스트"""
+
+    def test_views_share_weights_and_are_cached(self, tmp_path):
+        pipe = tiny_pipeline(tmp_path)
+        cache = SchedulerCache()
+        view = cache.pipeline_for(pipe, "euler")
+
+        assert type(view.scheduler).__name__ == "EulerDiscreteScheduler"
+        assert type(pipe.scheduler).__name__ == "PNDMScheduler"
+        assert view.unet is pipe.unet and view.vae is pipe.vae
+        assert cache.pipeline_for(pipe, "euler") is view
+        assert cache.pipeline_for(pipe, None) is pipe
+        assert cache.stats() == {"cached": ["euler"], "created": 1, "hits": 1}
+
+    def test_batch_runs_with_requested_scheduler(self, tmp_path, monkeypatch):
+        pipe = tiny_pipeline(tmp_path)
+        cache = SchedulerCache()
+        monkeypatch.setattr(sd, 'pipeline', pipe)
+        monkeypatch.setattr(sd, 'scheduler_cache', cache)
+        monkeypatch.setattr(sd, 'prompt_embedding_cache', sd.PromptEmbeddingCache())
+
+        items = [(ImageRequest(prompt="!", seed=seed, resolution="16x16", scheduler="unipc"), None)
+                 for seed in range(2)]
+        results = sd.run_pipeline_batch((16, 16, 2, 7.5, "unipc", sd.DEFAULT_MODEL), items)
+
+        assert len(results) == 2 and all(r.startswith(b'\x89PNG') for r in results)
+        assert cache.stats()["cached"] == ["unipc"]
+        assert type(pipe.scheduler).__name__ == "PNDMScheduler"
@@ -88,7 +88,7 @@ class TestStableDiffusionMCP:
         assert "1024x1024" in data["resolutions"]
         assert data["recommended"] == "1024x1024"
     
-    def test_create_image_dummy_mode(self):
+    def test_create_image_dummy_mode(self, isolated_app):
         """더미 모드에서 이미지 생성 테스트"""
         test_data = {
             "prompt": "test robot",
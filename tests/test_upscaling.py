@@ -0,0 +1,92 @@
+import pytest
+import sys
+import os
+from io import BytesIO
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+try:
+    from PIL import Image
+    from fastapi.testclient import TestClient
+    import stable_diffusion_mcp as sd
+    from stable_diffusion_mcp import upscaling
+    from stable_diffusion_mcp.image_cache import request_fingerprint
+    from stable_diffusion_mcp.image_io import encode_image
+    from stable_diffusion_mcp.upscaling import draft_size, register_upscaler, upscale_image
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+PNG = {'image_format': 'png', 'quality': 85, 'compress_level': 1, 'optimize': False}
+
+class BrokenUpscaler:
+    def upscale(self, image, width, height, prompt):
+        raise RuntimeError("모델 없음")
+
+class TestDraftSize:
+    """초안 해상도 계산 테스트"""
+
+    def test_draft_is_scaled_multiple_of_8_with_floor(self):
+        assert draft_size(1024, 1024, 0.5) == (512, 512)
+        assert draft_size(1024, 768, 0.5) == (512, 384)
+        assert draft_size(512, 512, 0.25) == (256, 256)  # 짧은 변 하한 256
+        assert draft_size(200, 200, 0.5) == (200, 200)  # 하한보다 작은 요청은 그대로
+
+class TestUpscalers:
+    """업스케일러 등록/대체 테스트"""
+
+    def test_lanczos_and_fallback_for_failing_model(self, monkeypatch):
+        monkeypatch.setattr(upscaling, 'UPSCALERS', dict(upscaling.UPSCALERS))
+        monkeypatch.setattr(upscaling, '_instances', {})
+        register_upscaler('broken', BrokenUpscaler)
+        draft = encode_image(Image.new('RGB', (32, 32), 'red'), **PNG)
+
+        data, used = upscale_image(draft, 64, 48, 'lanczos', "robot", PNG)
+        assert (used, Image.open(BytesIO(data)).size) == ('lanczos', (64, 48))
+        data, used = upscale_image(draft, 64, 64, 'broken', "robot", PNG)
+        assert (used, Image.open(BytesIO(data)).size) == ('lanczos', (64, 64))
+
+class TestDraftUpscaleMode:
+    """/create_robot_image 초안 → 업스케일 모드 테스트"""
+
+    def test_providers_render_draft_and_response_reports_timings(self, monkeypatch, isolated_app):
+        seen = []
+
+        async def huggingface(prompt, resolution, **kwargs):
+            seen.append(resolution)
+            width, height = map(int, resolution.split('x'))
+            return encode_image(Image.new('RGB', (width, height), 'gray'), **PNG)
+
+        monkeypatch.setattr(sd, 'generate_with_huggingface', huggingface)
+
+        body = TestClient(sd.app).post("/create_robot_image", json={
+            "prompt": "robot", "resolution": "768x512", "generation_mode": "draft_upscale"}).json()
+        assert seen == ["384x256"]
+        with open(body["image_path"], 'rb') as f:
+            assert Image.open(f).size == (768, 512)
+        draft = body["metadata"]["draft"]
+        assert (draft["resolution"], draft["upscaler"]) == ("384x256", "lanczos")
+        assert draft["draft_time"] >= 0 and draft["upscale_time"] >= 0
+
+    def test_lanczos_does_not_queue_behind_inference(self, monkeypatch, isolated_app):
+        async def huggingface(prompt, resolution, **kwargs):
+            width, height = map(int, resolution.split('x'))
+            return encode_image(Image.new('RGB', (width, height), 'gray'), **PNG)
+
+        async def busy(*args, **kwargs):
+            raise AssertionError("Lanczos 업스케일이 추론 스레드 풀에 제출됨")
+
+        monkeypatch.setattr(sd, 'generate_with_huggingface', huggingface)
+        monkeypatch.setattr(sd.inference_executor, 'run', busy)
+        assert not upscaling.uses_inference_pool('lanczos')
+        assert upscaling.uses_inference_pool('latent') and upscaling.uses_inference_pool('custom')
+
+        response = TestClient(sd.app).post("/create_robot_image", json={
+            "prompt": "robot", "resolution": "512x512", "generation_mode": "draft_upscale"})
+        assert response.status_code == 200
+        assert response.json()["metadata"]["draft"]["upscaler"] == "lanczos"
+
+    def test_unknown_upscaler_rejected_and_mode_in_cache_key(self):
+        response = TestClient(sd.app).post("/create_robot_image", json={"prompt": "robot", "upscaler": "nope"})
+        assert response.status_code == 422
+        native = sd.ImageRequest(prompt="robot", seed=1)
+        drafted = sd.ImageRequest(prompt="robot", seed=1, generation_mode="draft_upscale")
+        assert request_fingerprint(native) != request_fingerprint(drafted)
@@ -0,0 +1,158 @@
+import pytest
+import sys
+import os
+import time
+import asyncio
+from io import BytesIO
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+torch = pytest.importorskip('torch')
+
+try:
+    from PIL import Image
+    from stable_diffusion_mcp import ImageRequest
+    from stable_diffusion_mcp.worker_pool import (
+        WorkerPool, core_slices, export_mapped_weights, load_mapped_weights, map_weights
+    )
+    from conftest import PipelineOutput
+except ImportError as e:
+    pytest.skip(f"모듈 임포트 실패: {e}", allow_module_level=True)
+
+class TinyPipeline:
+    """워커 프로세스에서 실행되는 작은 파이프라인 (unet/vae 모듈과 비영속 버퍼 포함)"""
+
+    def __init__(self):
+        self.unet = torch.nn.Conv2d(3, 3, 3)
+        self.unet.register_buffer("scale", torch.tensor([2.0]), persistent=False)
+        self.vae = torch.nn.Identity()
+
+    @property
+    def components(self):
+        return {"unet": self.unet, "vae": self.vae}
+
+    def __call__(self, prompt, width, height, num_inference_steps=1, callback_on_step_end=None, **kwargs):
+        prompts = [prompt] if isinstance(prompt, str) else prompt
+        for step in range(num_inference_steps):
+            if callback_on_step_end is not None:
+                callback_on_step_end(self, step, None, {})
+        return PipelineOutput([Image.new('RGB', (width, height), color=(len(p), os.getpid() % 256, 0)) for p in prompts])
+
+def tiny_exporter(model_id, path, channels_last):
+    torch.manual_seed(0)
+    export_mapped_weights(TinyPipeline(), path)
+
+def tiny_factory(model_id, path):
+    return map_weights(TinyPipeline(), load_mapped_weights(path))
+
+class SettingsPipeline(TinyPipeline):
+    """워커 안에서 본 torch 스레드 수 / CPU 성능 모드 스레드 / 워커 풀 크기를 색으로 돌려줌"""
+
+    def __call__(self, prompt, width, height, **kwargs):
+        import stable_diffusion_mcp as package
+        color = (torch.get_num_threads(), package.cpu_perf.threads or 0, package.worker_pool.processes)
+        return PipelineOutput([Image.new('RGB', (width, height), color=color) for _ in prompt])
+
+def settings_factory(model_id, path):
+    return map_weights(SettingsPipeline(), load_mapped_weights(path))
+
+class SlowPipeline(TinyPipeline):
+    """스텝마다 멈추는 파이프라인 (취소 테스트용)"""
+
+    def __call__(self, prompt, width, height, num_inference_steps=1, callback_on_step_end=None, **kwargs):
+        for step in range(num_inference_steps):
+            time.sleep(0.05)
+            if callback_on_step_end is not None:
+                callback_on_step_end(self, step, None, {})
+        return PipelineOutput([Image.new('RGB', (width, height)) for _ in prompt])
+
+def slow_factory(model_id, path):
+    return map_weights(SlowPipeline(), load_mapped_weights(path))
+
+class TestMappedWeights:
+    """mmap 가중치 내보내기/붙이기 테스트"""
+
+    def test_roundtrip_keeps_values_layout_and_buffers(self, tmp_path):
+        source = TinyPipeline()
+        source.unet.to(memory_format=torch.channels_last)
+        source.unet.scale.fill_(3.0)
+        path = str(tmp_path / "tiny.pt")
+        export_mapped_weights(source, path)
+
+        mapped = map_weights(TinyPipeline(), load_mapped_weights(path))
+        assert torch.equal(mapped.unet.weight, source.unet.weight)
+        assert mapped.unet.weight.is_contiguous(memory_format=torch.channels_last)
+        assert mapped.unet.scale.item() == 3.0
+
+    def test_core_slices(self):
+        assert core_slices(2, [0, 1, 2, 3, 4]) == [[0, 1], [2, 3, 4]]
+        assert core_slices(3, [0, 1]) == [[0], [0], [1]]  # 코어보다 워커가 많으면 공유
+
+class TestWorkerPool:
+    """워커 프로세스 풀 통합 테스트"""
+
+    def test_batches_spread_over_workers_with_progress(self, tmp_path):
+        pool = WorkerPool(processes=2, model_id="tiny", factory=tiny_factory, exporter=tiny_exporter,
+                          weights_dir=str(tmp_path), cores=sorted(os.sched_getaffinity(0))[:2])
+        try:
+            assert pool.start(report_stage=lambda stage: None)
+            assert os.path.exists(pool.weights_path())
+            progress = []
+
+            async def scenario():
+                batches = []
+                for index in range(4):
+                    request = ImageRequest(prompt="robot" * (index + 1), resolution="8x8", num_inference_steps=3)
+                    callback = (lambda step, total: progress.append((step, total))) if index == 0 else None
+                    batches.append(pool.submit((8, 8, 3, 7.5, None, request.model), [(request, callback)]))
+                return await asyncio.gather(*batches)
+
+            results = asyncio.run(scenario())
+            assert all(len(result) == 1 and result[0].startswith(b'\x89PNG') for result in results)
+            assert progress == [(1, 3), (2, 3), (3, 3)]
+            stats = pool.stats()
+            assert stats["dispatched_batches"] == 4
+            assert all(w["completed_images"] > 0 for w in stats["workers"])
+            assert len({w["pid"] for w in stats["workers"]}) == 2
+        finally:
+            pool.shutdown()
+
+    def test_worker_settings_come_from_the_pool_not_parent_env(self, monkeypatch, tmp_path):
+        monkeypatch.setenv('SD_CPU_THREADS', '5')
+        monkeypatch.setenv('SD_WORKER_PROCESSES', '2')
+        core = sorted(os.sched_getaffinity(0))[:1]
+        pool = WorkerPool(processes=1, model_id="tiny", factory=settings_factory, exporter=tiny_exporter,
+                          weights_dir=str(tmp_path), cores=core)
+        try:
+            assert pool.start(report_stage=lambda stage: None)
+            request = ImageRequest(prompt="robot", resolution="8x8", num_inference_steps=1)
+            data, = asyncio.run(pool.submit((8, 8, 1, 7.5, None, request.model), [(request, None)]))
+            with Image.open(BytesIO(data)) as image:
+                assert image.convert('RGB').getpixel((0, 0)) == (1, 1, 0)
+        finally:
+            pool.shutdown()
+
+    def test_cancelling_two_queued_jobs_interrupts_both(self, tmp_path):
+        interrupted = []
+        pool = WorkerPool(processes=1, model_id="tiny", factory=slow_factory, exporter=tiny_exporter,
+                          weights_dir=str(tmp_path), cores=sorted(os.sched_getaffinity(0))[:1],
+                          on_interrupted=interrupted.append)
+        try:
+            assert pool.start(report_stage=lambda stage: None)
+
+            async def scenario():
+                request = ImageRequest(prompt="robot", resolution="8x8", num_inference_steps=40)
+                tasks = [asyncio.create_task(pool.submit((8, 8, 40, 7.5, None, request.model), [(request, None)]))
+                         for _ in range(2)]
+                await asyncio.sleep(0.5)
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+            asyncio.run(scenario())
+            deadline = time.monotonic() + 10
+            while len(interrupted) < 2 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert len(interrupted) == 2
+            assert all(e.completed < e.total for e in interrupted)
+        finally:
+            pool.shutdown()
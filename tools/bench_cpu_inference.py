@@ -0,0 +1,98 @@
+"""
+CPU 추론 성능 모드 벤치마크
+설정별 디노이징 스텝당 시간 (UNet forward, classifier-free guidance 배치 2) 을 측정한다.
+기본은 가중치 다운로드 없이 config 로 만든 축소 UNet, --model 을 주면 실제 모델의 UNet 을 로드한다.
+- baseline: float32, torch 기본 스레드
+- threads: SD_CPU_THREADS / SD_CPU_INTEROP_THREADS 기준 스레드 설정
+- +channels_last, +bf16 autocast, (--compile 시) +torch.compile
+
+실행: python tools/bench_cpu_inference.py [--steps 5] [--resolution 512x512] [--model stabilityai/stable-diffusion-2-1] [--compile]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from stable_diffusion_mcp.cpu_tuning import CPUPerfConfig, apply_cpu_optimizations, configure_threads, inference_context
+
+def build_unet(model_id):
+    """실제 모델 UNet 또는 SD 2.x 구조를 축소한 UNet"""
+    from diffusers import UNet2DConditionModel
+
+    if model_id:
+        return UNet2DConditionModel.from_pretrained(model_id, subfolder="unet")
+    return UNet2DConditionModel(
+        sample_size=64,
+        block_out_channels=(64, 128, 256, 256),
+        layers_per_block=1,
+        cross_attention_dim=256,
+        attention_head_dim=(2, 4, 8, 8),
+        use_linear_projection=True
+    )
+
+class UNetOnly:
+    """apply_cpu_optimizations 에 넘길 unet/vae 컨테이너 (VAE 는 벤치마크 대상 아님)"""
+
+    def __init__(self, unet):
+        self.unet = unet
+        self.vae = torch.nn.Identity()
+
+def seconds_per_step(unet, config, latent_shape, context_dim, steps):
+    latents = torch.randn(2, *latent_shape)  # 조건부/무조건부 배치
+    text = torch.randn(2, 77, context_dim)
+    if config.channels_last:
+        latents = latents.to(memory_format=torch.channels_last)
+    with torch.no_grad(), inference_context(config, 'cpu'):
+        unet(latents, 999, encoder_hidden_states=text)  # 예열 (compile 포함)
+        started = time.perf_counter()
+        for step in range(steps):
+            unet(latents, 999 - step, encoder_hidden_states=text)
+    return (time.perf_counter() - started) / steps
+
+def main():
+    """메인 실행"""
+    parser = argparse.ArgumentParser(description="CPU 추론 성능 모드 벤치마크")
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--resolution", default="512x512")
+    parser.add_argument("--model", default=None, help="실제 모델 id (기본: 축소 UNet)")
+    parser.add_argument("--compile", action="store_true", help="torch.compile 설정 포함 (컴파일에 수 분 소요)")
+    args = parser.parse_args()
+
+    width, height = map(int, args.resolution.split('x'))
+    unet = build_unet(args.model).eval()
+    latent_shape = (unet.config.in_channels, height // 8, width // 8)
+    context_dim = unet.config.cross_attention_dim
+    tuned = CPUPerfConfig.from_env()
+
+    configs = [
+        ("baseline fp32", CPUPerfConfig(enabled=False, threads=torch.get_num_threads(),
+                                        interop_threads=None, channels_last=False)),
+        (f"threads={tuned.threads or torch.get_num_threads()}", CPUPerfConfig(threads=tuned.threads, interop_threads=tuned.interop_threads,
+                                                    channels_last=False)),
+        ("+channels_last", CPUPerfConfig(threads=tuned.threads, interop_threads=tuned.interop_threads)),
+        ("+bf16 autocast", CPUPerfConfig(threads=tuned.threads, interop_threads=tuned.interop_threads, bf16=True)),
+    ]
+    if args.compile:
+        configs.append(("+torch.compile", CPUPerfConfig(threads=tuned.threads, interop_threads=tuned.interop_threads,
+                                                        bf16=True, compile=True)))
+
+    print("=" * 60)
+    print(f"⚙️ CPU 추론 벤치마크 ({args.model or '축소 UNet'}, {args.resolution}, {args.steps} 스텝)")
+    print("=" * 60)
+
+    baseline = None
+    for name, config in configs:
+        configure_threads(config)
+        holder = UNetOnly(unet)
+        apply_cpu_optimizations(holder, config)
+        elapsed = seconds_per_step(holder.unet, config, latent_shape, context_dim, args.steps)
+        baseline = baseline or elapsed
+        print(f"  {name:<18}: {elapsed:7.3f}s/step  (x{baseline / elapsed:.2f})")
+        unet = unet.to(memory_format=torch.contiguous_format)
+
+if __name__ == "__main__":
+    main()
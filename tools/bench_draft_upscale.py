@@ -0,0 +1,97 @@
+"""
+초안 → 업스케일 생성 지연 시간 벤치마크
+같은 파이프라인으로 요청 해상도에서 바로 생성 (native) 과
+축소 해상도 초안 생성 + 업스케일 (draft_upscale) 의 전체 지연 시간을 비교한다.
+기본은 가중치 다운로드 없이 config 로 만든 축소 UNet/VAE (텍스트 인코더 대신 임의 임베딩),
+--model 을 주면 실제 모델을 로드한다.
+
+실행: python tools/bench_draft_upscale.py [--resolution 1024x1024] [--steps 5] [--draft-scale 0.5] [--upscaler lanczos] [--model stabilityai/stable-diffusion-2-1]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from stable_diffusion_mcp.image_io import encode_image
+from stable_diffusion_mcp.upscaling import draft_size, upscale_image
+
+PNG = {'image_format': 'png', 'quality': 85, 'compress_level': 6, 'optimize': False}
+
+def build_pipeline(model_id):
+    """실제 모델 또는 축소 UNet/VAE 파이프라인"""
+    from diffusers import AutoencoderKL, DPMSolverMultistepScheduler, StableDiffusionPipeline, UNet2DConditionModel
+
+    if model_id:
+        return StableDiffusionPipeline.from_pretrained(model_id, safety_checker=None)
+    torch.manual_seed(0)
+    return StableDiffusionPipeline(
+        vae=AutoencoderKL(block_out_channels=(32, 64, 64, 64), layers_per_block=1,
+                          down_block_types=("DownEncoderBlock2D",) * 4, up_block_types=("UpDecoderBlock2D",) * 4,
+                          norm_num_groups=16),
+        text_encoder=None,
+        tokenizer=None,
+        unet=UNet2DConditionModel(sample_size=64, block_out_channels=(64, 128, 256, 256), layers_per_block=1,
+                                  cross_attention_dim=256, attention_head_dim=(2, 4, 8, 8),
+                                  use_linear_projection=True),
+        scheduler=DPMSolverMultistepScheduler(steps_offset=1),
+        safety_checker=None, feature_extractor=None, requires_safety_checker=False
+    )
+
+def text_inputs(pipe):
+    """임의 텍스트 임베딩 (실제 모델이면 프롬프트를 인코딩)"""
+    if pipe.text_encoder is not None:
+        return {"prompt": "a chrome robot arm, studio lighting", "negative_prompt": "blurry"}
+    dim = pipe.unet.config.cross_attention_dim
+    return {"prompt_embeds": torch.randn(1, 77, dim), "negative_prompt_embeds": torch.randn(1, 77, dim)}
+
+def generate(pipe, width, height, steps) -> bytes:
+    with torch.no_grad():
+        image = pipe(**text_inputs(pipe), width=width, height=height, num_inference_steps=steps,
+                     generator=torch.Generator().manual_seed(0)).images[0]
+    return encode_image(image, **PNG)
+
+def main():
+    """메인 실행"""
+    parser = argparse.ArgumentParser(description="초안 → 업스케일 지연 시간 벤치마크")
+    parser.add_argument("--resolution", default="1024x1024")
+    parser.add_argument("--steps", type=int, default=5)
+    parser.add_argument("--draft-scale", type=float, default=0.5)
+    parser.add_argument("--upscaler", default="lanczos")
+    parser.add_argument("--model", default=None, help="실제 모델 id (기본: 축소 UNet/VAE)")
+    args = parser.parse_args()
+
+    width, height = map(int, args.resolution.split('x'))
+    draft_width, draft_height = draft_size(width, height, args.draft_scale)
+    pipe = build_pipeline(args.model)
+    pipe.set_progress_bar_config(disable=True)
+
+    print("=" * 60)
+    print(f"⚙️ 초안 → 업스케일 벤치마크: {width}x{height}, {args.steps} 스텝, "
+          f"초안 {draft_width}x{draft_height}, 업스케일러 {args.upscaler}")
+    print("=" * 60)
+
+    generate(pipe, 64, 64, 1)  # 예열
+
+    started = time.perf_counter()
+    generate(pipe, width, height, args.steps)
+    native = time.perf_counter() - started
+
+    started = time.perf_counter()
+    draft = generate(pipe, draft_width, draft_height, args.steps)
+    draft_time = time.perf_counter() - started
+    started = time.perf_counter()
+    _, used = upscale_image(draft, width, height, args.upscaler, "a chrome robot arm", PNG)
+    upscale_time = time.perf_counter() - started
+
+    total = draft_time + upscale_time
+    print(f"  native        : {native:8.2f}s")
+    print(f"  draft         : {draft_time:8.2f}s")
+    print(f"  upscale ({used}): {upscale_time:8.2f}s")
+    print(f"  draft_upscale : {total:8.2f}s  (x{native / total:.2f} 빠름)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+create_robot_image 이미지 후처리 CPU 시간 벤치마크
+프로바이더가 돌려준 PNG 바이트를 저장하고 base64 로 만드는 과정을
+이전 방식 (디코딩 → 파일로 재인코딩 → 메모리로 다시 재인코딩) 과
+통과 방식 (바이트 그대로 기록 → base64) 으로 나눠 요청당 CPU 시간을 비교한다.
+
+실행: python tools/bench_image_roundtrip.py
+"""
+
+import os
+import sys
+import time
+import base64
+import tempfile
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from mcp_common.image_io import to_format, write_image_bytes
+
+def provider_png(size: int) -> bytes:
+    """생성 이미지와 비슷하게 부드러운 그라디언트 + 노이즈가 섞인 PNG"""
+    rng = np.random.default_rng(0)
+    ramp = np.linspace(0, 255, size, dtype=np.float32)
+    base = np.stack([np.add.outer(ramp, ramp) / 2, np.add.outer(ramp, ramp[::-1]) / 2,
+                     np.full((size, size), 128.0)], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    buffered = BytesIO()
+    Image.fromarray(pixels).save(buffered, format="PNG")
+    return buffered.getvalue()
+
+def round_trip(image_data: bytes, image_path: str) -> str:
+    """이전 방식: 디코딩 후 파일/메모리에 각각 PNG 재인코딩"""
+    image = Image.open(BytesIO(image_data))
+    image.save(image_path)
+    buffered = BytesIO()
+    image.save(buffered, format="PNG")
+    return base64.b64encode(buffered.getvalue()).decode()
+
+def pass_through(image_data: bytes, image_path: str) -> str:
+    """통과 방식: 받은 바이트를 한 번 기록하고 그대로 base64"""
+    png_data, _ = to_format(image_data, 'png')
+    write_image_bytes(png_data, image_path)
+    return base64.b64encode(png_data).decode()
+
+def cpu_time_per_call(func, image_data: bytes, image_path: str, runs: int) -> float:
+    started = time.process_time()
+    for _ in range(runs):
+        func(image_data, image_path)
+    return (time.process_time() - started) / runs
+
+def main():
+    """메인 실행"""
+    print("=" * 60)
+    print("⚙️ 이미지 후처리 요청당 CPU 시간 (재인코딩 vs 통과)")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image_path = os.path.join(tmp, "robot.png")
+        for size, runs in ((512, 10), (1024, 5)):
+            image_data = provider_png(size)
+            before = cpu_time_per_call(round_trip, image_data, image_path, runs)
+            after = cpu_time_per_call(pass_through, image_data, image_path, runs)
+            print(f"{size}x{size} ({len(image_data) / 1024:6.0f}KB): "
+                  f"재인코딩 {before * 1000:7.1f}ms  통과 {after * 1000:6.1f}ms  (x{before / after:.1f})")
+
+if __name__ == "__main__":
+    main()
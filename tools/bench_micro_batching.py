@@ -0,0 +1,86 @@
+"""
+마이크로 배칭 벤치마크 (CPU 실행 가능)
+실제 SD 모델 대신 작은 합성곱 디노이저로 파이프라인 호출을 흉내내고,
+요청을 하나씩 처리할 때와 MicroBatcher 로 묶어 처리할 때의 처리량을 비교한다.
+스텝당 고정 비용 (연산 디스패치 등) 이 큰 미리보기 해상도에서 배칭 이득이 잘 드러나며,
+연산량이 지배적인 큰 해상도/적은 코어 환경에서는 이득이 줄어든다.
+
+실행: python tools/bench_micro_batching.py
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+import torch
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from stable_diffusion_mcp.batching import MicroBatcher
+
+class TinyPipelineOutput:
+    def __init__(self, images):
+        self.images = images
+
+class TinyPipeline:
+    """StableDiffusionPipeline 호출 형태를 흉내내는 작은 디노이저"""
+
+    def __init__(self, channels: int = 32, depth: int = 8):
+        torch.manual_seed(0)
+        layers = [torch.nn.Conv2d(4, channels, 3, padding=1), torch.nn.SiLU()]
+        for _ in range(depth):
+            layers += [torch.nn.Conv2d(channels, channels, 3, padding=1), torch.nn.SiLU()]
+        layers.append(torch.nn.Conv2d(channels, 4, 3, padding=1))
+        self.unet = torch.nn.Sequential(*layers).eval()
+
+    @torch.no_grad()
+    def __call__(self, prompt, num_inference_steps, width, height, **kwargs):
+        batch = len(prompt) if isinstance(prompt, list) else 1
+        latents = torch.randn(batch, 4, height // 8, width // 8)
+        for _ in range(num_inference_steps):
+            latents = latents - 0.1 * self.unet(latents)
+        rgb = (latents[:, :3].clamp(-1, 1) + 1) * 127.5
+        images = [Image.fromarray(img.permute(1, 2, 0).byte().numpy()).resize((width, height))
+                  for img in rgb]
+        return TinyPipelineOutput(images)
+
+async def run_sequential(pipeline, prompts, steps, size):
+    for prompt in prompts:
+        pipeline(prompt=prompt, num_inference_steps=steps, width=size, height=size)
+
+async def run_batched(pipeline, prompts, steps, size, max_batch_size):
+    async def run_batch(key, items):
+        return pipeline(prompt=items, num_inference_steps=steps, width=size, height=size).images
+
+    batcher = MicroBatcher(run_batch, max_batch_size=max_batch_size, max_wait=0.01)
+    await asyncio.gather(*[batcher.submit((size, steps), p) for p in prompts])
+    return batcher.stats()
+
+def main():
+    """메인 실행"""
+    torch.set_num_threads(os.cpu_count() or 1)
+    pipeline = TinyPipeline()
+    requests_count, steps, size = 32, 20, 128
+    prompts = [f"robot arm variant {i}" for i in range(requests_count)]
+
+    print("=" * 60)
+    print(f"⚙️ 마이크로 배칭 벤치마크: 요청 {requests_count}개, {steps} 스텝, {size}x{size}")
+    print("=" * 60)
+
+    pipeline(prompt=prompts[:1], num_inference_steps=1, width=size, height=size)  # 예열
+
+    started = time.perf_counter()
+    asyncio.run(run_sequential(pipeline, prompts, steps, size))
+    baseline = time.perf_counter() - started
+    print(f"배치 없음      : {baseline:6.2f}초  {requests_count / baseline:6.2f} img/s")
+
+    for max_batch_size in (2, 4, 8):
+        started = time.perf_counter()
+        stats = asyncio.run(run_batched(pipeline, prompts, steps, size, max_batch_size))
+        elapsed = time.perf_counter() - started
+        print(f"최대 배치 {max_batch_size:<4}: {elapsed:6.2f}초  {requests_count / elapsed:6.2f} img/s"
+              f"  (x{baseline / elapsed:.2f}, 평균 배치 {stats['avg_batch_size']})")
+
+if __name__ == "__main__":
+    main()
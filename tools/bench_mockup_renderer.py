@@ -0,0 +1,88 @@
+"""
+목업 렌더러 벤치마크
+기존 방식 (행마다 draw.line 으로 그라데이션, ImageDraw 도형) 과
+NumPy 배열 연산 렌더러 (render_mockup) 의 이미지 한 장 렌더링 시간을 해상도별로 비교하고,
+create_robot_mockups 의 배치 처리량 (렌더링 + 인코딩) 을 프로세스 1개/N개로 비교한다.
+텍스트는 두 방식 모두 PIL 로 같은 양을 그리므로 비교에서 뺐다.
+
+실행: python tools/bench_mockup_renderer.py [--resolutions 512x512,1024x1024,4096x4096] [--repeat 3] [--batch 16] [--processes 4]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mockup_generator import create_robot_mockups, mockup_params, render_mockup, to_image
+
+def legacy_render(width: int, height: int) -> Image.Image:
+    """기존 create_robot_mockup 의 도형 렌더링 (행별 Python 루프)"""
+    image = Image.new('RGB', (width, height), color='#1a1a2e')
+    draw = ImageDraw.Draw(image)
+    for y in range(height):
+        r = int(26 + (y / height) * 30)
+        g = int(26 + (y / height) * 40)
+        b = int(46 + (y / height) * 50)
+        draw.line([(0, y), (width, y)], fill=(r, g, b))
+    draw.rectangle([width//4, height*3//4, width*3//4, height-20], fill='#4a5568', outline='#718096', width=3)
+    center_x = width // 2
+    draw.ellipse([center_x-30, height*3//4-15, center_x+30, height*3//4+15], fill='#2d3748', outline='#4a5568', width=2)
+    draw.rectangle([center_x-15, height//2, center_x+15, height*3//4], fill='#e2e8f0', outline='#cbd5e0', width=2)
+    draw.ellipse([center_x-20, height//2-10, center_x+20, height//2+10], fill='#2d3748', outline='#4a5568', width=2)
+    end_x = center_x + 80
+    draw.line([(center_x, height//2), (end_x, height//3)], fill='#e2e8f0', width=30)
+    draw.ellipse([end_x-25, height//3-25, end_x+25, height//3+25], fill='#f56565', outline='#e53e3e', width=3)
+    draw.rectangle([end_x-5, height//3-35, end_x+5, height//3-25], fill='#4a5568')
+    draw.rectangle([end_x-5, height//3+25, end_x+5, height//3+35], fill='#4a5568')
+    return image
+
+def vectorized_render(width: int, height: int) -> Image.Image:
+    return to_image(render_mockup(width, height, mockup_params("bench")))
+
+def best_of(func, repeat: int, *args) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+def main():
+    """메인 실행"""
+    parser = argparse.ArgumentParser(description="목업 렌더러 벤치마크")
+    parser.add_argument("--resolutions", default="512x512,1024x1024,4096x4096")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--batch-resolution", default="1024x1024")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"⚙️ 목업 렌더러 벤치마크: 코어 {os.cpu_count()}개, 최솟값 / {args.repeat}회")
+    print("=" * 60)
+
+    for resolution in args.resolutions.split(','):
+        width, height = map(int, resolution.split('x'))
+        legacy = best_of(legacy_render, args.repeat, width, height)
+        vectorized = best_of(vectorized_render, args.repeat, width, height)
+        print(f"  {resolution:>10}: 행별 루프 {legacy * 1000:9.1f}ms  NumPy {vectorized * 1000:8.1f}ms  "
+              f"(x{legacy / vectorized:.1f})")
+
+    # 배치: 렌더링 + PNG 인코딩 + 저장소 등록 (임시 디렉토리)
+    os.chdir(tempfile.mkdtemp(prefix="mockup-bench-"))
+    prompts = [f"robot arm variant {i}" for i in range(args.batch)]
+    print(f"\n  배치 {args.batch}장 @ {args.batch_resolution} (png)")
+    baseline = None
+    for processes in sorted({1, args.processes}):
+        started = time.perf_counter()
+        create_robot_mockups(prompts, resolution=args.batch_resolution, processes=processes, png_compress_level=1)
+        elapsed = time.perf_counter() - started
+        baseline = baseline or elapsed
+        print(f"    프로세스 {processes:>2}개: {elapsed:7.2f}s  ({args.batch / elapsed:6.1f} 장/s, x{baseline / elapsed:.2f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+출력 인코딩 마이크로 벤치마크
+/supported_resolutions 의 해상도마다 포맷/옵션별 인코딩 시간과 결과 크기를 측정한다.
+입력은 생성 이미지와 비슷한 부드러운 그라디언트 + 노이즈 합성 이미지.
+
+실행: python tools/bench_output_encoding.py [--runs 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from stable_diffusion_mcp import SUPPORTED_RESOLUTIONS
+from stable_diffusion_mcp.image_io import encode_image
+
+# (표시 이름, encode_image 인자)
+CONFIGS = [
+    ("png (level 6)", {'image_format': 'png'}),
+    ("png (level 1)", {'image_format': 'png', 'compress_level': 1}),
+    ("png (optimize)", {'image_format': 'png', 'optimize': True}),
+    ("jpeg q85", {'image_format': 'jpeg', 'quality': 85}),
+    ("jpeg q85 optimize", {'image_format': 'jpeg', 'quality': 85, 'optimize': True}),
+    ("webp q80", {'image_format': 'webp', 'quality': 80}),
+]
+
+def synthetic_image(width: int, height: int) -> Image.Image:
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)
+    base = np.stack([np.add.outer(y, x) / 2, np.add.outer(y, x[::-1]) / 2,
+                     np.full((height, width), 128.0)], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    return Image.fromarray(pixels)
+
+def main():
+    """메인 실행"""
+    parser = argparse.ArgumentParser(description="출력 인코딩 벤치마크")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"⚙️ 출력 인코딩 벤치마크 (설정별 {args.runs}회 중 최소)")
+    print("=" * 60)
+
+    for resolution in SUPPORTED_RESOLUTIONS:
+        width, height = map(int, resolution.split('x'))
+        image = synthetic_image(width, height)
+        print(f"\n📐 {resolution}")
+        for name, kwargs in CONFIGS:
+            timings = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                data = encode_image(image, **kwargs)
+                timings.append(time.perf_counter() - started)
+            print(f"  {name:<18}: {min(timings) * 1000:7.1f}ms  {len(data) / 1024:7.0f}KB")
+
+if __name__ == "__main__":
+    main()
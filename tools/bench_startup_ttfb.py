@@ -0,0 +1,80 @@
+"""
+서버 시작 후 /health 첫 응답까지 걸리는 시간 (TTFB) 벤치마크
+uvicorn 으로 stable_diffusion_mcp 를 띄우고 프로세스 시작 시점부터
+/health 가 처음 200 을 돌려줄 때까지의 시간을 로딩 모드별로 측정한다.
+
+- eager: 시작 이벤트에서 파이프라인 로드 완료까지 대기 (이전 동작)
+- background / lazy: 모델 로드를 기다리지 않고 바로 응답
+
+모델 다운로드 없이 재현하려면 HF_HUB_OFFLINE=1 로 실행한다
+(이 경우 eager 모드는 torch/diffusers 임포트 + 로드 실패 비용만 측정된다).
+
+실행: python tools/bench_startup_ttfb.py [--modes eager background lazy] [--runs 3]
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import subprocess
+import statistics
+import urllib.request
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for(url: str, deadline: float) -> float:
+    """url 이 200 을 반환할 때까지 폴링, 성공 시각 반환"""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except OSError:
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} 응답 없음")
+
+def measure(mode: str, timeout: float) -> dict:
+    """로딩 모드 하나로 서버를 띄워 /health, /ready 도달 시간 측정"""
+    port = free_port()
+    env = dict(os.environ, SD_PIPELINE_LOAD=mode)
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "stable_diffusion_mcp:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=SRC_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = started + timeout
+        health = wait_for(f"http://127.0.0.1:{port}/health", deadline) - started
+        ready = wait_for(f"http://127.0.0.1:{port}/ready", deadline) - started
+        return {"health": health, "ready": ready}
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    """메인 실행"""
+    parser = argparse.ArgumentParser(description="/health TTFB 벤치마크")
+    parser.add_argument("--modes", nargs="+", default=["eager", "background", "lazy"])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"⚙️ 서버 시작 TTFB 벤치마크 (모드별 {args.runs}회, 중앙값)")
+    print("=" * 60)
+
+    for mode in args.modes:
+        runs = [measure(mode, args.timeout) for _ in range(args.runs)]
+        health = statistics.median(r["health"] for r in runs)
+        ready = statistics.median(r["ready"] for r in runs)
+        print(f"{mode:<11}: /health {health:6.2f}초   /ready {ready:6.2f}초")
+
+if __name__ == "__main__":
+    main()
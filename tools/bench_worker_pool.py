@@ -0,0 +1,115 @@
+"""
+멀티 프로세스 워커 풀 처리량 벤치마크
+작은 합성곱 디노이저를 mmap 가중치로 공유하는 워커 N개에 요청을 보내고
+워커 수별 분당 이미지 수와 워커 메모리 (PSS 합계, 공유 페이지는 나눠서 계산) 를 비교한다.
+코어가 적은 머신에서는 워커 수를 코어 수 이상으로 늘려도 처리량이 오르지 않는다.
+
+실행: python tools/bench_worker_pool.py [--workers 1,2,4] [--requests 32] [--steps 20] [--size 256]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+import torch
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from stable_diffusion_mcp import ImageRequest
+from stable_diffusion_mcp.worker_pool import WorkerPool, export_mapped_weights, load_mapped_weights, map_weights
+
+class BenchOutput:
+    def __init__(self, images):
+        self.images = images
+
+class BenchPipeline:
+    """StableDiffusionPipeline 호출 형태를 흉내내는 합성곱 디노이저 (unet 가중치 약 9MB)"""
+
+    def __init__(self, channels: int = 128, depth: int = 16):
+        layers = [torch.nn.Conv2d(4, channels, 3, padding=1), torch.nn.SiLU()]
+        for _ in range(depth):
+            layers += [torch.nn.Conv2d(channels, channels, 3, padding=1), torch.nn.SiLU()]
+        layers.append(torch.nn.Conv2d(channels, 4, 3, padding=1))
+        self.unet = torch.nn.Sequential(*layers).eval()
+        self.vae = torch.nn.Identity()
+
+    @property
+    def components(self):
+        return {"unet": self.unet, "vae": self.vae}
+
+    @torch.no_grad()
+    def __call__(self, prompt, num_inference_steps, width, height, **kwargs):
+        batch = len(prompt) if isinstance(prompt, list) else 1
+        latents = torch.randn(batch, 4, height // 8, width // 8)
+        for _ in range(num_inference_steps):
+            latents = latents - 0.1 * self.unet(latents)
+        rgb = (latents[:, :3].clamp(-1, 1) + 1) * 127.5
+        return BenchOutput([Image.fromarray(img.permute(1, 2, 0).byte().numpy()).resize((width, height))
+                            for img in rgb])
+
+def bench_exporter(model_id, path, channels_last):
+    torch.manual_seed(0)
+    export_mapped_weights(BenchPipeline(), path)
+
+def bench_factory(model_id, path):
+    return map_weights(BenchPipeline(), load_mapped_weights(path))
+
+def pss_mb(pid) -> float:
+    """프로세스 PSS (MB), /proc 가 없으면 0"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+async def run_requests(pool, requests_count, steps, size):
+    async def one(index):
+        request = ImageRequest(prompt=f"robot arm variant {index}", resolution=f"{size}x{size}",
+                               num_inference_steps=steps)
+        return await pool.submit((size, size, steps, 7.5, None, request.model), [(request, None)])
+    await asyncio.gather(*[one(i) for i in range(requests_count)])
+
+def main():
+    """메인 실행"""
+    parser = argparse.ArgumentParser(description="워커 풀 처리량 벤치마크")
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--size", type=int, default=256)
+    args = parser.parse_args()
+
+    os.environ.setdefault('SD_CPU_WARMUP_STEPS', '0')  # 워커 예열은 512x512 라 벤치마크에서는 생략
+    cores = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count() or 1))
+    weights_dir = tempfile.mkdtemp(prefix="sd-bench-weights-")
+
+    print("=" * 60)
+    print(f"⚙️ 워커 풀 벤치마크: 코어 {len(cores)}개, 요청 {args.requests}개, "
+          f"{args.steps} 스텝, {args.size}x{args.size}")
+    print("=" * 60)
+
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(',')]:
+        pool = WorkerPool(processes=workers, model_id="bench", factory=bench_factory, exporter=bench_exporter,
+                          weights_dir=weights_dir, cores=cores)
+        try:
+            pool.start(report_stage=lambda stage: None)
+            asyncio.run(run_requests(pool, workers, 1, args.size))  # 워커마다 한 번씩 예열
+            started = time.perf_counter()
+            asyncio.run(run_requests(pool, args.requests, args.steps, args.size))
+            elapsed = time.perf_counter() - started
+            memory = sum(pss_mb(w.pid) for w in pool.workers if w.pid)
+        finally:
+            pool.shutdown()
+        per_minute = args.requests / elapsed * 60
+        baseline = baseline or per_minute
+        print(f"  워커 {workers:>2}개: {per_minute:8.1f} img/min  (x{per_minute / baseline:.2f})  "
+              f"PSS 합계 {memory:7.1f}MB")
+
+if __name__ == "__main__":
+    main()
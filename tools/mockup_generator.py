@@ -3,67 +3,150 @@
 실제 AI 대신 빠른 프로토타입 이미지 생성
 """
 
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+import numpy as np
 import os
+import sys
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
-def create_robot_mockup(prompt: str, resolution: str = "512x512"):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from mcp_common.image_io import encode_image, output_options
+from mcp_common.image_store import ImageStore
+
+# 엔드 이펙터 색 후보 (프롬프트 해시로 선택)
+EFFECTOR_COLORS = ['#f56565', '#ed8936', '#ecc94b', '#48bb78', '#4299e1', '#9f7aea']
+
+Color = Tuple[int, int, int]
+
+class MockupParams(NamedTuple):
+    """프롬프트에서 유도한 목업 변형 파라미터 (크기 값은 512px 기준, 해상도에 비례해서 확대)"""
+    background_top: Color
+    background_delta: Color
+    reach: float        # 엔드 이펙터 수평 거리 (폭 대비)
+    elevation: float    # 엔드 이펙터 높이 (위에서부터, 높이 대비)
+    link_width: int
+    effector_color: str
+
+def mockup_params(prompt: str, variant: int = 0) -> MockupParams:
+    """프롬프트 (+ 변형 번호) 의 SHA-256 으로 결정적인 변형 파라미터 생성"""
+    digest = hashlib.sha256(f"{prompt}\0{variant}".encode('utf-8')).digest()
+    unit = [byte / 255 for byte in digest]
+    return MockupParams(
+        background_top=tuple(int(base + (unit[i] - 0.5) * 20) for i, base in enumerate((26, 26, 46))),
+        background_delta=tuple(int(base * (0.7 + 0.6 * unit[3 + i])) for i, base in enumerate((30, 40, 50))),
+        reach=0.10 + 0.12 * unit[6],
+        elevation=0.25 + 0.15 * unit[7],
+        link_width=24 + int(unit[8] * 14),
+        effector_color=EFFECTOR_COLORS[digest[9] % len(EFFECTOR_COLORS)]
+    )
+
+# 캔버스 픽셀 = 메모리 순서 R, G, B, X 의 32비트 정수 (도형 채우기가 픽셀당 정수 하나 대입,
+# PIL 의 RGB 내부 표현과 같은 배치라서 Image.frombuffer('RGBX') 로 복사 없이 이미지가 됨)
+PIXEL = np.dtype('<u4')
+
+def _pack(rgb) -> np.ndarray:
+    """(..., 3) uint8 색 → RGBX 32비트 픽셀"""
+    rgb = np.asarray(rgb, dtype=np.uint32)
+    return (rgb[..., 0] | (rgb[..., 1] << 8) | (rgb[..., 2] << 16) | (0xFF << 24)).astype(PIXEL)
+
+def _rgb(color) -> np.ndarray:
+    return _pack(ImageColor.getrgb(color) if isinstance(color, str) else tuple(color))
+
+def _region(canvas: np.ndarray, x0: float, y0: float, x1: float, y1: float):
+    """캔버스 안으로 자른 사각 영역 (없으면 None) 과 영역 픽셀 좌표 그리드"""
+    height, width = canvas.shape
+    left, top = max(0, int(np.floor(x0))), max(0, int(np.floor(y0)))
+    right, bottom = min(width, int(np.ceil(x1)) + 1), min(height, int(np.ceil(y1)) + 1)
+    if left >= right or top >= bottom:
+        return None
+    ys, xs = np.ogrid[top:bottom, left:right]
+    return canvas[top:bottom, left:right], xs, ys
+
+def fill_gradient(canvas: np.ndarray, top: Color, delta: Color):
+    """세로 그라데이션 (행별 색을 한 번에 계산해서 폭 방향으로 브로드캐스트)"""
+    height = canvas.shape[0]
+    t = (np.arange(height, dtype=np.float32) / height)[:, None]
+    rows = np.asarray(top, dtype=np.float32) + t * np.asarray(delta, dtype=np.float32)
+    canvas[:] = _pack(rows.astype(np.uint8))[:, None]
+
+def draw_rectangle(canvas: np.ndarray, box, fill, outline=None, width: int = 0):
+    """ImageDraw.rectangle 과 같은 좌표 규칙 (양 끝 포함)"""
+    x0, y0, x1, y1 = (int(round(v)) for v in box)
+    canvas[max(0, y0):max(0, y1 + 1), max(0, x0):max(0, x1 + 1)] = _rgb(outline if outline and width else fill)
+    if outline and width:
+        canvas[max(0, y0 + width):max(0, y1 - width + 1), max(0, x0 + width):max(0, x1 - width + 1)] = _rgb(fill)
+
+def draw_ellipse(canvas: np.ndarray, box, fill, outline=None, width: int = 0):
+    """경계 상자 안의 타원 (외곽선 두께만큼 안쪽 타원을 채움색으로)"""
+    x0, y0, x1, y1 = box
+    region = _region(canvas, x0, y0, x1, y1)
+    if region is None:
+        return
+    view, xs, ys = region
+    cx, cy, rx, ry = (x0 + x1) / 2, (y0 + y1) / 2, (x1 - x0) / 2, (y1 - y0) / 2
+    view[((xs - cx) / rx) ** 2 + ((ys - cy) / ry) ** 2 <= 1] = _rgb(outline if outline and width else fill)
+    if outline and width and rx > width and ry > width:
+        inner = ((xs - cx) / (rx - width)) ** 2 + ((ys - cy) / (ry - width)) ** 2 <= 1
+        view[inner] = _rgb(fill)
+
+def draw_thick_line(canvas: np.ndarray, start, end, fill, width: int):
+    """두께 있는 선분 (선분까지의 수직 거리 ≤ 두께/2, 양 끝은 평평하게)"""
+    (x0, y0), (x1, y1) = start, end
+    half = width / 2
+    region = _region(canvas, min(x0, x1) - half, min(y0, y1) - half, max(x0, x1) + half, max(y0, y1) + half)
+    if region is None:
+        return
+    view, xs, ys = region
+    dx, dy = x1 - x0, y1 - y0
+    length = max(np.hypot(dx, dy), 1e-6)
+    along = ((xs - x0) * dx + (ys - y0) * dy) / length
+    across = np.abs((xs - x0) * dy - (ys - y0) * dx) / length
+    view[(across <= half) & (along >= 0) & (along <= length)] = _rgb(fill)
+
+def render_mockup(width: int, height: int, params: Optional[MockupParams] = None) -> np.ndarray:
     """
-    로봇 디자인 목업 이미지 생성 (즉시 완성)
-    실제 AI 대신 빠른 프로토타입용
+    배경과 로봇 아암 도형을 (height, width) RGBX 픽셀 배열 하나에 그림
+    params 가 None 이면 이전 create_robot_mockup 과 같은 고정 디자인 (프롬프트와 무관, 도형 크기 고정)
     """
-    
-    print(f"🚀 로봇 목업 이미지 생성 중...")
-    print(f"📝 프롬프트: {prompt[:100]}...")
-    
-    # 해상도 파싱
-    width, height = map(int, resolution.split('x'))
-    
-    # 배경 생성 (그라데이션 효과)
-    image = Image.new('RGB', (width, height), color='#1a1a2e')
-    draw = ImageDraw.Draw(image)
-    
-    # 그라데이션 배경
-    for y in range(height):
-        r = int(26 + (y / height) * 30)
-        g = int(26 + (y / height) * 40) 
-        b = int(46 + (y / height) * 50)
-        draw.line([(0, y), (width, y)], fill=(r, g, b))
-    
-    # 로봇 아암 기본 형태 그리기
-    # 베이스
-    draw.rectangle([width//4, height*3//4, width*3//4, height-20], 
-                  fill='#4a5568', outline='#718096', width=3)
-    
-    # 관절 1 (베이스)
+    canvas = np.empty((height, width), dtype=PIXEL)
     center_x = width // 2
-    draw.ellipse([center_x-30, height*3//4-15, center_x+30, height*3//4+15], 
-                fill='#2d3748', outline='#4a5568', width=2)
-    
-    # 아암 링크 1
-    draw.rectangle([center_x-15, height//2, center_x+15, height*3//4], 
-                  fill='#e2e8f0', outline='#cbd5e0', width=2)
-    
-    # 관절 2
-    draw.ellipse([center_x-20, height//2-10, center_x+20, height//2+10], 
-                fill='#2d3748', outline='#4a5568', width=2)
-    
-    # 아암 링크 2
-    end_x = center_x + 80
-    draw.line([(center_x, height//2), (end_x, height//3)], 
-              fill='#e2e8f0', width=30)
-    
-    # 엔드 이펙터
-    draw.ellipse([end_x-25, height//3-25, end_x+25, height//3+25], 
-                fill='#f56565', outline='#e53e3e', width=3)
-    
-    # 그리퍼
-    draw.rectangle([end_x-5, height//3-35, end_x+5, height//3-25], 
-                  fill='#4a5568')
-    draw.rectangle([end_x-5, height//3+25, end_x+5, height//3+35], 
-                  fill='#4a5568')
-    
-    # 제목 텍스트 추가
+    base_y, elbow_y = height * 3 // 4, height // 2
+    if params is None:
+        fill_gradient(canvas, (26, 26, 46), (30, 40, 50))
+        s = 1
+        end_x, end_y, link_width, effector_color = center_x + 80, height // 3, 30, '#f56565'
+    else:
+        fill_gradient(canvas, params.background_top, params.background_delta)
+        s = min(width, height) / 512  # 512px 기준 크기를 해상도에 맞춤
+        end_x, end_y = center_x + width * params.reach, height * params.elevation
+        link_width, effector_color = params.link_width * s, params.effector_color
+
+    # 베이스, 관절 1
+    draw_rectangle(canvas, [width // 4, base_y, width * 3 // 4, height - 20 * s],
+                   fill='#4a5568', outline='#718096', width=max(1, round(3 * s)))
+    draw_ellipse(canvas, [center_x - 30 * s, base_y - 15 * s, center_x + 30 * s, base_y + 15 * s],
+                 fill='#2d3748', outline='#4a5568', width=max(1, round(2 * s)))
+    # 아암 링크 1, 관절 2
+    draw_rectangle(canvas, [center_x - 15 * s, elbow_y, center_x + 15 * s, base_y],
+                   fill='#e2e8f0', outline='#cbd5e0', width=max(1, round(2 * s)))
+    draw_ellipse(canvas, [center_x - 20 * s, elbow_y - 10 * s, center_x + 20 * s, elbow_y + 10 * s],
+                 fill='#2d3748', outline='#4a5568', width=max(1, round(2 * s)))
+    # 아암 링크 2, 엔드 이펙터, 그리퍼
+    draw_thick_line(canvas, (center_x, elbow_y), (end_x, end_y), fill='#e2e8f0', width=link_width)
+    draw_ellipse(canvas, [end_x - 25 * s, end_y - 25 * s, end_x + 25 * s, end_y + 25 * s],
+                 fill=effector_color, outline='#e53e3e', width=max(1, round(3 * s)))
+    draw_rectangle(canvas, [end_x - 5 * s, end_y - 35 * s, end_x + 5 * s, end_y - 25 * s], fill='#4a5568')
+    draw_rectangle(canvas, [end_x - 5 * s, end_y + 25 * s, end_x + 5 * s, end_y + 35 * s], fill='#4a5568')
+    return canvas
+
+def draw_labels(image: Image.Image):
+    """제목과 사양 텍스트 (글자는 PIL 폰트 렌더링)"""
+    draw = ImageDraw.Draw(image)
+    width, height = image.size
     try:
         font = ImageFont.load_default()
         text = "INDUSTRIAL ROBOT ARM - PROTOTYPE"
@@ -87,30 +170,101 @@ def create_robot_mockup(prompt: str, resolution: str = "512x512"):
     except:
         # 폰트 로드 실패 시 기본 텍스트
         draw.text((width//2-50, 20), "ROBOT ARM", fill='white')
-    
-    # 출력 디렉토리 생성
-    os.makedirs("generated_images", exist_ok=True)
-    
-    # 파일 저장
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    image_path = f"generated_images/robot_mockup_{timestamp}.png"
-    image.save(image_path)
-    
-    result = {
+
+def to_image(canvas: np.ndarray) -> Image.Image:
+    """RGBX 픽셀 배열을 복사 없이 PIL 이미지로 (png 인코딩 시에만 RGB 로 변환됨)"""
+    height, width = canvas.shape
+    return Image.frombuffer('RGBX', (width, height), canvas, 'raw', 'RGBX', 0, 1)
+
+def render_mockup_image(prompt: str, width: int, height: int, variant: Optional[int] = 0) -> Image.Image:
+    """variant 가 None 이면 고정 디자인, 정수면 프롬프트 + 변형 번호에서 유도한 디자인"""
+    params = mockup_params(prompt, variant) if variant is not None else None
+    image = to_image(render_mockup(width, height, params))
+    draw_labels(image)
+    return image
+
+def _render_encoded(job: Tuple[str, Optional[int], int, int, Dict[str, Any]]) -> Tuple[bytes, float]:
+    """프로세스 풀 작업: 렌더링 + 인코딩 → (이미지 바이트, 걸린 초)"""
+    prompt, variant, width, height, options = job
+    started = time.perf_counter()
+    image = render_mockup_image(prompt, width, height, variant)
+    if options['image_format'] == 'png':
+        image = image.convert('RGB')  # png 는 RGBX 모드를 쓸 수 없음 (jpeg/webp 는 그대로 인코딩)
+    data = encode_image(image, **options)
+    return data, time.perf_counter() - started
+
+def _store_mockup(store: ImageStore, data: bytes, prompt: str, width: int, height: int,
+                  options: Dict[str, Any], generation_time: float, variant: Optional[int] = 0) -> Dict[str, Any]:
+    """콘텐츠 해시 저장소에 등록하고 결과 dict 구성"""
+    effector_color = mockup_params(prompt, variant).effector_color if variant is not None else '#f56565'
+    stored = store.put(
+        data, options['image_format'],
+        prompt=prompt,
+        params={"resolution": f"{width}x{height}", "output_format": options['image_format'],
+                "variant": variant, "effector_color": effector_color},
+        provider="local_mockup",
+        timings={"generation_time": generation_time}
+    )
+    return {
         "success": True,
-        "image_path": os.path.abspath(image_path),
-        "generation_time": 0.1,  # 즉시 생성
+        "image_path": stored["path"],
+        "image_id": stored["image_id"],
+        "generation_time": round(generation_time, 4),
         "api_used": "local_mockup",
         "model": "procedural_generation",
         "resolution": f"{width}x{height}",
+        "output_format": options['image_format'],
+        "variant": variant,
         "timestamp": datetime.now().isoformat()
     }
+
+def create_robot_mockup(prompt: str, resolution: str = "512x512", variant: Optional[int] = None, **output_kwargs):
+    """
+    로봇 디자인 목업 이미지 생성 (즉시 완성)
+    실제 AI 대신 빠른 프로토타입용
+    variant: None 이면 이전과 같은 고정 디자인, 정수면 색/자세를 프롬프트 (+ 변형 번호) 에서 결정적으로 유도
+    output_kwargs: output_format (png/jpeg/webp), quality, png_compress_level, optimize
+    """
+    
+    print(f"🚀 로봇 목업 이미지 생성 중...")
+    print(f"📝 프롬프트: {prompt[:100]}...")
+    
+    # 해상도 파싱
+    width, height = map(int, resolution.split('x'))
     
-    print(f"✅ 목업 이미지 완성! (0.1초)")
-    print(f"📁 저장 위치: {image_path}")
+    # 렌더링 + 요청한 출력 포맷으로 한 번 인코딩, 콘텐츠 해시 저장소에 등록
+    options = output_options(output_kwargs)
+    data, generation_time = _render_encoded((prompt, variant, width, height, options))
+    result = _store_mockup(ImageStore(), data, prompt, width, height, options, generation_time, variant)
+    
+    print(f"✅ 목업 이미지 완성! ({result['generation_time']}초)")
+    print(f"📁 저장 위치: {result['image_path']}")
     
     return result
 
+def create_robot_mockups(prompts: List[str], resolution: str = "512x512", variants: int = 1,
+                         processes: Optional[int] = None, **output_kwargs) -> List[Dict[str, Any]]:
+    """
+    목업 여러 장을 프로세스 풀에서 렌더링/인코딩 (프롬프트마다 variants 개 변형, 결과는 입력 순서)
+    변형은 프롬프트에서 유도한 디자인 (variant 0..variants-1), 고정 디자인은 create_robot_mockup 기본값.
+    저장소 등록은 부모 프로세스에서만 한다 (SQLite 인덱스 단일 기록자).
+    워커는 이 모듈과 numpy/PIL/mcp_common 만 임포트하고 서버 패키지는 불러오지 않는다.
+    """
+    width, height = map(int, resolution.split('x'))
+    options = output_options(output_kwargs)
+    jobs = [(prompt, variant, width, height, options) for prompt in prompts for variant in range(variants)]
+    processes = min(processes or os.cpu_count() or 1, len(jobs))
+    
+    if processes <= 1:
+        rendered = [_render_encoded(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            rendered = list(pool.map(_render_encoded, jobs, chunksize=max(1, len(jobs) // (processes * 4))))
+    
+    store = ImageStore()
+    return [_store_mockup(store, data, prompt, width, height, options, seconds, variant)
+            for (prompt, variant, _, _, _), (data, seconds) in zip(jobs, rendered)]
+
 def main():
     """메인 실행"""
     
@@ -3,8 +3,12 @@ Blender 자동화 테스트 (간단 버전)
 """
 
 import os
+import sys
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from mcp_common.image_store import ImageStore
+
 def create_blender_script():
     """Blender Python 스크립트 생성"""
     
@@ -73,13 +77,10 @@ def main():
     
     print(f"✅ Blender 스크립트 생성 완료: {script_path}")
     
-    # 최근 생성된 이미지 확인
-    images_dir = "generated_images"
-    if os.path.exists(images_dir):
-        images = [f for f in os.listdir(images_dir) if f.endswith('.png')]
-        if images:
-            latest_image = max([os.path.join(images_dir, f) for f in images], key=os.path.getctime)
-            print(f"📸 최근 생성된 이미지: {latest_image}")
+    # 최근 생성된 이미지 확인 (저장소 인덱스 조회, 디렉토리 스캔 없음)
+    latest = ImageStore().latest()
+    if latest is not None:
+        print(f"📸 최근 생성된 이미지: {latest['path']} ({latest['provider']})")
     
     print("\n" + "=" * 60)
     print("🎉 Blender 통합 준비 완료!")